@@ -0,0 +1,320 @@
+"""Admission control (ruang tunggu) untuk checkout dan add-to-cart saat trafik melonjak.
+
+Setiap gate (`checkout`, `cart`) membatasi request yang sedang diproses (max_active) dan laju
+masuk (token bucket rate/burst). Jika penuh, request tidak ditahan di worker: klien menerima 202
+`{"queued": true, "ticket", "position", "retry_after"}` lalu mengulang request yang sama dengan
+header X-Queue-Ticket (lihat static/js/admission.js). Antrian FIFO menurut waktu tiket
+diterbitkan; tiket ditandatangani SECRET_KEY dan terikat ke user dan gate, jadi worker gunicorn
+lain tetap menempatkannya sesuai urutan. Batas dan antrian berlaku per proses worker. Tiket bisa
+di-poll di worker mana saja, jadi yang dihitung di depan sebuah tiket hanya tiket yang di-poll di
+proses ini dalam dua interval polling terakhir (tiket yang sudah masuk di worker lain tidak
+menahan antrian). Tiket yang tidak di-poll lagi selama ticket_ttl detik dibuang dari antrian.
+
+Tiket sekali pakai: setiap response 202 menandatangani ulang tiket, dan tanda tangan hanya berlaku
+ticket_ttl detik (beberapa interval polling). Nonce tiket yang sudah masuk dicatat dan tidak
+diterima lagi.
+
+Per user ada token bucket tersendiri (user_rate/user_burst) untuk request baru. Polling hanya
+bebas dari batas ini jika tiketnya sedang menunggu di proses ini; tiket dari worker lain dihitung
+seperti request baru (tetap dengan urutan waktu terbitnya), jadi tiket yang diputar ulang tidak
+bisa melewati batas per user. Kelebihannya dijawab 429 dengan Retry-After.
+
+Konfigurasi default ADMISSION_GATES ditimpa file JSON ADMISSION_CONFIG, misalnya
+`{"checkout": {"max_active": 4, "rate": 10}}`, yang dibaca ulang otomatis saat file berubah
+(tanpa restart). Metrik per gate (kedalaman antrian, waktu tunggu p50/p95/p99): /admin/admission.
+"""
+import bisect
+import json
+import math
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import wraps
+
+from flask import current_app, jsonify, request
+from flask_login import current_user
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+DEFAULTS = {
+    'enabled': True,
+    'max_active': 16,      # request yang sedang diproses per worker
+    'rate': 50.0,          # request baru per detik (0 = tanpa batas laju)
+    'burst': 50,
+    'max_queue': 1000,
+    'poll_interval': 1.0,  # detik antar polling klien
+    'ticket_ttl': 10.0,    # tiket dibuang jika tidak di-poll selama ini
+    'user_rate': 1.0,      # request baru per detik per user (0 = tanpa batas)
+    'user_burst': 5,
+}
+
+GATES = {
+    'checkout': {'max_active': 8, 'rate': 20.0, 'burst': 20, 'user_rate': 0.5, 'user_burst': 3},
+    'cart': {'max_active': 32, 'rate': 100.0, 'burst': 100, 'user_rate': 5.0, 'user_burst': 10},
+}
+
+MAX_TRACKED_USERS = 10000
+MAX_CONSUMED_TICKETS = 100000
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        # now bisa sedikit lebih awal dari updated (diambil sebelum lock / sebelum bucket dibuat)
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def available(self, now):
+        if self.rate <= 0:
+            return math.inf
+        self._refill(now)
+        return int(self.tokens)
+
+    def take(self, now):
+        if self.rate <= 0:
+            return True
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self, now):
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+
+class Gate:
+    def __init__(self, name, options):
+        self.name = name
+        self._lock = threading.Lock()
+        self.active = 0
+        self.waiting = {}     # (issued, nonce) -> terakhir di-poll
+        self.order = []       # key waiting, terurut waktu terbit
+        self.consumed = OrderedDict()  # nonce tiket yang sudah masuk -> waktu masuk
+        self.configure(options)
+        self.reset_metrics()
+
+    def configure(self, options):
+        with self._lock:
+            self.options = dict(DEFAULTS, **options)
+            self.bucket = TokenBucket(self.options['rate'], self.options['burst'])
+            self.users = OrderedDict()
+
+    def reset_metrics(self):
+        with self._lock:
+            self.admitted = 0
+            self.queued = 0
+            self.rejected = {'full': 0, 'user_limit': 0, 'replayed': 0}
+            self.max_queue_depth = len(self.waiting)
+            self.waits = deque(maxlen=1000)
+
+    def _user_bucket(self, user_id):
+        bucket = self.users.pop(user_id, None)
+        if bucket is None:
+            bucket = TokenBucket(self.options['user_rate'], self.options['user_burst'])
+        self.users[user_id] = bucket
+        if len(self.users) > MAX_TRACKED_USERS:
+            self.users.popitem(last=False)
+        return bucket
+
+    def _forget(self, key):
+        del self.waiting[key]
+        self.order.pop(bisect.bisect_left(self.order, key))
+
+    def _purge(self, now):
+        stale = now - self.options['ticket_ttl']
+        for key in [key for key, seen in self.waiting.items() if seen < stale]:
+            self._forget(key)
+        # Setelah ticket_ttl tanda tangan tiket yang sudah masuk kadaluarsa sendiri
+        while self.consumed and next(iter(self.consumed.values())) < stale:
+            self.consumed.popitem(last=False)
+
+    def _ahead(self, ticket, wall):
+        # Hanya tiket yang masih di-poll di proses ini; interval polling klien = Retry-After (dibulatkan ke atas)
+        live = wall - 2 * max(1, math.ceil(self.options['poll_interval']))
+        return sum(1 for key in self.order[:bisect.bisect_left(self.order, ticket)] if self.waiting[key] >= live)
+
+    def admit(self, user_id, ticket=None):
+        """('admitted', None), ('queued', (key, posisi)), ('user_limit', detik) atau ('full', detik)"""
+        now, wall = time.monotonic(), time.time()
+        with self._lock:
+            options = self.options
+            self._purge(wall)
+            if ticket is not None and ticket[1] in self.consumed:
+                self.rejected['replayed'] += 1
+                ticket = None
+            if ticket not in self.waiting:
+                # Batas per user untuk request baru dan tiket yang tidak menunggu di proses ini;
+                # polling tiket yang sedang menunggu di sini tidak dihitung
+                bucket = self._user_bucket(user_id)
+                if not bucket.take(now):
+                    self.rejected['user_limit'] += 1
+                    return 'user_limit', bucket.wait_time(now)
+                if ticket is None:
+                    ticket = (wall, secrets.token_hex(8))
+
+            # Jumlah tiket yang lebih dulu terbit dan masih menunggu di proses ini
+            ahead = self._ahead(ticket, wall)
+            free = min(options['max_active'] - self.active, self.bucket.available(now))
+            if ahead < free:
+                if ticket in self.waiting:
+                    self._forget(ticket)
+                    self.waits.append(wall - ticket[0])
+                self.consumed[ticket[1]] = wall
+                if len(self.consumed) > MAX_CONSUMED_TICKETS:
+                    self.consumed.popitem(last=False)
+                self.bucket.take(now)
+                self.active += 1
+                self.admitted += 1
+                return 'admitted', None
+
+            if ticket not in self.waiting:
+                if len(self.waiting) >= options['max_queue']:
+                    self.rejected['full'] += 1
+                    return 'full', options['poll_interval']
+                bisect.insort(self.order, ticket)
+                self.max_queue_depth = max(self.max_queue_depth, len(self.order))
+            self.waiting[ticket] = wall
+            self.queued += 1
+            return 'queued', (ticket, ahead + 1)
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+
+    def stats(self):
+        with self._lock:
+            waits = sorted(self.waits)
+            stats = {
+                'enabled': self.options['enabled'],
+                'active': self.active,
+                'queue_depth': len(self.waiting),
+                'max_queue_depth': self.max_queue_depth,
+                'admitted': self.admitted,
+                'queued_responses': self.queued,
+                'rejected': dict(self.rejected),
+                'options': dict(self.options),
+            }
+        for pct in (50, 95, 99):
+            value = waits[min(len(waits) - 1, int(len(waits) * pct / 100))] if waits else 0
+            stats[f'wait_p{pct}_ms'] = round(value * 1000, 1)
+        return stats
+
+
+class AdmissionController:
+    """Gate per nama + reload konfigurasi dari file JSON saat mtime berubah"""
+
+    def __init__(self, gates, config_path=None, check_interval=1.0):
+        self.base = gates
+        self.config_path = config_path
+        self.check_interval = check_interval
+        self.gates = {name: Gate(name, options) for name, options in gates.items()}
+        self._mtime = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def gate(self, name):
+        if self.config_path and time.monotonic() - self._checked >= self.check_interval:
+            self.reload()
+        return self.gates[name]
+
+    def reload(self, force=False):
+        with self._lock:
+            self._checked = time.monotonic()
+            try:
+                mtime = os.path.getmtime(self.config_path)
+            except OSError:
+                mtime = None
+            if mtime == self._mtime and not force:
+                return False
+            overrides = {}
+            if mtime is not None:
+                try:
+                    with open(self.config_path) as f:
+                        overrides = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"Admission config error ({self.config_path}): {e}, konfigurasi lama dipakai")
+                    return False
+            self._mtime = mtime
+            for name, gate in self.gates.items():
+                gate.configure(dict(self.base[name], **overrides.get(name, {})))
+            print(f"Admission config dimuat: {overrides}")
+            return True
+
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.secret_key, salt='admission-ticket')
+
+
+def _read_ticket(gate):
+    raw = request.headers.get('X-Queue-Ticket')
+    if not raw:
+        return None
+    try:
+        # Ditandatangani ulang di setiap 202, jadi klien yang masih polling selalu punya tiket baru
+        name, user_id, issued, nonce = _serializer().loads(raw, max_age=gate.options['ticket_ttl'])
+    except (BadSignature, ValueError, TypeError):
+        return None
+    if name != gate.name or user_id != current_user.id:
+        return None
+    return issued, nonce
+
+
+def _limited(status, message, wait, **extra):
+    response = jsonify({'success': False, 'message': message, **extra})
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(wait)))
+    return response
+
+
+def admitted(gate_name):
+    """Lewatkan view hanya jika gate punya kapasitas, selain itu jawab 202 (antri) / 429 / 503"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            gate = current_app.extensions['admission'].gate(gate_name)
+            if not gate.options['enabled']:
+                return view(*args, **kwargs)
+
+            outcome, info = gate.admit(current_user.id, _read_ticket(gate))
+            if outcome == 'user_limit':
+                return _limited(429, 'Terlalu banyak permintaan, coba lagi sebentar lagi', info)
+            if outcome == 'full':
+                return _limited(503, 'Antrian sedang penuh, silakan coba lagi', info)
+            if outcome == 'queued':
+                (issued, nonce), position = info
+                retry_after = gate.options['poll_interval']
+                return _limited(202, f'Anda dalam antrian (posisi {position})', retry_after, queued=True,
+                                position=position, retry_after=retry_after,
+                                ticket=_serializer().dumps([gate_name, current_user.id, issued, nonce]))
+            try:
+                return view(*args, **kwargs)
+            finally:
+                gate.release()
+        return wrapper
+    return decorator
+
+
+def init_admission(app):
+    app.config.setdefault('ADMISSION_ENABLED', True)
+    app.config.setdefault('ADMISSION_GATES', GATES)
+    app.config.setdefault('ADMISSION_CONFIG', None)
+
+    gates = {name: dict(options, enabled=options.get('enabled', True) and app.config['ADMISSION_ENABLED'])
+             for name, options in app.config['ADMISSION_GATES'].items()}
+    controller = AdmissionController(gates, app.config['ADMISSION_CONFIG'])
+    if controller.config_path:
+        controller.reload()
+    app.extensions['admission'] = controller
+
+
+def admission_stats():
+    return {name: gate.stats() for name, gate in current_app.extensions['admission'].gates.items()}
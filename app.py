@@ -1,38 +1,52 @@
 from datetime import datetime
 import traceback
 from venv import logger
-from flask import Flask, render_template, request, redirect, session, url_for, flash, jsonify
+from flask import Blueprint, Flask, current_app, render_template, request, redirect, session, url_for, flash, jsonify
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash
 from sqlalchemy import func
 from sqlalchemy.orm import joinedload
-from models import GenderEnum, Image, ImageUsers, Order, OrderStatusEnum, PaymentMethodEnum, Product, ProductOrder, RoleEnum, User, db, Cart
+from migrate import MigrationContext, db_status_command, db_upgrade_command, stamp_all
+from order_summary import check_summary_command
+from order_archive import archived_order, init_order_archive, orders_archive_command, orders_partitions_command, partition_orders
+from compression import init_compression
+from conditional import conditional
+from listings import listing_data, order_history, order_rows
+from product_stats import category_stats, inventory_stats, low_stock_products
+from uploads import UploadRejected, image_mime_type, image_upload, init_uploads
+from identity import Identity, avatar_url, bump_identity, forget_identity, init_identity, load_identity
+from passwords import PasswordHasherBusy, hash_password, init_passwords, password_needs_rehash, password_stats, password_too_long
+from admission import admission_stats, admitted, init_admission
+from idempotency import idempotency_purge_command, idempotent, init_idempotency
+from server_session import init_server_session, session_purge_command
+from order_events import event_stream_response, init_order_events, publish_order_event
+from outbound import DependencyUnavailable, PooledOAuth2Session, config_from_env, get_dependency, init_outbound, outbound_stats
+from assets import assets_build_command, assets_vendor_command, init_assets
+from templating import compile_templates_command, init_templating, profile as template_profile
+from stock import init_stock, release, reserve, set_stock, stock_rebalance_command, stock_shards_command
+from fragment_cache import bump_cache_version, bump_cache_version_now, ensure_cache_version, get_cache_version, get_fragment_cache, init_fragment_cache
+from models import Base, GenderEnum, Image, ImageUsers, Order, OrderArchive, OrderStatusEnum, PaymentMethodEnum, Product, ProductOrder, RoleEnum, User, db, Cart
 import os
 import base64
 import hashlib
 import uuid
-import midtransclient
+import click
+import json
+import time
+import requests
 from dotenv import load_dotenv
 from authlib.integrations.flask_client import OAuth
 
 load_dotenv()
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key')
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URI')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-
-# Initialize extensions
-db.init_app(app)
+# Extension dibuat tanpa app, lalu di-bind di create_app()
 login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'
+login_manager.login_view = 'main.login'
 login_manager.login_message_category = 'info'
 
-oauth = OAuth(app)
-google = oauth.register(
+oauth = OAuth()
+# register() tanpa app hanya menyimpan konfigurasi; client dibuat saat pertama dipakai
+oauth.register(
     name='google',
     client_id=os.environ.get('OAUTH_CLIENT_ID'),
     client_secret=os.environ.get('OAUTH_CLIENT_SECRET'),
@@ -40,15 +54,151 @@ google = oauth.register(
     client_kwargs={'scope': 'openid email profile'}
 )
 
-# konfigurasi Midtrans
-snap = midtransclient.Snap(
-    is_production=False,  # Set ke False untuk Sandbox atau development
-    server_key=os.environ.get('SNAP_SERVER_KEY'),
-    client_key=os.environ.get('SNAP_CLIENT_KEY')
-)
+bp = Blueprint('main', __name__, cli_group=None)
+
+
+def create_app(config=None):
+    """Application factory, dipakai oleh wsgi.py, gunicorn dan `flask run`"""
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key')
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URI')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # pool_pre_ping supaya koneksi yang sudah mati (setelah fork / restart DB) tidak dipakai
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'pool_pre_ping': True}
+    app.config['OIDC_METADATA_CACHE'] = os.environ.get('OIDC_METADATA_CACHE', os.path.join(app.instance_path, 'oidc_metadata.json'))
+    app.config['OIDC_METADATA_TTL'] = int(os.environ.get('OIDC_METADATA_TTL', 24 * 60 * 60))
+    app.config['FRAGMENT_CACHE_MAX_BYTES'] = int(os.environ.get('FRAGMENT_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    app.config['FRAGMENT_CACHE_REDIS_URL'] = os.environ.get('FRAGMENT_CACHE_REDIS_URL')
+    app.config['TEMPLATE_PROFILING'] = os.environ.get('TEMPLATE_PROFILING') == '1'
+    app.config['MIDTRANS_SNAP_BASE_URL'] = os.environ.get('MIDTRANS_SNAP_BASE_URL')
+    # Timeout / batas konkurensi / circuit breaker per layanan luar, misalnya OUTBOUND_MIDTRANS_READ_TIMEOUT
+    app.config['OUTBOUND_DEPENDENCIES'] = {name: config_from_env(name) for name in ('midtrans', 'google')}
+    app.config['ORDER_EVENTS_REDIS_URL'] = os.environ.get('ORDER_EVENTS_REDIS_URL')
+    # Default per worker class diisi gunicorn.conf.py (gthread: setengah jumlah thread)
+    app.config['ORDER_EVENTS_MAX_STREAMS'] = int(os.environ.get('ORDER_EVENTS_MAX_STREAMS', 100))
+    # Session di server (database/redis/memory), cookie hanya berisi id; 'cookie' = bawaan Flask
+    app.config['SESSION_BACKEND'] = os.environ.get('SESSION_BACKEND', 'database')
+    app.config['SESSION_REDIS_URL'] = os.environ.get('SESSION_REDIS_URL')
+    app.config['SESSION_STORE_TTL'] = int(os.environ.get('SESSION_STORE_TTL', 24 * 60 * 60))
+    app.config['IDEMPOTENCY_TTL'] = int(os.environ.get('IDEMPOTENCY_TTL', 24 * 60 * 60))
+    app.config['LISTING_CACHE_TTL'] = int(os.environ.get('LISTING_CACHE_TTL', 30))
+    app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+    # Ruang tunggu checkout / add-to-cart; batas per gate bisa diubah live lewat file JSON ADMISSION_CONFIG
+    app.config['ADMISSION_ENABLED'] = os.environ.get('ADMISSION_ENABLED', '1') != '0'
+    app.config['ADMISSION_CONFIG'] = os.environ.get('ADMISSION_CONFIG')
+    # Detik antar ringkasan/perataan stok produk mode shard (0 = hanya lewat `flask stock-rebalance`)
+    app.config['STOCK_REBALANCE_INTERVAL'] = float(os.environ.get('STOCK_REBALANCE_INTERVAL', 2))
+    # Order APPROVE/CANCEL lebih tua dari ini dipindah ke order_archive_db oleh `flask orders-archive`
+    app.config['ORDER_ARCHIVE_DAYS'] = int(os.environ.get('ORDER_ARCHIVE_DAYS', 365))
+    app.config['ORDER_PARTITIONS_AHEAD'] = int(os.environ.get('ORDER_PARTITIONS_AHEAD', 3))
+    app.config['ORDER_HISTORY_PAGE_SIZE'] = int(os.environ.get('ORDER_HISTORY_PAGE_SIZE', 20))
+    # Hash password di process pool (0 = di thread request); metode format werkzeug, lihat bench/password_hash.py
+    app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    # Per worker gunicorn: total proses hash di host = GUNICORN_WORKERS x PASSWORD_HASH_WORKERS
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', 1))
+    app.config['PASSWORD_HASH_MAX_PENDING'] = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 32))
+    app.config['PASSWORD_HASH_QUEUE_TIMEOUT'] = float(os.environ.get('PASSWORD_HASH_QUEUE_TIMEOUT', 2))
+    app.config['PASSWORD_MAX_BYTES'] = int(os.environ.get('PASSWORD_MAX_BYTES', 1024))
+    # Detik snapshot identitas user di session dipakai tanpa query users_db (0 = selalu dari database)
+    app.config['IDENTITY_TTL'] = float(os.environ.get('IDENTITY_TTL', 30))
+    # Upload gambar: batas per file, batas body request (413 sebelum dibaca) dan ukuran spool di memori
+    app.config['UPLOAD_MAX_BYTES'] = int(os.environ.get('UPLOAD_MAX_BYTES', 5 * 1024 * 1024))
+    app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_CONTENT_LENGTH', app.config['UPLOAD_MAX_BYTES'] + 1024 * 1024))
+    app.config['UPLOAD_SPOOL_BYTES'] = int(os.environ.get('UPLOAD_SPOOL_BYTES', 512 * 1024))
+    app.config['JINJA_BYTECODE_CACHE_DIR'] = os.environ.get('JINJA_BYTECODE_CACHE_DIR', os.path.join(app.instance_path, 'jinja_cache'))
+    if config:
+        app.config.update(config)
+
+    # Initialize extensions
+    db.init_app(app)
+    init_fragment_cache(app)
+    init_templating(app)
+    init_assets(app)
+    init_compression(app)
+    init_order_events(app)
+    init_outbound(app)
+    init_idempotency(app)
+    init_admission(app)
+    init_server_session(app)
+    init_stock(app)
+    init_order_archive(app)
+    init_passwords(app)
+    init_identity(app)
+    init_uploads(app)
+    login_manager.init_app(app)
+    oauth.init_app(app)
+    app.register_blueprint(bp)
+    app.cli.add_command(db_upgrade_command)
+    app.cli.add_command(db_status_command)
+    app.cli.add_command(check_summary_command)
+    app.cli.add_command(compile_templates_command)
+    app.cli.add_command(assets_vendor_command)
+    app.cli.add_command(assets_build_command)
+    app.cli.add_command(idempotency_purge_command)
+    app.cli.add_command(session_purge_command)
+    app.cli.add_command(stock_shards_command)
+    app.cli.add_command(stock_rebalance_command)
+    app.cli.add_command(orders_partitions_command)
+    app.cli.add_command(orders_archive_command)
+
+    return app
+
+
+def get_snap():
+    """Client Midtrans Snap, dibuat saat checkout pertama (bukan saat import)"""
+    snap = current_app.extensions.get('midtrans_snap')
+    if snap is None:
+        import midtransclient
+
+        # konfigurasi Midtrans
+        snap = midtransclient.Snap(
+            is_production=False,  # Set ke False untuk Sandbox atau development
+            server_key=os.environ.get('SNAP_SERVER_KEY'),
+            client_key=os.environ.get('SNAP_CLIENT_KEY')
+        )
+        # Override endpoint Snap (dipakai server stub di bench/checkout_concurrency.py)
+        base_url = current_app.config.get('MIDTRANS_SNAP_BASE_URL')
+        if base_url:
+            snap.api_config.SNAP_SANDBOX_BASE_URL = snap.api_config.SNAP_PRODUCTION_BASE_URL = base_url
+        # Pool koneksi, timeout dan circuit breaker bersama (lihat outbound.py)
+        snap.http_client.http_client = get_dependency('midtrans')
+        current_app.extensions['midtrans_snap'] = snap
+    return snap
+
+
+def get_google():
+    """Client Google OAuth, metadata OIDC dibaca dari cache disk jika masih segar"""
+    client = oauth.create_client('google')
+    # Semua request OAuth (metadata, token, userinfo) lewat pool + circuit breaker bersama
+    client.client_cls = PooledOAuth2Session
+    if '_loaded_at' in client.server_metadata:
+        return client
+
+    cache_path = current_app.config['OIDC_METADATA_CACHE']
+    try:
+        with open(cache_path) as f:
+            metadata = json.load(f)
+        if time.time() - metadata.get('_loaded_at', 0) < current_app.config['OIDC_METADATA_TTL']:
+            client.server_metadata.update(metadata)
+            return client
+    except (OSError, ValueError):
+        pass
+
+    # Cache tidak ada / kadaluarsa: ambil dari server lalu simpan ke disk
+    metadata = client.load_server_metadata()
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(metadata, f)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Gagal menyimpan cache metadata OIDC: {e}")
+    return client
+
 
 # Tambahkan baris ini agar Jinja2 mengenali filter b64encode
-@app.template_filter('b64encode')
+@bp.app_template_filter('b64encode')
 def b64encode_filter(data):
     if data:
         return base64.b64encode(data).decode('utf-8')
@@ -56,15 +206,15 @@ def b64encode_filter(data):
 
 @login_manager.user_loader
 def load_user(user_id):
-    return db.session.query(User).filter_by(id=user_id).first()
+    return load_identity(user_id)
 
 
-@app.route('/register', methods=['GET', 'POST'])
+@bp.route('/register', methods=['GET', 'POST'])
 def register():
     if current_user.is_authenticated:
         if current_user.is_admin():
-            return redirect(url_for('admin_dashboard'))
-        return redirect(url_for('dashboard'))
+            return redirect(url_for('main.admin_dashboard'))
+        return redirect(url_for('main.dashboard'))
     
     if request.method == 'POST':
         first_name = request.form.get('first_name')
@@ -82,6 +232,10 @@ def register():
             flash('Password dan konfirmasi password tidak cocok!', 'error')
             return render_template('register.html')
 
+        if password_too_long(password):
+            flash('Password terlalu panjang!', 'error')
+            return render_template('register.html')
+
         if db.session.query(User).filter_by(email=email).first():
             flash('Email sudah digunakan!', 'error')
             return render_template('register.html')
@@ -102,17 +256,17 @@ def register():
         db.session.commit()
 
         flash('Registrasi berhasil! Silakan login.', 'success')
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
         
 
     return render_template('register.html')
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
         if current_user.is_admin():
-            return redirect(url_for('admin_dashboard'))
-        return redirect(url_for('dashboard'))
+            return redirect(url_for('main.admin_dashboard'))
+        return redirect(url_for('main.dashboard'))
     
     if request.method == 'POST':
         email = request.form.get('email')
@@ -125,41 +279,47 @@ def login():
 
         user = db.session.query(User).filter_by(email=email).first()
 
+        # Password dicek dulu: akun non-aktif tetap menjalankan hash, jadi waktu respons tidak membocorkan status akun
         if user and user.check_password(password) and user.is_active:
+            if password_needs_rehash(user.password_hash):
+                # Parameter hash berubah (PASSWORD_HASH_METHOD): ganti hash selagi password asli diketahui
+                user.set_password(password)
+                db.session.commit()
+                current_app.extensions['passwords'].count('rehash')
             login_user(user, remember=remember)
             flash(f'Login berhasil! Selamat datang {user.first_name}', 'success')
             
             if user.is_admin():
-                return redirect(url_for('admin_dashboard'))
+                return redirect(url_for('main.admin_dashboard'))
             else:
-                return redirect(url_for('dashboard'))
+                return redirect(url_for('main.dashboard'))
         else:
             flash('Login gagal. Periksa email dan password!', 'error')
 
         
     return render_template('login.html')
 
-@app.route('/login/google')
+@bp.route('/login/google')
 def login_google():
     # Mengarahkan user ke Google
-    redirect_uri = url_for('google_auth', _external=True)
+    redirect_uri = url_for('main.google_auth', _external=True)
     print(f"Redirect URI yang dikirim ke Google: {redirect_uri}")
-    return google.authorize_redirect(redirect_uri)
+    return get_google().authorize_redirect(redirect_uri)
 
-@app.route('/auth/google/callback')
+@bp.route('/auth/google/callback')
 def google_auth():
     try:
+        google = get_google()
         token = google.authorize_access_token()
-        # Cara paling aman mengambil data user
-        respon = google.get('https://openidconnect.googleapis.com/v1/userinfo')
-        user_info = respon.json()
+        # Endpoint userinfo diambil dari metadata OIDC (Google: openidconnect.googleapis.com/v1/userinfo)
+        user_info = google.userinfo(token=token)
         
         print(f"DEBUG USER_INFO: {user_info}") # LIHAT DI TERMINAL 
 
         email = user_info.get('email')
         if not email:
             flash("Gagal mendapatkan email dari Google.", "error")
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
 
         user = db.session.query(User).filter_by(email=email).first()
 
@@ -184,8 +344,8 @@ def google_auth():
         flash(f'Login berhasil! Selamat datang {user.first_name}', 'success')
         
         if user.role == RoleEnum.ADMIN:
-            return redirect(url_for('admin_dashboard'))
-        return redirect(url_for('dashboard'))
+            return redirect(url_for('main.admin_dashboard'))
+        return redirect(url_for('main.dashboard'))
 
     except Exception as e:
         db.session.rollback()
@@ -194,26 +354,21 @@ def google_auth():
         traceback.print_exc() 
         print(f"Error Detail: {str(e)}")
         flash("Gagal login dengan Google.", "error")
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
 
     except Exception as e:
         db.session.rollback()
         print(f"Error saat Google Auth: {str(e)}")
         flash("Gagal login dengan Google.", "error")
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
 
-@app.route('/dashboard')
+@bp.route('/dashboard')
 @login_required
+@conditional(Product, Order, Cart)
 def dashboard():
-    user = db.session.query(User).options(joinedload(User.image_profile)).filter_by(id=current_user.id).first()
-    user.profile_image_url = None
-    if user.image_profile:
-        img = user.image_profile[0]
-        if img.file_data:
-            base64_data = base64.b64encode(img.file_data).decode('utf-8')
-            user.profile_image_url = f"data:{img.file_type};base64,{base64_data}"
+    user = current_user_view()
     if current_user.is_admin():
-        return redirect(url_for('admin_dashboard'))
+        return redirect(url_for('main.admin_dashboard'))
     
     try:
         # Query order counts per status (lebih efisien)
@@ -231,60 +386,26 @@ def dashboard():
         approve = status_counts.get('APPROVE', 0)
         cancel = status_counts.get('CANCEL', 0)
         
-        # Query all orders (jika masih diperlukan untuk ditampilkan)
-        orders = db.session.query(Order).filter_by(user_id=current_user.id).all()
-        
-        # Query products with images
-        products = db.session.query(Product).options(joinedload(Product.images)).all()
-        
-        # Process each product to handle memoryview/image data
-        processed_products = []
-        for product in products:
-            product_data = {
-                'id': product.id,
-                'product_name': product.product_name,
-                'product_price': product.product_price,
-                'product_stock': product.product_stock,
-                'product_category': product.product_category,
-                'product_image': None
-            }
-
-            # Ambil gambar pertama jika ada
-            if product.images and len(product.images) > 0:
-                first_image = product.images[0]
-                if first_image.file_data:
-                    try:
-                        # Cek format data URI
-                        if isinstance(first_image.file_data, str) and first_image.file_data.startswith('data:'):
-                            product_data['product_image'] = first_image.file_data
-                        else:
-                            # Convert memoryview/bytes to base64
-                            image_bytes = bytes(first_image.file_data)
-                            mime_type = detect_mime_type(image_bytes)
-                            base64_image = base64.b64encode(image_bytes).decode('utf-8')
-                            product_data['product_image'] = f'data:{mime_type};base64,{base64_image}'
-                    except Exception as e:
-                        print(f"Error processing image for product {product.id}: {e}")
-            
-            processed_products.append(product_data)
+        # Grid produk dari fragment cache (di-render ulang hanya jika katalog berubah)
+        product_grid, product_count = render_product_grid('dashboard')
             
     except Exception as e:
         print(f"Error loading dashboard: {e}")
         import traceback
         traceback.print_exc()
-        processed_products = []
-        orders = []
+        product_grid, product_count = '', 0
         pending = approve = cancel = 0
 
     return render_template('dashboard.html', 
                          user=user, 
-                         products=processed_products, 
-                         orders=orders, 
+                         product_grid=product_grid, 
+                         product_count=product_count, 
                          pending=pending, 
                          approve=approve, 
                          cancel=cancel)
-@app.route('/admin/dashboard')
+@bp.route('/admin/dashboard')
 @login_required
+@conditional(Product, Order, User)
 def admin_dashboard():
     users = db.session.query(User).all()
     total_admins = len([user for user in users if user.is_admin()])
@@ -296,102 +417,74 @@ def admin_dashboard():
     ).order_by(Order.created_at.desc()).all()
     if not current_user.is_admin():
         flash('Akses ditolak! Halaman ini hanya untuk admin.', 'error')
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('main.dashboard'))
     return render_template('admin_dashboard.html', users=users, total_admins=total_admins, total_users=total_users, total_products=total_products, orders=orders)
 
-@app.route('/admin/products', methods=['GET', 'POST'])
+@bp.route('/admin/products/data')
+@login_required
+@conditional(Product)
+def admin_products_data():
+    """Listing DataTables produk (read-only, bisa di-cache browser dan server)"""
+    if not current_user.is_admin():
+        return jsonify({'data': [], 'error': 'Unauthorized'}), 403
+    return jsonify({'data': listing_data('products', request.args)})
+
+@bp.route('/admin/orders/data')
+@login_required
+@conditional(Order, User)
+def admin_orders_data():
+    """Listing DataTables pesanan (read-only, bisa di-cache browser dan server)"""
+    if not current_user.is_admin():
+        return jsonify({'data': [], 'error': 'Unauthorized'}), 403
+    return jsonify({'data': listing_data('orders', request.args)})
+
+@bp.route('/admin/users/data')
 @login_required
+@conditional(User)
+def admin_users_data():
+    """Listing DataTables user (read-only, bisa di-cache browser dan server)"""
+    if not current_user.is_admin():
+        return jsonify({'data': [], 'error': 'Unauthorized'}), 403
+    return jsonify({'data': listing_data('users', request.args)})
+
+@bp.route('/admin/products', methods=['GET', 'POST'])
+@login_required
+@conditional(Product, Order, User)
 def admin_products():
-    users = db.session.query(User).all()
-    total_products = db.session.query(Product).count()
-    total_admins = len([user for user in users if user.is_admin()])
-    total_users = len(users) - total_admins
-    orders = db.session.query(Order).options(
-        joinedload(Order.product_orders).joinedload(ProductOrder.product),
-        joinedload(Order.user)
-    ).order_by(Order.created_at.desc()).all()
     if not current_user.is_admin():
         flash('Akses ditolak!', 'error')
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('main.dashboard'))
 
     if request.method == 'POST':
+        # Kompatibilitas: listing sekarang diambil lewat GET /admin/products/data
         try:
-            # Ambil filter dari request.form
-            name_filter = request.form.get('name', '').strip()
-            category_filter = request.form.get('category', '').strip()
-            max_price_filter = request.form.get('maxPrice', '').strip()
-            status_filter = request.form.get('status', '').strip()
-
-            # Query dengan joinedload 'images' sesuai model Product Anda
-            query = db.session.query(Product).options(joinedload(Product.images))
-
-            if name_filter:
-                query = query.filter(func.lower(Product.product_name).like(f'%{name_filter.lower()}%'))
-            if category_filter:
-                query = query.filter(Product.product_category == category_filter)
-            if max_price_filter:
-                try:
-                    query = query.filter(Product.product_price <= float(max_price_filter))
-                except ValueError: pass
-            
-            if status_filter:
-                if status_filter.lower() == 'aktif':
-                    query = query.filter(Product.product_status == True)
-                elif status_filter.lower() == 'nonaktif':
-                    query = query.filter(Product.product_status == False)
-
-            products = query.order_by(Product.id.desc()).all()
-            
-            data = []
-            for p in products:
-                # --- LOGIKA GAMBAR ---
-                img_base64 = None
-                if p.images and len(p.images) > 0:
-                    first_img = p.images[0]
-                    if first_img.file_data:
-                        try:
-                            b64 = base64.b64encode(first_img.file_data).decode('utf-8')
-                            img_base64 = f"data:{first_img.file_type};base64,{b64}"
-                        except: img_base64 = None
-
-                # Pastikan harga dikonversi ke float sebelum diformat
-                try:
-                    raw_price = float(p.product_price) if p.product_price else 0
-                    price_formatted = f"{raw_price:,.0f}"
-                except (ValueError, TypeError):
-                    price_formatted = "0"
-
-                # --- LOGIKA STATUS ---
-                display_status = 'Available' if p.product_status else 'Unavailable'
-                if (p.product_stock or 0) <= 0:
-                    display_status = 'Out Of Stock'
-
-                data.append({
-                    'product_id': p.id,
-                    'product_name': p.product_name,
-                    'product_category': p.product_category or 'Tanpa Kategori',
-                    'product_price': price_formatted,
-                    'product_stock': p.product_stock or 0,
-                    'product_status': display_status,
-                    'product_image': img_base64
-                })
-
-            return jsonify({'data': data})
-
+            return jsonify({'data': listing_data('products', request.form)})
         except Exception as e:
             print(f"DEBUG ERROR: {str(e)}")
             return jsonify({'data': [], 'error': str(e)}), 500
 
-    # GET Request: Ambil statistik untuk tampilan awal
-    stats = {
-        'total': db.session.query(Product).count(),
-        'active': db.session.query(Product).filter(Product.product_status == True).count(),
-        'low': db.session.query(Product).filter(Product.product_stock < 10, Product.product_stock > 0).count(),
-        'out': db.session.query(Product).filter(Product.product_stock <= 0).count()
-    }
-    
-    return render_template('admin_produk.html', **stats, can_update=True, can_delete=True, user=users, total_products=total_products, orders=orders, total_admins=total_admins, total_users=total_users)
-@app.route('/admin/products/delete/<int:product_id>', methods=['DELETE'])
+    # GET Request: statistik inventori satu query (product_stats.py), sidebar cukup dari COUNT
+    stats = inventory_stats()
+    role_counts = dict(db.session.query(User.role, func.count(User.id)).group_by(User.role).all())
+    total_admins = role_counts.get(RoleEnum.ADMIN, 0)
+    total_users = sum(role_counts.values()) - total_admins
+    total_orders = db.session.query(func.count(Order.id)).scalar()
+
+    return render_template('admin_produk.html', **stats, can_update=True, can_delete=True,
+                           total_products=stats['total'], total_orders=total_orders, total_admins=total_admins,
+                           total_users=total_users, categories=category_stats(), low_stock=low_stock_products())
+
+@bp.route('/admin/products/stats')
+@login_required
+@conditional(Product)
+def admin_products_stats():
+    """Statistik inventori, nilai stok per kategori dan daftar stok menipis"""
+    if not current_user.is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    return jsonify({'inventory': inventory_stats(), 'categories': category_stats(),
+                    'low_stock': low_stock_products(request.args.get('limit', 20, type=int))})
+
+@bp.route('/admin/products/delete/<int:product_id>', methods=['DELETE'])
 @login_required
 def admin_delete_product(product_id):
     try:
@@ -414,7 +507,7 @@ def admin_delete_product(product_id):
         # Hapus file gambar jika ada
         if product.product_image:
             try:
-                image_path = os.path.join(app.config['UPLOAD_FOLDER'], product.product_image)
+                image_path = os.path.join(current_app.config['UPLOAD_FOLDER'], product.product_image)
                 if os.path.exists(image_path):
                     os.remove(image_path)
                     print(f"✓ Image deleted: {image_path}")
@@ -422,6 +515,7 @@ def admin_delete_product(product_id):
                 print(f"⚠️  Error deleting image: {e}")
         
         db.session.delete(product)
+        bump_cache_version('catalog')
         db.session.commit()
         
         print(f"✓ Product '{product_name}' deleted successfully")
@@ -450,7 +544,7 @@ def admin_delete_product(product_id):
     finally:
         db.session.close()
 
-@app.route('/admin/add-product', methods=['GET', 'POST'])
+@bp.route('/admin/add-product', methods=['GET', 'POST'])
 @login_required
 def admin_add_product():
     users = db.session.query(User).all()
@@ -500,65 +594,20 @@ def admin_add_product():
 
             
             
-            # Handle upload gambar
-            image_uploaded = False
-            if 'product_image' in request.files:
-                image_file = request.files['product_image']
-                if image_file and image_file.filename != '':
-                    # Validasi tipe file
-                    allowed_extensions = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
-                    if '.' in image_file.filename and \
-                       image_file.filename.rsplit('.', 1)[1].lower() in allowed_extensions:
-                        
-                        # Baca file sebagai binary
-                        image_data = image_file.read()
-                        
-                        # Validasi ukuran file (max 5MB)
-                        if len(image_data) > 5 * 1024 * 1024:
-                            flash('Ukuran gambar terlalu besar. Maksimal 5MB.', 'error')
-                            db.session.rollback()
-                            return render_template('admin_add_produk.html')
-                        
-                        from werkzeug.utils import secure_filename
-                        import base64
-                        
-                        filename = secure_filename(image_file.filename)
-                        file_size = len(image_data)
-                        file_extension = filename.rsplit('.', 1)[1].lower() if '.' in filename else 'jpeg'
-                        
-                        mime_types = {
-                            'png': 'image/png',
-                            'jpg': 'image/jpeg',
-                            'jpeg': 'image/jpeg',
-                            'gif': 'image/gif',
-                            'webp': 'image/webp'
-                        }
-                        
-                        file_type = mime_types.get(file_extension, 'image/jpeg')
-
-                        
-                        
-                        # Untuk tabel Image (simpan sebagai base64 string)
-                        
-                        
-                        new_image = Image(
-                            product_id=new_product.id,
-                            file_data=image_data,
-                            file_name=filename,
-                            file_size=file_size,
-                            file_type=file_type
-                        )
-
-                        new_product.images.append(new_image)
-                        image_uploaded = True
-                    else:
-                        flash('Format file tidak didukung. Gunakan PNG, JPG, JPEG, GIF, atau WebP.', 'error')
-                        db.session.rollback()
-                        return render_template('admin_add_produk.html')
+            # Handle upload gambar (ukuran dibatasi saat upload, tipe dari magic bytes, lihat uploads.py)
+            try:
+                image = image_upload(request.files.get('product_image'))
+            except UploadRejected as e:
+                flash(str(e), 'error')
+                db.session.rollback()
+                return render_template('admin_add_produk.html')
+            if image:
+                new_product.images.append(Image(**image))
             db.session.add(new_product)
+            bump_cache_version('catalog')
             db.session.commit()
             flash('Produk berhasil ditambahkan!', 'success')
-            return redirect(url_for('admin_products'))
+            return redirect(url_for('main.admin_products'))
             
         except Exception as e:
             db.session.rollback()
@@ -569,12 +618,12 @@ def admin_add_product():
     
     return render_template('admin_add_produk.html', users=users, total_admins=total_admins, total_users=total_users, total_products=total_products, orders=orders) 
 
-@app.route('/admin/edit-product')
+@bp.route('/admin/edit-product')
 @login_required
 def admin_edit_product():
     if not current_user.is_admin():
         flash('Akses ditolak! Halaman ini hanya untuk admin.', 'error')
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('main.dashboard'))
     
     # Ambil produk yang akan diedit
     product = db.session.query(Product).filter_by(id=request.args.get('product_id')).first()
@@ -586,7 +635,7 @@ def admin_edit_product():
                          product=product, 
                          product_status_value=product_status_value)
 
-@app.route('/admin/update-product/<int:product_id>', methods=['POST'])
+@bp.route('/admin/update-product/<int:product_id>', methods=['POST'])
 @login_required
 def admin_update_product(product_id):
     if not current_user.is_admin():
@@ -610,29 +659,23 @@ def admin_update_product(product_id):
 
         # 3. Konversi tipe data
         product.product_price = int(product_price)
-        product.product_stock = int(product_stock) if product_stock else 0
+        set_stock(product, int(product_stock) if product_stock else 0)
         product.product_status = (product_status == '1')
         
         # 4. Handle Gambar (jika ada upload baru)
-        if 'product_image' in request.files:
-            image_file = request.files['product_image']
-            if image_file and image_file.filename != '':
-                # Hapus gambar lama jika ada
-                if product.images:
-                    for img in product.images:
-                        db.session.delete(img)
-                
-                image_data = image_file.read()
-                new_image = Image(
-                    product_id=product.id,
-                    file_data=image_data,
-                    file_name=image_file.filename,
-                    file_size=len(image_data),
-                    file_type=image_file.content_type
-                )
-                db.session.add(new_image)
+        try:
+            image = image_upload(request.files.get('product_image'))
+        except UploadRejected as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'message': str(e)}), 400
+        if image:
+            # Hapus gambar lama jika ada
+            for img in product.images:
+                db.session.delete(img)
+            db.session.add(Image(product_id=product.id, **image))
 
         product.updated_at = datetime.now()
+        bump_cache_version('catalog')
         db.session.commit()
         
         # WAJIB: Mengembalikan JSON, bukan redirect/render_template
@@ -643,12 +686,13 @@ def admin_update_product(product_id):
         # Jika error, kirim pesan error dalam bentuk JSON
         return jsonify({'success': False, 'message': f'Terjadi kesalahan server: {str(e)}'}), 500
 
-@app.route('/admin/orders', methods=['GET', 'POST'])
+@bp.route('/admin/orders', methods=['GET', 'POST'])
 @login_required
+@conditional(Product, Order, User)
 def admin_orders():
     if not current_user.is_admin():
         flash('Akses ditolak! Halaman ini hanya untuk admin.', 'error')
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('main.dashboard'))
 
     # Ambil data Admin yang sedang login untuk Sidebar (base-admin.html)
     admin_obj = db.session.query(User).options(joinedload(User.image_profile)).filter_by(id=current_user.id).first()
@@ -660,102 +704,16 @@ def admin_orders():
             admin_profile_url = f"data:{img.file_type};base64,{base64_admin}"
     current_user.profile_image_url = admin_profile_url
 
-    # Handle POST request untuk DataTables AJAX
+    # Kompatibilitas: listing sekarang diambil lewat GET /admin/orders/data
     if request.method == 'POST':
-        customer_filter = request.form.get('customer', '').strip()
-        date_filter = request.form.get('date', '').strip()
-        max_amount = request.form.get('maxAmount', '').strip()
-        status_filter = request.form.get('status', '').strip()
-        
-        # Query orders dengan joins dan eager load profil image user
-        query = db.session.query(Order).options(
-            joinedload(Order.product_orders).joinedload(ProductOrder.product),
-            joinedload(Order.user).joinedload(User.image_profile)
-        )
-        
-        # Filter logic
-        if customer_filter:
-            query = query.join(Order.user).filter(
-                db.or_(
-                    User.first_name.ilike(f'%{customer_filter}%'),
-                    User.last_name.ilike(f'%{customer_filter}%'),
-                    User.email.ilike(f'%{customer_filter}%')
-                )
-            )
-        
-        if date_filter:
-            try:
-                filter_date = datetime.strptime(date_filter, '%Y-%m-%d').date()
-                query = query.filter(db.func.date(Order.created_at) == filter_date)
-            except ValueError:
-                pass
-        
-        if max_amount:
-            try:
-                query = query.filter(Order.amount <= float(max_amount))
-            except ValueError:
-                pass
-        
-        if status_filter:
-            if status_filter.lower() == 'pending':
-                query = query.filter(Order.status == OrderStatusEnum.PENDING)
-            elif status_filter.lower() == 'approve':
-                query = query.filter(Order.status == OrderStatusEnum.APPROVE)
-            elif status_filter.lower() == 'cancel':
-                query = query.filter(Order.status == OrderStatusEnum.CANCEL)
-        
-        orders = query.order_by(Order.created_at.desc()).all()
-        
-        data = []
-        for order in orders:
-            # Hitung total items
-            total_items = sum((po.quantity or 0) for po in order.product_orders)
-            amount_formatted = "{:,.0f}".format(order.amount or 0)
-            
-            # LOGIKA IMAGE PROFILE PELANGGAN
-            u = order.user
-            customer_avatar = None
-            if u.image_profile:
-                img_u = u.image_profile[0]
-                if img_u.file_data:
-                    try:
-                        b64_u = base64.b64encode(img_u.file_data).decode('utf-8')
-                        customer_avatar = f"data:{img_u.file_type};base64,{b64_u}"
-                    except:
-                        customer_avatar = None
-            
-            # Jika tidak ada foto, gunakan UI-Avatars
-            if not customer_avatar:
-                customer_avatar = f"https://ui-avatars.com/api/?name={u.first_name}+{u.last_name}&background=0077b5&color=fff"
-            
-            customer_name = f"{u.first_name} {u.last_name}"
-            
-            data.append({
-                'id': order.id,
-                'user_id': order.user_id,
-                'total_items': total_items,
-                'customer_name': customer_name,
-                'customer_email': u.email,
-                'customer_avatar': customer_avatar,
-                'created_at': order.created_at.isoformat(),
-                'date': order.created_at.strftime("%d %B %Y"),
-                'time': order.created_at.strftime("%H:%M"),
-                'amount': amount_formatted,
-                'payment_method': order.payment_method.value if order.payment_method else '-',
-                'status': order.status.value if hasattr(order.status, 'value') else str(order.status)
-            })
-        
-        return jsonify({'data': data})
+        return jsonify({'data': listing_data('orders', request.form)})
     
     # Handle GET request (Render Awal)
     user = db.session.query(User).all()
     total_admins = len([u for u in user if u.is_admin()])
     total_users = len(user) - total_admins
     total_products = db.session.query(Product).count()
-    orders_all = db.session.query(Order).options(
-        joinedload(Order.product_orders).joinedload(ProductOrder.product),
-        joinedload(Order.user)
-    ).all()
+    orders_all = db.session.query(Order).all()
     
     pending = sum(1 for o in orders_all if o.status == OrderStatusEnum.PENDING)
     approved = sum(1 for o in orders_all if o.status == OrderStatusEnum.APPROVE)
@@ -771,32 +729,73 @@ def admin_orders():
                            total_users=total_users,
                            total_products=total_products)
 
-@app.route('/admin/orders-detail/<int:order_id>/<int:user_id>')
+@bp.route('/admin/orders/events')
+@login_required
+def admin_order_events():
+    """Stream SSE order baru / perubahan status untuk tabel pesanan admin"""
+    if not current_user.is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    return event_stream_response()
+
+@bp.route('/admin/orders/<int:order_id>/status', methods=['POST'])
+@login_required
+def admin_update_order_status(order_id):
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'message': 'Akses ditolak!'}), 403
+
+    try:
+        new_status = OrderStatusEnum((request.get_json(silent=True) or {}).get('status', ''))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Status tidak valid'}), 400
+
+    try:
+        order = db.session.query(Order).filter_by(id=order_id).first()
+        if not order:
+            return jsonify({'success': False, 'message': 'Order tidak ditemukan'}), 404
+        if order.status != OrderStatusEnum.PENDING:
+            return jsonify({'success': False, 'message': 'Hanya order PENDING yang bisa diubah'}), 400
+
+        previous_status = order.status.value
+        if new_status == OrderStatusEnum.CANCEL:
+            cancel_order(order.id)
+        else:
+            order.status = new_status
+            db.session.commit()
+        # previous_status: counter status lama di halaman admin dikurangi meski barisnya tidak sedang tampil
+        publish_order_event('order_status', dict(order_rows({}, ids=[order_id])[0], previous_status=previous_status))
+        return jsonify({'success': True, 'message': f'Status order diubah menjadi {new_status.value}'})
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Terjadi kesalahan: {str(e)}'}), 500
+
+@bp.route('/admin/orders-detail/<int:order_id>/<int:user_id>')
 @login_required
 def admin_order_detail(order_id, user_id):
     # Cek admin terlebih dahulu
     if not current_user.is_admin():
         flash('Akses ditolak! Halaman ini hanya untuk admin.', 'error')
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('main.dashboard'))
     
     try:
         user = db.session.query(User).filter_by(id=user_id).first()
         if not user:
             flash('User tidak ditemukan!', 'error')
-            return redirect(url_for('admin_orders'))
+            return redirect(url_for('main.admin_orders'))
         
+        # Item order dirender dari snapshot di product_order_db, tanpa join ke produk/gambar
         order = db.session.query(Order).options(
-            joinedload(Order.product_orders).joinedload(ProductOrder.product).joinedload(Product.images)
-        ).filter_by(id=order_id, user_id=user.id).first()
+            joinedload(Order.product_orders)
+        ).filter_by(id=order_id, user_id=user.id).first() or archived_order(order_id, user.id)
         
         if not order:
             flash('Order tidak ditemukan untuk user ini!', 'error')
-            return redirect(url_for('admin_orders'))
+            return redirect(url_for('main.admin_orders'))
         
         # Format harga untuk setiap product_order
         for product_order in order.product_orders:
             # Format harga produk
-            product_price = float(product_order.product.product_price) if product_order.product.product_price else 0
+            product_price = float(product_order.unit_price or 0)
             product_order.formatted_price = "{:,.0f}".format(product_price)
             
             # Format subtotal (harga x quantity)
@@ -804,19 +803,8 @@ def admin_order_detail(order_id, user_id):
             subtotal = product_price * quantity
             product_order.formatted_subtotal = "{:,.0f}".format(subtotal)
             
-            # --- LOGIKA GAMBAR ---
-            img_base64 = None
-            if product_order.product.images and len(product_order.product.images) > 0:
-                first_img = product_order.product.images[0]
-                if first_img.file_data:
-                    try:
-                        b64 = base64.b64encode(first_img.file_data).decode('utf-8')
-                        img_base64 = f"data:{first_img.file_type};base64,{b64}"
-                    except:
-                        img_base64 = None
-            
-            # Simpan gambar ke product_order untuk diakses di template
-            product_order.product_image = img_base64 if img_base64 else 'https://via.placeholder.com/48'
+            # Thumbnail diambil browser lewat route product_image
+            product_order.product_image = url_for('main.product_image', product_id=product_order.product_id) if product_order.product_id else 'https://via.placeholder.com/48'
         
         # Format total order
         order_amount = float(order.amount) if order.amount else 0
@@ -850,14 +838,15 @@ def admin_order_detail(order_id, user_id):
         import traceback
         traceback.print_exc()
         flash('Terjadi kesalahan saat mengambil data order: ' + str(e), 'error')
-        return redirect(url_for('admin_orders'))
+        return redirect(url_for('main.admin_orders'))
 
-@app.route('/admin/users', methods=['GET', 'POST'])
+@bp.route('/admin/users', methods=['GET', 'POST'])
 @login_required
+@conditional(Product, Order, User)
 def admin_users():
     if not current_user.is_admin():
         flash('Akses ditolak! Halaman ini hanya untuk admin.', 'error')
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('main.dashboard'))
 
     # 1. Ambil data Admin yang sedang login (untuk sidebar base-admin.html)
     # Kita ambil objek admin secara terpisah agar profile_image_url bisa ditempelkan
@@ -873,52 +862,9 @@ def admin_users():
     # Simpan ke current_user agar bisa diakses oleh sidebar di template manapun
     current_user.profile_image_url = admin_profile_url
 
-    # 2. LOGIKA POST (Request dari DataTables AJAX)
+    # 2. LOGIKA POST (kompatibilitas, listing sekarang lewat GET /admin/users/data)
     if request.method == 'POST':
-        name_filter = request.form.get('name', '').strip()
-        email_filter = request.form.get('email', '').strip()
-        role_filter = request.form.get('role', '').strip()
-        gender_filter = request.form.get('gender', '').strip()
-        
-        # Query User dengan eager load gambar
-        query = db.session.query(User).options(joinedload(User.image_profile))
-        
-        if name_filter:
-            query = query.filter(User.first_name.ilike(f'%{name_filter}%'))
-        if email_filter:
-            query = query.filter(User.email.ilike(f'%{email_filter}%'))
-        if role_filter:
-            query = query.filter(User.role == role_filter.upper())
-        if gender_filter:
-            query = query.filter(User.gender == gender_filter.upper())
-        
-        filtered_users = query.all()
-        
-        data_list = []
-        for u in filtered_users:
-            # Konversi gambar tiap user di tabel
-            u_pic = None
-            if u.image_profile:
-                img_u = u.image_profile[0]
-                if img_u.file_data:
-                    try:
-                        b64_u = base64.b64encode(img_u.file_data).decode('utf-8')
-                        u_pic = f"data:{img_u.file_type};base64,{b64_u}"
-                    except:
-                        u_pic = None
-
-            data_list.append({
-                'id': u.id,
-                'first_name': u.first_name,
-                'last_name': u.last_name or '',
-                'email': u.email,
-                'role': u.role.value if hasattr(u.role, 'value') else str(u.role),
-                'gender': u.gender.value if hasattr(u.gender, 'value') else str(u.gender),
-                'birth_date': u.birth_date.strftime("%d %B %Y") if u.birth_date else '-',
-                'profile_picture': u_pic
-            })
-        
-        return jsonify({'data': data_list})
+        return jsonify({'data': listing_data('users', request.form)})
     
     # 3. LOGIKA GET (Render Halaman Pertama Kali)
     users_all = db.session.query(User).all()
@@ -938,7 +884,7 @@ def admin_users():
                          orders=orders,
                          can_update=True)
 
-@app.route('/admin/add-user', methods=['GET', 'POST'])
+@bp.route('/admin/add-user', methods=['GET', 'POST'])
 @login_required
 def admin_add_user():
     users = db.session.query(User).all()
@@ -969,6 +915,12 @@ def admin_add_user():
                     'message': 'Password dan konfirmasi password tidak cocok!'
                 }), 400
             
+            if password_too_long(password):
+                return jsonify({
+                    'success': False,
+                    'message': 'Password terlalu panjang!'
+                }), 400
+            
             # Cek email sudah digunakan
             if db.session.query(User).filter_by(email=email).first():
                 return jsonify({
@@ -981,7 +933,7 @@ def admin_add_user():
                 first_name=first_name,
                 last_name=last_name,
                 email=email,
-                password_hash=generate_password_hash(password),
+                password_hash=hash_password(password),
                 phone_number=phone_number,
                 address=address,
                 role=RoleEnum(role) if role else RoleEnum.USER
@@ -1002,7 +954,11 @@ def admin_add_user():
                 'success': True,
                 'message': 'User berhasil ditambahkan!'
             }), 201
-            
+
+        except PasswordHasherBusy:
+            # Dijawab 503 + Retry-After oleh handler di passwords.py, bukan 500
+            db.session.rollback()
+            raise
         except Exception as e:
             db.session.rollback()
             print(f'Error menambahkan user: {e}')
@@ -1017,7 +973,7 @@ def admin_add_user():
     # GET request - tampilkan form
     return render_template('admin_add_user.html', users=users, total_admins=total_admins, total_users=total_users, total_products=total_products, orders=orders)
 
-@app.route('/admin/edit-user')
+@bp.route('/admin/edit-user')
 @login_required
 def admin_edit_user():
     user = db.session.query(User).filter_by(id=request.args.get('user_id')).first()
@@ -1032,7 +988,7 @@ def admin_edit_user():
     return render_template('admin_edit_user.html', user=user, users=users, total_admins=total_admins, total_users=total_users, total_products=total_products, orders=orders)
 
 
-@app.route('/admin/update-user/<int:user_id>', methods=['POST'])
+@bp.route('/admin/update-user/<int:user_id>', methods=['POST'])
 @login_required
 def admin_update_user(user_id):
     if not current_user.is_admin():
@@ -1064,35 +1020,87 @@ def admin_update_user(user_id):
                 base64_image = base64.b64encode(image_data).decode('utf-8')
                 user.profile_picture = f"data:{file.content_type};base64,{base64_image}"
 
+        user.updated_at = datetime.now()
+        bump_identity(user)
         db.session.commit()
         return jsonify({'success': True, 'message': 'Profil user berhasil diperbarui'})
 
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'message': f'Terjadi kesalahan: {str(e)}'}), 500
-@app.route('/admin/report')
+@bp.route('/admin/report')
 @login_required
 def admin_report():
     if not current_user.is_admin():
         flash('Akses ditolak! Halaman ini hanya untuk admin.', 'error')
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('main.dashboard'))
     return render_template('admin_report.html')
 
-@app.route('/logout')
+@bp.route('/admin/cache/stats')
+@login_required
+def admin_cache_stats():
+    if not current_user.is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    return jsonify(get_fragment_cache().stats())
+
+@bp.route('/admin/template-profile')
+@login_required
+def admin_template_profile():
+    if not current_user.is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    if request.args.get('reset'):
+        template_profile.reset()
+    return jsonify(template_profile.report())
+
+@bp.route('/admin/outbound')
+@login_required
+def admin_outbound():
+    """Status circuit breaker dan latensi panggilan ke Midtrans / Google"""
+    if not current_user.is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    if request.args.get('reset'):
+        for name in current_app.extensions['outbound']:
+            get_dependency(name).reset_metrics()
+    return jsonify(outbound_stats())
+
+@bp.route('/admin/passwords')
+@login_required
+def admin_passwords():
+    """Metode hash, antrian process pool dan latensi hash/verify password"""
+    if not current_user.is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    if request.args.get('reset'):
+        current_app.extensions['passwords'].reset_metrics()
+    return jsonify(password_stats())
+
+@bp.route('/admin/admission')
+@login_required
+def admin_admission():
+    """Antrian, request aktif dan waktu tunggu per gate admission di worker ini"""
+    if not current_user.is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    if request.args.get('reset'):
+        for gate in current_app.extensions['admission'].gates.values():
+            gate.reset_metrics()
+    return jsonify(admission_stats())
+
+@bp.route('/logout')
 @login_required
 def logout():
     logout_user()
+    forget_identity()
     flash('Anda telah logout!', 'info')
-    return redirect(url_for('login'))
+    return redirect(url_for('main.login'))
 
-@app.route('/admin/user/<int:user_id>/toggle', methods=['POST'])
+@bp.route('/admin/user/<int:user_id>/toggle', methods=['POST'])
 @login_required
 def toggle_user_status(user_id):
     if not current_user.is_admin():
         return jsonify({'error': 'Unauthorized'}), 403
     
-    user = db.session.query(User).filter_by(id=user_id).get_or_404(user_id)
+    user = db.get_or_404(User, user_id)
     user.is_active = not user.is_active
+    bump_identity(user)
     db.session.commit()
     
     status = 'aktif' if user.is_active else 'non-aktif'
@@ -1101,128 +1109,271 @@ def toggle_user_status(user_id):
         'is_active': user.is_active
     })
 
-# Create tables and default admin
-with app.app_context():
-    db.create_all()
-    
-    # Create default admin user if not exists
-    if not db.session.query(User).filter_by(email='admin@example.com').first():
+@bp.cli.command('init-db')
+def init_db_command():
+    """Buat semua tabel (jalankan sekali saat deploy, bukan saat import)"""
+    Base.metadata.create_all(bind=db.engine)
+    if db.engine.dialect.name == 'postgresql':
+        # Tabel order masih kosong, jadi partisi bulanan (migrasi 0012) langsung diterapkan di sini
+        context = MigrationContext(db.engine)
         try:
-            admin = User(
-                first_name='Admin',
-                last_name='System',
-                email='admin@example.com', 
-                role='admin'
-            )
-            admin.set_password('admin123')
-            db.session.add(admin)
-            db.session.commit()
-            print("Admin user created successfully")
-        except Exception as e:
-            print(f"Error creating admin user: {e}")
-            db.session.rollback()
+            partition_orders(context)
         finally:
-            db.session.close()
+            context.close()
+    # create_all sudah memakai model terbaru, jadi semua migrasi dianggap sudah jalan
+    stamp_all(db.engine)
+    # Baris versi cache sudah ada sebelum checkout pertama, bump cukup satu UPDATE
+    ensure_cache_version('catalog')
+    db.session.commit()
+    click.echo('Tabel berhasil dibuat')
+
+
+@bp.cli.command('seed-admin')
+@click.option('--email', default=lambda: os.environ.get('DEFAULT_ADMIN_EMAIL', 'admin@example.com'))
+@click.option('--password', default=lambda: os.environ.get('DEFAULT_ADMIN_PASSWORD', 'admin123'))
+def seed_admin_command(email, password):
+    """Create default admin user if not exists"""
+    if db.session.query(User).filter_by(email=email).first():
+        click.echo(f'Admin {email} sudah ada')
+        return
+    try:
+        admin = User(
+            first_name='Admin',
+            last_name='System',
+            email=email,
+            role=RoleEnum.ADMIN
+        )
+        admin.set_password(password)
+        db.session.add(admin)
+        db.session.commit()
+        click.echo('Admin user created successfully')
+    except Exception as e:
+        db.session.rollback()
+        raise click.ClickException(f'Error creating admin user: {e}')
+    finally:
+        db.session.close()
 import base64
 
-@app.route('/produk-user')
+@bp.route('/product/<int:product_id>/image')
 @login_required
+def product_image(product_id):
+    """Gambar pertama produk sebagai file, dipakai sebagai thumbnail di listing"""
+    image = db.session.query(Image).filter_by(product_id=product_id).order_by(Image.id).first()
+    if not image or not image.file_data:
+        return '', 404
+    response = current_app.response_class(bytes(image.file_data), mimetype=image_mime_type(image.file_type, image.file_data))
+    response.headers['Cache-Control'] = 'private, max-age=3600'
+    return response
+
+@bp.route('/user/<int:user_id>/avatar')
+@login_required
+def user_avatar(user_id):
+    """Foto profil user sebagai file (pengganti data URI base64 di setiap halaman)"""
+    if current_user.id != user_id and not current_user.is_admin():
+        return '', 403
+    image = db.session.query(ImageUsers).filter_by(user_id=user_id).order_by(ImageUsers.id).first()
+    if not image or not image.file_data:
+        return '', 404
+    response = current_app.response_class(bytes(image.file_data), mimetype=image.file_type)
+    response.headers['Cache-Control'] = 'private, max-age=86400'
+    return response
+
+@bp.route('/produk-user')
+@login_required
+@conditional(Product, Cart)
 def produk_user():
-    user = db.session.query(User).options(joinedload(User.image_profile)).filter_by(id=current_user.id).first()
-    user.profile_image_url = None
-    if user.image_profile:
-        img = user.image_profile[0]
-        if img.file_data:
-            base64_data = base64.b64encode(img.file_data).decode('utf-8')
-            user.profile_image_url = f"data:{img.file_type};base64,{base64_data}"
+    user = current_user_view()
     try:
-        products = db.session.query(Product).options(joinedload(Product.images)).all()
-        
-        # Process each product to handle memoryview/image data
-        processed_products = []
-        for product in products:
-            product_data = {
-                'id': product.id,
-                'product_name': product.product_name,
-                'product_price': product.product_price,
-                'product_stock': product.product_stock,
-                'product_category': product.product_category,
-                'product_image': None  # Default None
-            }
-
-            # Ambil gambar pertama jika ada
-            if product.images and len(product.images) > 0:
-                first_image = product.images[0]
-                if first_image.file_data:
-                    # Convert memoryview to bytes if necessary
-                    image_bytes = bytes(first_image.file_data)
-                    
-                    # Detect MIME type
-                    mime_type = detect_mime_type(image_bytes)
-                    
-                    # Encode to base64 for embedding in HTML
-                    base64_image = base64.b64encode(image_bytes).decode('utf-8')
-                    product_data['product_image'] = f'data:{mime_type};base64,{base64_image}'
-            
-            processed_products.append(product_data)
-        
-        return render_template('produk-user.html', products=processed_products, user=user)
+        product_grid, product_count = render_product_grid('catalog')
+        return render_template('produk-user.html', product_grid=product_grid, product_count=product_count, user=user)
         
     except Exception as e:
         print(f"Error loading products: {e}")
         import traceback
         traceback.print_exc()
-        return render_template('produk-user.html', products=[])
-
-
-# Helper function untuk deteksi MIME type
-def detect_mime_type(image_bytes):
-    """Deteksi MIME type dari file signature"""
-    # Check file signatures (magic numbers)
-    if image_bytes.startswith(b'\xff\xd8\xff'):
-        return 'image/jpeg'
-    elif image_bytes.startswith(b'\x89PNG\r\n\x1a\n'):
-        return 'image/png'
-    elif image_bytes.startswith(b'GIF87a') or image_bytes.startswith(b'GIF89a'):
-        return 'image/gif'
-    elif image_bytes.startswith(b'RIFF') and image_bytes[8:12] == b'WEBP':
-        return 'image/webp'
-    elif image_bytes.startswith(b'BM'):
-        return 'image/bmp'
-    else:
-        # Default fallback
-        return 'image/jpeg'
-    
-@app.route('/form-order-user', methods=['GET'])
+        return render_template('produk-user.html', product_grid='', product_count=0, user=user)
+
+
+def product_card_data(product, image_id=None):
+    """Dict untuk template kartu produk; gambar diambil browser lewat route product_image"""
+    return {
+        'id': product.id,
+        'product_name': product.product_name,
+        'product_price': product.product_price,
+        'product_stock': product.product_stock,
+        'product_category': product.product_category,
+        # v = id gambar pertama, berubah saat gambar diganti (URL lama tetap boleh di-cache browser)
+        'product_image': url_for('main.product_image', product_id=product.id, v=image_id) if image_id else None,
+    }
+
+
+PRODUCT_CARD_TEMPLATES = {
+    'catalog': 'partials/product_card_catalog.html',
+    'dashboard': 'partials/product_card_dashboard.html',
+}
+
+
+def render_product_grid(kind):
+    """HTML grid produk + jumlah produk, dari fragment cache.
+
+    Grid di-key dengan versi katalog. Saat versi naik, grid disusun ulang dari kartu yang
+    di-key per produk (id, updated_at, stok, badge NEW), jadi hanya kartu produk yang
+    berubah yang perlu di-render ulang. Kartu memuat URL gambar, bukan isi gambarnya.
+    """
+    cache = get_fragment_cache()
+    card_kind = f'card_{kind}'
+
+    def build_grid():
+        rows = db.session.query(
+            Product.id, Product.updated_at, Product.created_at, Product.product_stock
+        ).order_by(Product.id).all()
+
+        card_keys = []
+        for index, (product_id, updated_at, created_at, stock) in enumerate(rows, 1):
+            stamp = updated_at or created_at
+            is_new = index <= 4
+            key = f'{product_id}:{stamp.timestamp() if stamp else 0}:{stock}:{int(is_new)}'
+            card_keys.append((product_id, key, is_new))
+
+        cards = {product_id: cache.get(card_kind, key) for product_id, key, _ in card_keys}
+        missing = [product_id for product_id, html in cards.items() if html is None]
+        if missing:
+            products = db.session.query(Product).filter(Product.id.in_(missing)).all()
+            products_by_id = {p.id: p for p in products}
+            first_images = dict(db.session.query(Image.product_id, func.min(Image.id)).filter(
+                Image.product_id.in_(missing)).group_by(Image.product_id).all())
+            for product_id, key, is_new in card_keys:
+                product = products_by_id.get(product_id)
+                if product is None:
+                    continue
+                html = render_template(PRODUCT_CARD_TEMPLATES[kind], product=product_card_data(product, first_images.get(product_id)), is_new=is_new)
+                cache.set(card_kind, key, html)
+                cards[product_id] = html
+
+        grid = '\n'.join(cards[product_id] for product_id, _, _ in card_keys if cards.get(product_id))
+        return [grid, len(rows)]
+
+    grid, count = cache.get_or_render(f'grid_{kind}', str(get_cache_version('catalog')), build_grid)
+    return grid, count
+
+
+def current_user_view():
+    """Data user login untuk header/sidebar sebagai dict (foto profil lewat route, bukan base64)"""
+    user = current_user._get_current_object()
+    return {
+        'id': current_user.id,
+        'first_name': current_user.first_name,
+        'last_name': current_user.last_name,
+        'email': current_user.email,
+        'phone_number': current_user.phone_number,
+        'address': current_user.address,
+        # Snapshot identitas sudah membawa URL avatar; IDENTITY_TTL=0 memuat User biasa
+        'profile_image_url': user.avatar_url if isinstance(user, Identity) else avatar_url(current_user.id),
+    }
+
+
+def cart_item_views(*criteria):
+    """Item keranjang + kolom produk yang dipakai template, tanpa memuat BLOB gambar"""
+    rows = db.session.query(
+        Cart.id, Cart.quantity, Product.id.label('product_id'), Product.product_name,
+        Product.product_category, Product.product_price
+    ).join(Product, Cart.product_id == Product.id).filter(*criteria).order_by(Cart.id).all()
+
+    product_ids = {row.product_id for row in rows}
+    with_image = {pid for (pid,) in db.session.query(Image.product_id).filter(Image.product_id.in_(product_ids)).distinct()} if product_ids else set()
+
+    return [{
+        'id': row.id,
+        'quantity': row.quantity,
+        'product': {
+            'id': row.product_id,
+            'product_name': row.product_name,
+            'product_category': row.product_category,
+            'product_price': float(row.product_price or 0),
+            'image_url': url_for('main.product_image', product_id=row.product_id) if row.product_id in with_image else None,
+        },
+    } for row in rows]
+
+
+@bp.route('/form-order-user', methods=['GET'])
 @login_required
 def form_order_user():
-    user = db.session.query(User).options(joinedload(User.image_profile)).filter_by(id=current_user.id).first()
-    user_data = current_user
+    user = current_user_view()
+    user_data = user
     cart_ids = session.get('checkout_cart_ids', [])
     cart_items = []
-    user.profile_image_url = None
-    if user.image_profile:
-        img = user.image_profile[0]
-        if img.file_data:
-            base64_data = base64.b64encode(img.file_data).decode('utf-8')
-            user.profile_image_url = f"data:{img.file_type};base64,{base64_data}"
     if cart_ids:
-        cart_items = db.session.query(Cart).filter(Cart.id.in_(cart_ids), Cart.user_id == current_user.id).all()
-        for item in cart_items:
-            item.product.product_price = float(item.product.product_price or 0)
+        cart_items = cart_item_views(Cart.id.in_(cart_ids), Cart.user_id == current_user.id)
             
     product_id = request.args.get('product_id')
     product_now = None
     if product_id and not cart_items:
-        product_now = db.session.query(Product).get(product_id)
-        if product_now:
-            product_now.product_price = float(product_now.product_price or 0)
+        row = db.session.query(Product.id, Product.product_name, Product.product_price).filter_by(id=product_id).first()
+        if row:
+            product_now = {'id': row.id, 'product_name': row.product_name, 'product_price': float(row.product_price or 0)}
 
     return render_template('form_order_user.html', user_data=user_data, cart_items=cart_items, product_now=product_now, user=user)
 
 
-@app.route('/api/order/process', methods=['POST'])
+def snap_param(order_id, amount, items, customer):
+    return {
+        "transaction_details": {
+            # Suffix timestamp: order yang sama bisa meminta token baru (bayar ulang)
+            "order_id": f"ORDER-{order_id}-{int(datetime.now().timestamp())}",
+            "gross_amount": int(amount)
+        },
+        "item_details": items,
+        "customer_details": customer,
+        "usage_limit": 1
+    }
+
+
+def request_snap_token(order_id, param):
+    """Minta token Snap (panggil di luar transaksi DB), simpan midtrans_order_id jika berhasil"""
+    transaction = get_snap().create_transaction(param)
+    db.session.query(Order).filter_by(id=order_id).update(
+        {Order.midtrans_order_id: param['transaction_details']['order_id']}, synchronize_session=False
+    )
+    db.session.commit()
+    return transaction['token']
+
+
+def payment_gateway_down(error):
+    """Midtrans tidak bisa dihubungi/ sedang error, bukan request yang salah"""
+    from midtransclient.error_midtrans import JSONDecodeError
+
+    # JSONDecodeError (turunan Exception biasa): body bukan JSON, mis. halaman HTML 502 dari proxy
+    if isinstance(error, (DependencyUnavailable, requests.RequestException, JSONDecodeError)):
+        return True
+    status = getattr(error, 'http_status_code', None) or 0
+    return status >= 500 or status == 429
+
+
+def cancel_order(order_id):
+    """Batalkan order dan kembalikan stok yang sudah di-booking saat checkout (commit di sini)"""
+    order = db.session.query(Order).filter_by(id=order_id).first()
+    order.status = OrderStatusEnum.CANCEL
+    for item in db.session.query(ProductOrder).filter_by(order_id=order_id).all():
+        prod = db.session.query(Product).filter_by(id=item.product_id).first()
+        if prod:
+            release(prod, item.quantity)
+    db.session.commit()
+    bump_cache_version_now('catalog')
+
+
+def checkout_cart_context():
+    """Isi keranjang yang akan di-checkout (dari session), ikut fingerprint Idempotency-Key"""
+    cart_ids = session.get('checkout_cart_ids')
+    if not cart_ids:
+        return None
+    return [list(row) for row in db.session.query(Cart.id, Cart.product_id, Cart.quantity).filter(
+        Cart.user_id == current_user.id, Cart.id.in_(cart_ids)).order_by(Cart.id)]
+
+
+@bp.route('/api/order/process', methods=['POST'])
 @login_required
+@admitted('checkout')
+@idempotent(context=checkout_cart_context)
 def process_order():
     try:
         data = request.get_json()
@@ -1272,7 +1423,7 @@ def process_order():
                 "name": product.product_name[:50]
             })
 
-        # 2. Buat Order Baru di Database
+        # 2. Buat order, item dan booking stok dalam SATU transaksi singkat
         new_order = Order(
             user_id=current_user.id,
             amount=total_amount,
@@ -1283,70 +1434,142 @@ def process_order():
         
         db.session.add(new_order)
         db.session.flush() # Ambil ID order tanpa commit dulu
+        order_id = new_order.id
 
-        # 3. Logika Midtrans (Hanya jika TRANSFER_BANK)
-        snap_token = None
-        if payment_method == 'TRANSFER_BANK':
-            midtrans_order_id = f"ORDER-{new_order.id}-{int(datetime.now().timestamp())}"
-            
-            # Gabungkan nama depan dan belakang jika tersedia
-            full_name_db = f"{current_user.first_name or ''} {current_user.last_name or ''}".strip() or "Customer"
-
-            param = {
-                "transaction_details": {
-                    "order_id": midtrans_order_id,
-                    "gross_amount": int(total_amount)
-                },
-                "item_details": midtrans_items,
-                "customer_details": {
-                    "first_name": data.get('fullName') or full_name_db,
-                    "email": data.get('email') or current_user.email,
-                    "phone": data.get('phone') or current_user.phone_number or ""
-                },
-                "usage_limit": 1
-            }
-
-            transaction = snap.create_transaction(param)
-            snap_token = transaction['token']
-            new_order.midtrans_order_id = midtrans_order_id 
-
-        # 4. Simpan Detail Produk & Kurangi Stok
-        for prod, qty, cart_obj in items_to_order:
-            if prod.product_stock < qty:
+        # Urut per product id: reserve() mengunci baris stok sampai commit, urutan yang sama di semua
+        # checkout mencegah deadlock antara keranjang {X, Y} dan {Y, X}
+        for prod, qty, cart_obj in sorted(items_to_order, key=lambda item: item[0].id):
+            # Cek dan potong stok dalam satu UPDATE bersyarat (lihat stock.py), aman untuk checkout paralel
+            if not reserve(prod, qty):
                 db.session.rollback()
                 return jsonify({'success': False, 'message': f'Stok {prod.product_name} tidak cukup'}), 400
                 
             product_order = ProductOrder(
                 product_id=prod.id, 
-                order_id=new_order.id, 
-                quantity=qty
+                order_id=order_id, 
+                order_created_at=new_order.created_at,
+                quantity=qty,
+                unit_price=int(float(prod.product_price or 0)),
+                product_name=prod.product_name,
+                product_category=prod.product_category
             )
             db.session.add(product_order)
             
-            # Kurangi stok (Sistem "Booking")
-            prod.product_stock -= qty
-            
             if cart_obj:
                 db.session.delete(cart_obj)
 
-        # 5. Finalisasi
+        # Ringkasan untuk halaman listing order (order_user / admin_orders)
+        new_order.apply_summary([(prod.id, prod.product_name, qty) for prod, qty, _ in items_to_order])
+        # Stok berubah, grid katalog harus disusun ulang (setelah commit, lihat fragment_cache.py).
+        # Ringkasan stok produk mode shard diperbarui rebalancer, yang juga menaikkan versi
+        stock_changed = any(not prod.stock_shards for prod, _, _ in items_to_order)
+
+        # Parameter Midtrans disusun sebelum commit (atribut current_user kadaluarsa setelah commit)
+        midtrans_param = None
+        if payment_method == 'TRANSFER_BANK':
+            # Gabungkan nama depan dan belakang jika tersedia
+            full_name_db = f"{current_user.first_name or ''} {current_user.last_name or ''}".strip() or "Customer"
+
+            midtrans_param = snap_param(order_id, total_amount, midtrans_items, {
+                "first_name": data.get('fullName') or full_name_db,
+                "email": data.get('email') or current_user.email,
+                "phone": data.get('phone') or current_user.phone_number or ""
+            })
+
         db.session.commit()
         session.pop('checkout_cart_ids', None) # Bersihkan session checkout
 
+        # Order dan booking stok sudah di-commit: error setelah ini tidak boleh menjadi 500, karena
+        # @idempotent melepas key-nya dan retry klien akan membuat order kedua
+        snap_token = None
+        payment_deferred = False
+        cancelled = False
+        try:
+            if stock_changed:
+                bump_cache_version_now('catalog')
+
+            # 3. Midtrans dipanggil SETELAH commit: tidak ada lock/koneksi DB yang ditahan selama
+            #    menunggu HTTPS, dan di worker gevent greenlet lain tetap jalan
+            if midtrans_param:
+                try:
+                    snap_token = request_snap_token(order_id, midtrans_param)
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"MIDTRANS ERROR: {str(e)}")
+                    if payment_gateway_down(e):
+                        # Fallback: order tetap PENDING, token dibuat nanti dari halaman detail pesanan
+                        payment_deferred = True
+                    else:
+                        # Kompensasi: order dibatalkan dan stok yang sudah di-booking dikembalikan
+                        cancel_order(order_id)
+                        cancelled = True
+
+            publish_order_event('order_created', order_rows({}, ids=[order_id])[0])
+        except Exception as e:
+            db.session.rollback()
+            print(f"POST-COMMIT ERROR (order {order_id}): {str(e)}")
+            # Token bisa dibuat ulang dari halaman detail pesanan
+            payment_deferred = bool(midtrans_param and not snap_token and not cancelled)
+
+        if cancelled:
+            return jsonify({'success': False, 'message': 'Gagal menghubungi payment gateway, pesanan dibatalkan.'}), 502
+
+        if payment_deferred:
+            message = 'Pesanan disimpan. Payment gateway sedang sibuk, lanjutkan pembayaran dari detail pesanan.'
+        else:
+            message = 'Pesanan berhasil dibuat!' if payment_method == 'COD' else 'Silahkan selesaikan pembayaran.'
         return jsonify({
             'success': True, 
-            'message': 'Pesanan berhasil dibuat!' if payment_method == 'COD' else 'Silahkan selesaikan pembayaran.',
-            'snap_token': snap_token
+            'message': message,
+            'snap_token': snap_token,
+            'payment_deferred': payment_deferred,
+            'order_id': order_id
         }), 201
 
     except Exception as e:
         db.session.rollback()
         print(f"CRITICAL ERROR: {str(e)}")
         return jsonify({'success': False, 'message': 'Internal Server Error'}), 500
+
+
+@bp.route('/api/order/<int:order_id>/payment', methods=['POST'])
+@login_required
+def order_payment(order_id):
+    """Token Snap baru untuk order TRANSFER_BANK yang masih PENDING (pembayaran tertunda / diulang)"""
+    order = db.session.query(Order).options(joinedload(Order.product_orders)).filter_by(id=order_id).first()
+    if not order or order.user_id != current_user.id:
+        return jsonify({'success': False, 'message': 'Pesanan tidak ditemukan'}), 404
+    if order.status != OrderStatusEnum.PENDING or order.payment_method != PaymentMethodEnum.TRANSFER_BANK:
+        return jsonify({'success': False, 'message': 'Pesanan ini tidak menunggu pembayaran'}), 400
+
+    items = [{
+        "id": str(po.product_id),
+        "price": int(po.unit_price or 0),
+        "quantity": po.quantity,
+        "name": (po.product_name or '')[:50]
+    } for po in order.product_orders]
+    full_name_db = f"{current_user.first_name or ''} {current_user.last_name or ''}".strip() or "Customer"
+    param = snap_param(order.id, order.amount, items, {
+        "first_name": full_name_db,
+        "email": current_user.email,
+        "phone": current_user.phone_number or ""
+    })
+    # Lepas koneksi DB selama menunggu Midtrans
+    db.session.commit()
+
+    try:
+        snap_token = request_snap_token(order_id, param)
+    except Exception as e:
+        db.session.rollback()
+        print(f"MIDTRANS ERROR: {str(e)}")
+        if payment_gateway_down(e):
+            return jsonify({'success': False, 'message': 'Payment gateway sedang sibuk, coba lagi beberapa saat.'}), 503
+        return jsonify({'success': False, 'message': 'Gagal membuat pembayaran.'}), 502
+    return jsonify({'success': True, 'snap_token': snap_token})
     
 
 # webhook update payment status dari midtrans
-# @app.route('/api/payment/callback', methods=['POST'])
+# @bp.route('/api/payment/callback', methods=['POST'])
 # def midtrans_webhook():
 #     data = request.get_json()
 #     print("WEBHOOK DATA RECEIVED:", data)
@@ -1392,6 +1615,7 @@ def process_order():
 #                     prod.product_stock += item.quantity
 
 #         db.session.commit()
+#         publish_order_event('order_status', order_rows({}, ids=[order.id])[0])
 #         return "OK", 200
 
 #     except Exception as e:
@@ -1399,122 +1623,56 @@ def process_order():
 #         print(f"WEBHOOK ERROR: {str(e)}")
 #         return jsonify({"success": False, "error": "Internal Server Error"}), 500
 
-@app.route('/order-user')
+@bp.route('/order-user')
 @login_required
+@conditional(Order, OrderArchive, Cart)
 def order_user():
-    user = db.session.query(User).options(joinedload(User.image_profile)).filter_by(id=current_user.id).first()
-    user.profile_image_url = None
-    if user.image_profile:
-        img = user.image_profile[0]
-        if img.file_data:
-            base64_data = base64.b64encode(img.file_data).decode('utf-8')
-            user.profile_image_url = f"data:{img.file_type};base64,{base64_data}"
-    # Ambil data order dengan relasi produk dan gambarnya
-    orders = db.session.query(Order).options(
-        joinedload(Order.product_orders).joinedload(ProductOrder.product).joinedload(Product.images)
-    ).filter_by(user_id=current_user.id).order_by(Order.created_at.desc()).all()
-    
-    # Fungsi bantu untuk konversi gambar ke Base64
-    def get_image_data(product):
-        if product.images and len(product.images) > 0:
-            img = product.images[0]
-            if img.file_data:
-                try:
-                    if isinstance(img.file_data, str) and img.file_data.startswith('data:'):
-                        return img.file_data
-                    image_bytes = bytes(img.file_data)
-                    mime_type = detect_mime_type(image_bytes)
-                    base64_image = base64.b64encode(image_bytes).decode('utf-8')
-                    return f'data:{mime_type};base64,{base64_image}'
-                except Exception as e:
-                    print(f"Error: {e}")
-        return None
-
-    # Tambahkan atribut image_url ke setiap produk di dalam order secara dinamis
-    for order in orders:
-        for po in order.product_orders:
-            po.product.image_url = get_image_data(po.product)
-        
-    return render_template('order-user.html', orders=orders, user=user)
-
-@app.route('/order/detail/<int:order_id>')
+    user = current_user_view()
+    # Per halaman (cursor keyset) dan hanya kolom ringkasan; item lengkap hanya dimuat di order_detail
+    archived = bool(request.args.get('arsip'))
+    orders, next_cursor = order_history(current_user.id, request.args.get('cursor'),
+                                        current_app.config['ORDER_HISTORY_PAGE_SIZE'], archived=archived)
+    return render_template('order-user.html', orders=orders, user=user, archived=archived,
+                           next_cursor=next_cursor, first_page=not request.args.get('cursor'))
+
+@bp.route('/order/detail/<int:order_id>')
 @login_required
 def order_detail(order_id):
     user = db.session.query(User).options(joinedload(User.image_profile)).filter_by(id=current_user.id).first()
     # Ambil data order, pastikan order tersebut milik user yang sedang login
+    # Item dirender dari snapshot harga/nama di product_order_db (tanpa join produk & BLOB gambar)
     order = db.session.query(Order).options(
-        joinedload(Order.product_orders).joinedload(ProductOrder.product).joinedload(Product.images)
+        joinedload(Order.product_orders)
     ).filter_by(id=order_id).first()
-    
-    def get_image_data(product):
-        if product.images and len(product.images) > 0:
-            img = product.images[0]
-            if img.file_data:
-                try:
-                    if isinstance(img.file_data, str) and img.file_data.startswith('data:'):
-                        return img.file_data
-                    image_bytes = bytes(img.file_data)
-                    mime_type = detect_mime_type(image_bytes)
-                    base64_image = base64.b64encode(image_bytes).decode('utf-8')
-                    return f'data:{mime_type};base64,{base64_image}'
-                except Exception as e:
-                    print(f"Error: {e}")
-        return None
-
-    # Tambahkan atribut image_url ke setiap produk di dalam order secara dinamis
-    for po in order.product_orders:
-        po.product.image_url = get_image_data(po.product)
+    if order is None:
+        # Order lama yang sudah dipindah `flask orders-archive`
+        order = archived_order(order_id, current_user.id)
+        if order is None:
+            flash("Pesanan tidak ditemukan.", "danger")
+            return redirect(url_for('main.order_user'))
 
     if order.user_id != current_user.id:
         flash("Anda tidak memiliki akses ke pesanan ini.", "danger")
-        return redirect(url_for('orders'))
+        return redirect(url_for('main.order_user'))
         
     return render_template('detail-order-user.html', order=order, user=user)
 
 
 
-@app.route('/cart')
+@bp.route('/cart')
 @login_required
 def cart_user():
-    user = db.session.query(User).options(joinedload(User.image_profile)).filter_by(id=current_user.id).first()
-    user.profile_image_url = None
-    if user.image_profile:
-        img = user.image_profile[0]
-        if img.file_data:
-            base64_data = base64.b64encode(img.file_data).decode('utf-8')
-            user.profile_image_url = f"data:{img.file_type};base64,{base64_data}"
-    # Ambil items dengan relasi produk dan gambarnya
-    cart_items = db.session.query(Cart).options(
-        joinedload(Cart.product).joinedload(Product.images)
-    ).filter_by(user_id=current_user.id).all()
-    
-    
-    # Fungsi konversi yang sama dengan halaman order
-    def get_image_data(product):
-        if product.images and len(product.images) > 0:
-            img = product.images[0]
-            if img.file_data:
-                try:
-                    if isinstance(img.file_data, str) and img.file_data.startswith('data:'):
-                        return img.file_data
-                    image_bytes = bytes(img.file_data)
-                    mime_type = detect_mime_type(image_bytes)
-                    base64_image = base64.b64encode(image_bytes).decode('utf-8')
-                    return f'data:{mime_type};base64,{base64_image}'
-                except Exception as e:
-                    print(f"Error: {e}")
-        return None
+    user = current_user_view()
+    # Item keranjang sebagai dict; gambar diambil browser lewat route product_image
+    cart_items = cart_item_views(Cart.user_id == current_user.id)
 
-    # Mengisi atribut image_url secara dinamis
-    for item in cart_items:
-        item.product.image_url = get_image_data(item.product)
-
-    subtotal = sum(float(item.product.product_price or 0) * int(item.quantity or 0) for item in cart_items)
+    subtotal = sum(item['product']['product_price'] * int(item['quantity'] or 0) for item in cart_items)
     
     return render_template('cart-user.html', cart_items=cart_items, subtotal=subtotal, total=subtotal, user=user)
 
-@app.route('/add-to-cart/<int:product_id>', methods=['POST'])
+@bp.route('/add-to-cart/<int:product_id>', methods=['POST'])
 @login_required
+@admitted('cart')
 def add_to_cart(product_id):
     try:
         # gunakan first() untuk mendapatkan satu produk
@@ -1552,12 +1710,16 @@ def add_to_cart(product_id):
         print(f"Error Cart: {str(e)}") # Log untuk debugging
         return jsonify({'success': False, 'message': 'Gagal menambahkan produk'}), 500
     
-@app.route('/api/cart/checkout', methods=['POST'])
+@bp.route('/api/cart/checkout', methods=['POST'])
 @login_required
 def cart_checkout_api():
     try:
         data = request.get_json()
-        cart_ids = data.get('cart_ids', [])
+        # Hanya id integer unik milik user ini yang disimpan ke session
+        requested = {int(cart_id) for cart_id in data.get('cart_ids', [])}
+        cart_ids = [cart_id for (cart_id,) in db.session.query(Cart.id).filter(
+            Cart.user_id == current_user.id, Cart.id.in_(requested)
+        ).order_by(Cart.id)] if requested else []
 
         if not cart_ids:
             return jsonify({'success': False, 'message': 'Pilih produk dahulu'}), 400
@@ -1568,12 +1730,12 @@ def cart_checkout_api():
         return jsonify({
             'success': True,
             'message': 'Lanjut ke pengisian form...',
-            'redirect_url': url_for('form_order_user') # Redirect ke halaman form
+            'redirect_url': url_for('main.form_order_user') # Redirect ke halaman form
         })
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
     
-@app.route('/cart/delete/<int:item_id>', methods=['POST'])
+@bp.route('/cart/delete/<int:item_id>', methods=['POST'])
 @login_required
 def delete_cart_item(item_id):
     item = db.session.query(Cart).filter_by(id=item_id).first()
@@ -1585,7 +1747,7 @@ def delete_cart_item(item_id):
         return jsonify({'success': True, 'message': 'Produk dihapus'})
     return jsonify({'success': False, 'message': 'Unauthorized'}), 403
 
-@app.route('/cart/update/<int:product_id>', methods=['POST'])
+@bp.route('/cart/update/<int:product_id>', methods=['POST'])
 @login_required
 def update_cart_qty(product_id):
     try:
@@ -1624,7 +1786,7 @@ def update_cart_qty(product_id):
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 500
 
-@app.route('/profile-user', methods=['GET'])
+@bp.route('/profile-user', methods=['GET'])
 def profile_user():
     # Ambil satu user berdasarkan ID (bukan list)
     users = db.session.query(User).options(joinedload(User.image_profile)).filter_by(id=current_user.id).first()
@@ -1650,54 +1812,45 @@ def profile_user():
     return render_template('profile-user.html', user=users)
 
 
-@app.route('/edit-profile-user/<int:user_id>', methods=['POST'])
+@bp.route('/edit-profile-user/<int:user_id>', methods=['POST'])
 @login_required
 def edit_profile_user(user_id):
     if current_user.id != user_id:
         return jsonify({'success': False, 'message': 'Unauthorized'}), 403
 
     try:
+        # current_user bisa berupa snapshot session (identity.py), ubah baris users_db-nya
+        user = db.session.get(User, user_id)
+
         # --- 1. Update Data Teks ---
-        current_user.first_name = request.form.get('first_name')
-        current_user.last_name = request.form.get('last_name')
-        current_user.phone_number = request.form.get('phone_number')
-        current_user.address = request.form.get('address')
-        current_user.gender = request.form.get('gender')
+        user.first_name = request.form.get('first_name')
+        user.last_name = request.form.get('last_name')
+        user.phone_number = request.form.get('phone_number')
+        user.address = request.form.get('address')
+        user.gender = request.form.get('gender')
         
         birth_date = request.form.get('birth_date')
         if birth_date:
-            current_user.birth_date = datetime.strptime(birth_date, '%Y-%m-%d')
+            user.birth_date = datetime.strptime(birth_date, '%Y-%m-%d')
 
         # --- 2. Update/Upload Foto Profil ---
-        if 'profile_photo' in request.files:
-            file = request.files['profile_photo']
-            if file and file.filename != '':
-                # Baca data file
-                file_data = file.read()
-                file_name = file.filename
-                file_type = file.content_type  # misal: image/jpeg
-                file_size = len(file_data)
-
-                # Cari apakah user sudah punya foto sebelumnya
-                existing_img = db.session.query(ImageUsers).filter_by(user_id=user_id).first()
-
-                if existing_img:
-                    # Update foto lama
-                    existing_img.file_data = file_data
-                    existing_img.file_name = file_name
-                    existing_img.file_type = file_type
-                    existing_img.file_size = file_size
-                else:
-                    # Buat record foto baru
-                    new_img = ImageUsers(
-                        user_id=user_id,
-                        file_data=file_data,
-                        file_name=file_name,
-                        file_type=file_type,
-                        file_size=file_size
-                    )
-                    db.session.add(new_img)
+        try:
+            image = image_upload(request.files.get('profile_photo'))
+        except UploadRejected as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'message': str(e)}), 400
+        if image:
+            # Cari apakah user sudah punya foto sebelumnya
+            existing_img = db.session.query(ImageUsers).filter_by(user_id=user_id).first()
+            if existing_img:
+                # Update foto lama
+                for name, value in image.items():
+                    setattr(existing_img, name, value)
+            else:
+                db.session.add(ImageUsers(user_id=user_id, **image))
 
+        user.updated_at = datetime.now()
+        bump_identity(user)
         db.session.commit()
         return jsonify({'success': True, 'message': 'Profil dan foto berhasil diperbarui!'}), 200
             
@@ -1707,4 +1860,4 @@ def edit_profile_user(user_id):
         
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
+    create_app().run(host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,224 @@
+"""Pipeline aset statis: vendor library CDN ke lokal, bundle, fingerprint dan precompress.
+
+    flask --app app assets-vendor   # unduh library pihak ketiga ke static/vendor (sekali, lalu commit)
+    flask --app app assets-build    # tulis static/dist/<bundle>.<hash>.<ext> + .gz/.br + manifest.json
+
+Template memakai `{{ asset_tags('app.css') }}`. Jika manifest ada, bundle disajikan dari
+/assets/<nama ber-hash> dengan Cache-Control immutable dan varian .br/.gz sesuai
+Accept-Encoding. Jika belum di-build (development), setiap file sumber dimuat terpisah:
+dari static/ bila sudah di-vendor, atau langsung dari CDN asalnya.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+import urllib.request
+
+import click
+from flask import current_app, request, send_file, url_for
+from flask.cli import with_appcontext
+from markupsafe import Markup, escape
+
+# Path lokal (relatif ke static/) -> URL CDN asal, versi dikunci
+VENDOR = {
+    'vendor/jquery/jquery.min.js': 'https://cdn.jsdelivr.net/npm/jquery@3.6.0/dist/jquery.min.js',
+    'vendor/datatables/jquery.dataTables.min.js': 'https://cdn.datatables.net/1.13.6/js/jquery.dataTables.min.js',
+    'vendor/datatables/dataTables.tailwindcss.min.js': 'https://cdn.datatables.net/1.13.6/js/dataTables.tailwindcss.min.js',
+    'vendor/datatables/dataTables.tailwindcss.min.css': 'https://cdn.datatables.net/1.13.6/css/dataTables.tailwindcss.min.css',
+    # sweetalert2.all.min.js sudah berisi CSS-nya, jadi sweetalert2.min.css tidak perlu dimuat
+    'vendor/sweetalert2/sweetalert2.all.min.js': 'https://cdn.jsdelivr.net/npm/sweetalert2@11/dist/sweetalert2.all.min.js',
+    'vendor/aos/aos.css': 'https://unpkg.com/aos@2.3.1/dist/aos.css',
+    'vendor/aos/aos.js': 'https://unpkg.com/aos@2.3.1/dist/aos.js',
+    'vendor/fontawesome/css/all.min.css': 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css',
+}
+for _font in ('fa-brands-400', 'fa-regular-400', 'fa-solid-900', 'fa-v4compatibility'):
+    for _ext in ('woff2', 'ttf'):
+        VENDOR[f'vendor/fontawesome/webfonts/{_font}.{_ext}'] = (
+            f'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/webfonts/{_font}.{_ext}'
+        )
+
+BUNDLES = {
+    'app.css': ['css/output.css', 'vendor/fontawesome/css/all.min.css', 'vendor/aos/aos.css'],
+    'app.js': ['vendor/aos/aos.js', 'vendor/sweetalert2/sweetalert2.all.min.js', 'js/admission.js'],
+    # login/register masih memakai Tailwind CDN, jadi tanpa output.css
+    'auth.css': ['vendor/fontawesome/css/all.min.css', 'vendor/aos/aos.css'],
+    'auth.js': ['vendor/aos/aos.js'],
+    'datatables.css': ['vendor/datatables/dataTables.tailwindcss.min.css'],
+    'datatables.js': [
+        'vendor/jquery/jquery.min.js',
+        'vendor/datatables/jquery.dataTables.min.js',
+        'vendor/datatables/dataTables.tailwindcss.min.js',
+    ],
+}
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.ttf', '.json')
+CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def _fingerprinted(name, data):
+    stem, ext = os.path.splitext(name)
+    return f'{stem}.{_digest(data)}{ext}'
+
+
+def _write_variants(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+    if not path.endswith(COMPRESSIBLE):
+        return
+    with open(path + '.gz', 'wb') as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    try:
+        import brotli
+    except ImportError:
+        return
+    with open(path + '.br', 'wb') as f:
+        f.write(brotli.compress(data, quality=11))
+
+
+def _rewrite_css_urls(css, source_path, static_dir, dist_dir, copied):
+    """Salin file yang dirujuk url() (font, gambar) ke dist dengan nama ber-hash"""
+    def replace(match):
+        ref = match.group(2)
+        if ref.startswith(('data:', 'http:', 'https:', '//', '#')):
+            return match.group(0)
+        clean = ref.split('?', 1)[0].split('#', 1)[0]
+        target = os.path.normpath(os.path.join(os.path.dirname(source_path), clean))
+        if not target.startswith(static_dir) or not os.path.isfile(target):
+            return match.group(0)
+        if target not in copied:
+            with open(target, 'rb') as f:
+                data = f.read()
+            name = _fingerprinted(os.path.basename(target), data)
+            _write_variants(os.path.join(dist_dir, name), data)
+            copied[target] = name
+        return f'url({copied[target]})'
+    return CSS_URL.sub(replace, css)
+
+
+def build_assets(static_dir, echo=click.echo):
+    dist_dir = os.path.join(static_dir, 'dist')
+    if os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+    os.makedirs(dist_dir)
+
+    manifest = {}
+    copied = {}
+    for bundle, sources in BUNDLES.items():
+        parts = []
+        for source in sources:
+            path = os.path.join(static_dir, source)
+            if not os.path.isfile(path):
+                raise click.ClickException(f'{source} tidak ada, jalankan `flask assets-vendor` dulu')
+            with open(path, 'rb') as f:
+                data = f.read()
+            if bundle.endswith('.css'):
+                data = _rewrite_css_urls(data.decode('utf-8'), path, static_dir, dist_dir, copied).encode('utf-8')
+            parts.append(data)
+        # ';' mencegah dua file JS tanpa titik koma di akhir tergabung jadi satu statement
+        separator = b'\n;\n' if bundle.endswith('.js') else b'\n'
+        data = separator.join(parts)
+        name = _fingerprinted(bundle, data)
+        _write_variants(os.path.join(dist_dir, name), data)
+        manifest[bundle] = name
+        echo(f'{bundle} -> dist/{name} ({len(data) / 1024:.1f} KB)')
+
+    with open(os.path.join(dist_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(static_dir):
+    path = os.path.join(static_dir, 'dist', 'manifest.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def serve_asset(filename):
+    """File dist ber-hash: immutable, pilih varian br/gzip dari Accept-Encoding"""
+    dist_dir = os.path.join(current_app.static_folder, 'dist')
+    path = os.path.normpath(os.path.join(dist_dir, filename))
+    if not path.startswith(dist_dir + os.sep) or not os.path.isfile(path):
+        return '', 404
+
+    encoding = None
+    for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if request.accept_encodings[candidate] and os.path.isfile(path + suffix):
+            encoding = candidate
+            break
+
+    if encoding:
+        # mimetype diambil dari nama file asli, bukan dari .br/.gz
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        response = send_file(path + ('.br' if encoding == 'br' else '.gz'), mimetype=mimetype, max_age=None)
+        response.headers['Content-Encoding'] = encoding
+    else:
+        response = send_file(path, max_age=None)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def asset_tags(bundle):
+    manifest = current_app.extensions.get('asset_manifest')
+    if manifest and bundle in manifest:
+        urls = [url_for('assets', filename=bundle)]
+    else:
+        urls = []
+        for source in BUNDLES[bundle]:
+            if os.path.isfile(os.path.join(current_app.static_folder, source)) or source not in VENDOR:
+                urls.append(url_for('static', filename=source))
+            else:
+                urls.append(VENDOR[source])
+    if bundle.endswith('.css'):
+        tags = [f'<link rel="stylesheet" href="{escape(url)}" />' for url in urls]
+    else:
+        tags = [f'<script src="{escape(url)}"></script>' for url in urls]
+    return Markup('\n    '.join(tags))
+
+
+def init_assets(app):
+    app.extensions['asset_manifest'] = load_manifest(app.static_folder)
+    app.add_url_rule('/assets/<path:filename>', 'assets', serve_asset)
+
+    @app.url_defaults
+    def _fingerprint_asset_url(endpoint, values):
+        # url_for('assets', filename='app.css') -> /assets/app.<hash>.css
+        manifest = app.extensions.get('asset_manifest')
+        if endpoint == 'assets' and manifest:
+            values['filename'] = manifest.get(values.get('filename'), values.get('filename'))
+
+    app.jinja_env.globals['asset_tags'] = asset_tags
+
+
+@click.command('assets-vendor')
+@with_appcontext
+def assets_vendor_command():
+    """Unduh library pihak ketiga (versi terkunci) ke static/vendor"""
+    for path, url in VENDOR.items():
+        target = os.path.join(current_app.static_folder, path)
+        if os.path.exists(target):
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with urllib.request.urlopen(url, timeout=30) as response:
+            data = response.read()
+        with open(target, 'wb') as f:
+            f.write(data)
+        click.echo(f'{url} -> static/{path}')
+
+
+@click.command('assets-build')
+@with_appcontext
+def assets_build_command():
+    """Bundle, fingerprint dan precompress aset ke static/dist"""
+    manifest = build_assets(current_app.static_folder)
+    current_app.extensions['asset_manifest'] = manifest
+    click.echo(f'{len(manifest)} bundle ditulis ke static/dist/manifest.json')
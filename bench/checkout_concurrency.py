@@ -0,0 +1,217 @@
+"""Skalabilitas checkout TRANSFER_BANK dan login Google saat API luar lambat.
+
+Script ini menjalankan server stub lokal untuk Midtrans Snap dan Google OIDC dengan latensi
+buatan (--latency-ms), lalu menjalankan gunicorn per worker class dengan
+MIDTRANS_SNAP_BASE_URL / OAUTH_SERVER_METADATA_URL diarahkan ke stub. Dengan jumlah worker
+yang sama, worker sync hanya bisa menjalankan `workers` panggilan luar sekaligus, sedangkan
+worker gevent menjalankan hingga `--concurrency` panggilan bersamaan (I/O requests jadi
+non-blocking setelah monkey patch gevent).
+
+Skenario:
+- checkout: POST /api/order/process (TRANSFER_BANK, beli langsung) -> 1 panggilan Snap
+- google:   /login/google -> stub authorize -> /auth/google/callback -> token + userinfo
+
+    DATABASE_URI=postgresql://... python bench/checkout_concurrency.py \\
+        --email user@example.com --password secret --product-id 1 \\
+        --workers sync gevent --num-workers 2 --concurrency 64 --latency-ms 300
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from loadtest_workers import make_client, percentile, start_gunicorn, wait_until_ready
+
+
+def make_stub_handler(latency, email):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _json(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _base(self):
+            return 'http://%s:%d' % self.server.server_address
+
+        def do_GET(self):
+            url = urllib.parse.urlparse(self.path)
+            if url.path == '/.well-known/openid-configuration':
+                base = self._base()
+                self._json(200, {
+                    'issuer': base,
+                    'authorization_endpoint': base + '/authorize',
+                    'token_endpoint': base + '/token',
+                    'userinfo_endpoint': base + '/userinfo',
+                    'jwks_uri': base + '/jwks',
+                })
+            elif url.path == '/authorize':
+                # Langsung "setujui" dan kembalikan ke redirect_uri aplikasi
+                query = urllib.parse.parse_qs(url.query)
+                target = '%s?%s' % (query['redirect_uri'][0], urllib.parse.urlencode(
+                    {'code': uuid.uuid4().hex, 'state': query['state'][0]}))
+                self.send_response(302)
+                self.send_header('Location', target)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+            elif url.path == '/userinfo':
+                time.sleep(latency)
+                self._json(200, {'sub': '1', 'email': email, 'given_name': 'Bench', 'family_name': 'User'})
+            else:
+                self._json(404, {})
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            if self.path == '/token':
+                time.sleep(latency)
+                self._json(200, {'access_token': uuid.uuid4().hex, 'token_type': 'Bearer', 'expires_in': 3600})
+            elif self.path == '/snap/v1/transactions':
+                time.sleep(latency)
+                token = uuid.uuid4().hex
+                self._json(201, {'token': token, 'redirect_url': self._base() + '/snap/' + token})
+            else:
+                self._json(404, {})
+
+    return StubHandler
+
+
+def start_stub(latency, email):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_stub_handler(latency, email))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, 'http://127.0.0.1:%d' % server.server_address[1]
+
+
+def stub_environ(stub_url):
+    """Env yang mengarahkan app (dan gunicorn anaknya) ke server stub"""
+    return {
+        'MIDTRANS_SNAP_BASE_URL': stub_url + '/snap/v1',
+        'OAUTH_SERVER_METADATA_URL': stub_url + '/.well-known/openid-configuration',
+        'OAUTH_CLIENT_ID': 'bench',
+        'OAUTH_CLIENT_SECRET': 'bench',
+        'SNAP_SERVER_KEY': 'bench',
+        # Jangan pakai / timpa cache metadata Google yang asli
+        'OIDC_METADATA_CACHE': os.path.join(tempfile.mkdtemp(), 'oidc_metadata.json'),
+    }
+
+
+def run_scenario(base_url, scenario, args, concurrency, duration):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+    checkout_opener = make_client(base_url, args.email, args.password) if scenario == 'checkout' else None
+
+    def request_once():
+        if scenario == 'checkout':
+            payload = json.dumps({'payment': 'TRANSFER_BANK', 'productId': args.product_id, 'quantity': 1}).encode()
+            req = urllib.request.Request(base_url + '/api/order/process', data=payload,
+                                         headers={'Content-Type': 'application/json'})
+            body = json.loads(checkout_opener.open(req, timeout=60).read())
+            if not body.get('snap_token'):
+                raise RuntimeError(body)
+        else:
+            # Login baru setiap iterasi: cookie jar kosong, ikuti redirect sampai dashboard
+            opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+            response = opener.open(base_url + '/login/google', timeout=60)
+            response.read()
+            if not response.geturl().endswith(('/dashboard', '/admin/dashboard')):
+                raise RuntimeError(response.geturl())
+
+    def worker():
+        while time.time() < stop_at:
+            start = time.perf_counter()
+            try:
+                request_once()
+                ok = True
+            except Exception:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': len(latencies) / duration,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--email', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--product-id', type=int, required=True)
+    parser.add_argument('--workers', nargs='+', default=['sync', 'gthread', 'gevent'])
+    parser.add_argument('--num-workers', type=int, default=2)
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[8, 32, 64])
+    parser.add_argument('--duration', type=int, default=15)
+    parser.add_argument('--latency-ms', type=int, default=300, help='Latensi buatan stub per panggilan')
+    parser.add_argument('--scenarios', nargs='+', default=['checkout', 'google'])
+    parser.add_argument('--port', type=int, default=5056)
+    parser.add_argument('--output', help='Simpan hasil ke file JSON')
+    args = parser.parse_args()
+
+    stub, stub_url = start_stub(args.latency_ms / 1000.0, args.email)
+    os.environ.update(stub_environ(stub_url))
+
+    base_url = 'http://127.0.0.1:%d' % args.port
+    results = []
+    try:
+        for worker_class in args.workers:
+            proc = start_gunicorn(worker_class, args.port, args.num_workers)
+            try:
+                wait_until_ready(base_url)
+                for scenario in args.scenarios:
+                    for concurrency in args.concurrency:
+                        stats = run_scenario(base_url, scenario, args, concurrency, args.duration)
+                        stats.update({'worker_class': worker_class, 'scenario': scenario, 'concurrency': concurrency})
+                        results.append(stats)
+            finally:
+                proc.terminate()
+                proc.wait(timeout=60)
+    finally:
+        stub.shutdown()
+
+    # Batas teoretis worker yang memblokir: num_workers panggilan per latency
+    print('latensi stub %d ms, %d worker/proses; batas sync ~%.1f req/s' % (
+        args.latency_ms, args.num_workers, args.num_workers / (args.latency_ms / 1000.0)))
+    print('%-8s %-9s %5s %8s %7s %9s %9s %9s' % ('worker', 'scenario', 'conc', 'req/s', 'errors', 'p50 ms', 'p95 ms', 'p99 ms'))
+    for r in results:
+        print('%-8s %-9s %5d %8.1f %7d %9.1f %9.1f %9.1f' % (
+            r['worker_class'], r['scenario'], r['concurrency'], r['rps'], r['errors'],
+            r['p50_ms'], r['p95_ms'], r['p99_ms']))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,434 @@
+"""Load test campuran: flash sale satu produk sambil admin membuka daftar order.
+
+Virtual user (thread, cookie jar sendiri) menjalankan skenario lewat route asli:
+- flash_sale:  katalog -> add-to-cart produk "panas" -> /cart -> /api/cart/checkout ->
+               form order -> /api/order/process (COD / TRANSFER_BANK, dengan Idempotency-Key)
+- admin:       /admin/orders, /admin/orders/data?status=pending, sesekali /admin/dashboard
+- google:      login Google penuh (authorize -> callback -> dashboard)
+
+Midtrans Snap dan Google OIDC diarahkan ke server stub lokal (--latency-ms). Customer memakai
+akun user<id>@bench.example.com dari bench/seed_data.py, admin memakai bench-admin. Sebelum run
+stok produk panas di-set ke --stock (dibagi ke --shards shard, lihat stock.py) dan keranjang
+customer dikosongkan.
+
+Yang dilaporkan per skenario dan langkah: throughput, p50/p95/p99 (termasuk waktu di ruang
+tunggu admission; langkah `<nama>_queued` = request yang sempat antri), error rate (5xx / koneksi
+gagal; 4xx seperti stok habis atau batas per user dihitung "ditolak"), waktu tunggu lock DB (sampling
+pg_stat_activity / innodb_trx, plus error lock seperti "database is locked" untuk server
+inprocess) dan cek oversell: stok akhir harus >= 0 dan sama dengan stok awal dikurangi
+jumlah item order yang tidak dibatalkan. Exit code 1 jika cek stok gagal.
+
+    DATABASE_URI=postgresql://... python bench/seed_data.py --scale small
+    DATABASE_URI=postgresql://... python bench/load_scenarios.py --customers 64 --admins 4 --stock 50
+    DATABASE_URI=postgresql://... python bench/load_scenarios.py --server gevent --num-workers 4
+
+Hasil ditambahkan ke bench/results/load.jsonl.
+"""
+import argparse
+import datetime
+import http.cookiejar
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, func, text
+
+from checkout_concurrency import start_stub, stub_environ
+from fragment_cache import bump_cache_version
+from models import Cart, Order, OrderStatusEnum, Product, ProductOrder, RoleEnum, User, db
+from stock import configure_shards, current_stock, set_stock
+from loadtest_workers import make_client, percentile, start_gunicorn, wait_until_ready
+from seed_data import BENCH_ADMIN_EMAIL, BENCH_PASSWORD, BENCH_USER_EMAIL
+from startup_time import git_commit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_FILE = os.path.join(ROOT, 'bench', 'results', 'load.jsonl')
+
+CART_ITEM = re.compile(rb'id="cart-item-(\d+)"')
+
+# Jumlah sesi yang sedang menunggu lock baris/tabel, per sampel
+LOCK_WAIT_SQL = {
+    'postgresql': "SELECT count(*) FROM pg_stat_activity WHERE wait_event_type = 'Lock' AND datname = current_database()",
+    'mysql': "SELECT count(*) FROM information_schema.innodb_trx WHERE trx_state = 'LOCK WAIT'",
+}
+LOCK_ERRORS = ('database is locked', 'deadlock', 'lock wait timeout', 'could not obtain lock', 'lock timeout')
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def add(self, scenario, step, status, elapsed):
+        with self.lock:
+            self.samples.setdefault((scenario, step), []).append((status, elapsed))
+
+    def summary(self, duration):
+        def stats(samples):
+            latencies = [elapsed for _, elapsed in samples]
+            errors = sum(1 for status, _ in samples if status is None or status >= 500)
+            rejected = sum(1 for status, _ in samples if status is not None and 400 <= status < 500)
+            return {
+                'requests': len(samples),
+                'rps': round(len(samples) / duration, 1),
+                'errors': errors,
+                'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+                'rejected': rejected,
+                'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+                'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+                'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+            }
+
+        result = {}
+        for (scenario, step), samples in sorted(self.samples.items()):
+            entry = result.setdefault(scenario, {'steps': {}, 'all': []})
+            entry['steps'][step] = stats(samples)
+            if not step.endswith('_queued'):
+                entry['all'].extend(samples)
+        for entry in result.values():
+            entry['total'] = stats(entry.pop('all'))
+        return result
+
+    def count(self, scenario, step, status):
+        return sum(1 for s, _ in self.samples.get((scenario, step), []) if s == status)
+
+
+class VirtualUser:
+    def __init__(self, base_url, scenario, recorder, opener):
+        self.base_url = base_url
+        self.scenario = scenario
+        self.recorder = recorder
+        self.opener = opener
+
+    def request(self, step, path, payload=None, headers=None, method='GET'):
+        headers = dict(headers or {})
+        data = b'' if method == 'POST' else None
+        if payload is not None:
+            data = json.dumps(payload).encode()
+            headers['Content-Type'] = 'application/json'
+        start = time.perf_counter()
+        while True:
+            req = urllib.request.Request(self.base_url + path, data=data, headers=headers)
+            try:
+                with self.opener.open(req, timeout=60) as response:
+                    status, body = response.status, response.read()
+            except urllib.error.HTTPError as e:
+                status, body = e.code, e.read()
+            except Exception:
+                status, body = None, b''
+            if status != 202:
+                break
+            # Ruang tunggu (admission.py): ulangi dengan tiket seperti static/js/admission.js
+            queued = json.loads(body)
+            headers['X-Queue-Ticket'] = queued['ticket']
+            time.sleep(queued['retry_after'])
+        elapsed = time.perf_counter() - start
+        if 'X-Queue-Ticket' in headers:
+            self.recorder.add(self.scenario, step + '_queued', status, elapsed)
+        self.recorder.add(self.scenario, step, status, elapsed)
+        return status, body
+
+
+def flash_sale_iteration(vu, args, rng):
+    vu.request('catalog', '/produk-user')
+    status, _ = vu.request('add_to_cart', f'/add-to-cart/{args.product_id}', method='POST')
+    if status != 200:
+        # Stok habis / melebihi stok: pembeli kembali ke katalog
+        return
+    _, html = vu.request('cart', '/cart')
+    cart_ids = [int(cart_id) for cart_id in CART_ITEM.findall(html)]
+    if not cart_ids:
+        return
+    status, _ = vu.request('cart_checkout', '/api/cart/checkout', {'cart_ids': cart_ids})
+    if status != 200:
+        return
+    vu.request('form_order', '/form-order-user')
+    payment = 'TRANSFER_BANK' if rng.random() < args.transfer_ratio else 'COD'
+    vu.request('process_order', '/api/order/process',
+               {'payment': payment, 'fullName': 'Bench Load', 'phone': '08123456789'},
+               headers={'Idempotency-Key': uuid.uuid4().hex})
+
+
+def admin_iteration(vu, args, rng):
+    vu.request('admin_orders', '/admin/orders')
+    vu.request('admin_orders_data', '/admin/orders/data?status=pending')
+    if rng.random() < 0.2:
+        vu.request('admin_dashboard', '/admin/dashboard')
+
+
+def google_iteration(vu, args, rng):
+    # Cookie jar baru setiap login, redirect diikuti sampai dashboard
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    start = time.perf_counter()
+    try:
+        with opener.open(vu.base_url + '/login/google', timeout=60) as response:
+            response.read()
+            status = response.status if response.geturl().endswith(('/dashboard', '/admin/dashboard')) else 502
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception:
+        status = None
+    vu.recorder.add(vu.scenario, 'google_login', status, time.perf_counter() - start)
+
+
+SCENARIOS = {'flash_sale': flash_sale_iteration, 'admin': admin_iteration, 'google': google_iteration}
+
+
+class LockSampler(threading.Thread):
+    """Sampling jumlah sesi DB yang menunggu lock selama run (PostgreSQL / MySQL)"""
+
+    def __init__(self, app, interval):
+        super().__init__(daemon=True)
+        self.app = app
+        self.interval = interval
+        self.counts = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        with self.app.app_context():
+            sql = LOCK_WAIT_SQL.get(db.engine.dialect.name)
+            if sql is None:
+                return
+            with db.engine.connect() as conn:
+                while not self.stopped.wait(self.interval):
+                    self.counts.append(conn.execute(text(sql)).scalar() or 0)
+                    conn.commit()
+
+    def summary(self):
+        if not self.counts:
+            return {'samples': 0}
+        return {
+            'samples': len(self.counts),
+            'max_waiting': max(self.counts),
+            'mean_waiting': round(sum(self.counts) / len(self.counts), 2),
+            # Perkiraan total detik-sesi yang habis menunggu lock
+            'wait_seconds': round(sum(self.counts) * self.interval, 2),
+        }
+
+
+def prepare(args):
+    """Set stok produk panas, pilih akun customer dan kosongkan keranjangnya"""
+    if not db.session.query(User.id).filter_by(email=BENCH_ADMIN_EMAIL).scalar():
+        raise SystemExit('Akun bench tidak ditemukan, jalankan bench/seed_data.py dulu')
+    if args.product_id is None:
+        args.product_id = db.session.query(Product.id).filter(Product.product_status == True).order_by(
+            Product.id).limit(1).scalar()
+    product = db.session.query(Product).filter_by(id=args.product_id).first()
+    if product is None:
+        raise SystemExit(f'Produk {args.product_id} tidak ditemukan')
+    configure_shards(product, args.shards)
+    set_stock(product, args.stock)
+    product.product_status = True
+
+    customers = db.session.query(User.id, User.email).filter(
+        User.email.like('user%@bench.example.com'), User.is_active == True, User.role == RoleEnum.USER).order_by(
+        User.id).limit(args.customers).all() or db.session.query(User.id, User.email).filter_by(
+        email=BENCH_USER_EMAIL).all()
+    db.session.query(Cart).filter(Cart.user_id.in_([user_id for user_id, _ in customers])).delete(
+        synchronize_session=False)
+    bump_cache_version('catalog')
+    db.session.commit()
+
+    first_order_id = db.session.query(func.coalesce(func.max(Order.id), 0)).scalar()
+    emails = [email for _, email in customers]
+    return [emails[i % len(emails)] for i in range(args.customers)], first_order_id
+
+
+def stock_check(product_id, initial, first_order_id):
+    sold, orders = db.session.query(
+        func.coalesce(func.sum(ProductOrder.quantity), 0), func.count(func.distinct(Order.id))
+    ).join(Order, Order.id == ProductOrder.order_id).filter(
+        ProductOrder.product_id == product_id, Order.id > first_order_id, Order.status != OrderStatusEnum.CANCEL
+    ).one()
+    final = current_stock(db.session.get(Product, product_id))
+    expected = initial - sold
+    return {
+        'product_id': product_id,
+        'initial_stock': initial,
+        'final_stock': final,
+        'sold': int(sold),
+        'orders': orders,
+        'oversold': max(0, int(sold) - initial),
+        # > 0: pengurangan stok yang hilang (read-modify-write yang saling menimpa)
+        'lost_updates': final - expected,
+        'ok': final >= 0 and sold <= initial and final == expected,
+    }
+
+
+def login_all(base_url, accounts):
+    openers = [None] * len(accounts)
+    errors = []
+
+    def login(i, email):
+        try:
+            openers[i] = make_client(base_url, email, BENCH_PASSWORD)
+        except Exception as e:
+            errors.append(f'{email}: {e}')
+
+    threads = [threading.Thread(target=login, args=(i, email)) for i, email in enumerate(accounts)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if errors:
+        raise SystemExit('Login gagal: ' + '; '.join(errors[:3]))
+    return openers
+
+
+def run_load(base_url, args, customer_emails, recorder):
+    users = []
+    openers = login_all(base_url, customer_emails + [BENCH_ADMIN_EMAIL] * args.admins)
+    for opener in openers[:args.customers]:
+        users.append(VirtualUser(base_url, 'flash_sale', recorder, opener))
+    for opener in openers[args.customers:]:
+        users.append(VirtualUser(base_url, 'admin', recorder, opener))
+    for _ in range(args.google_users):
+        users.append(VirtualUser(base_url, 'google', recorder, None))
+
+    start = threading.Barrier(len(users) + 1)
+    stop_at = [0.0]
+
+    def worker(vu, seed):
+        rng = random.Random(seed)
+        start.wait()
+        while time.time() < stop_at[0]:
+            SCENARIOS[vu.scenario](vu, args, rng)
+            if args.think_ms:
+                time.sleep(rng.uniform(0.5, 1.5) * args.think_ms / 1000.0)
+
+    threads = [threading.Thread(target=worker, args=(vu, args.seed + i)) for i, vu in enumerate(users)]
+    for t in threads:
+        t.start()
+    stop_at[0] = time.time() + args.duration
+    start.wait()
+    began = time.time()
+    for t in threads:
+        t.join()
+    return time.time() - began
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--server', default='inprocess',
+                        help='inprocess (werkzeug threaded di proses ini) atau worker class gunicorn: sync / gthread / gevent')
+    parser.add_argument('--num-workers', type=int, default=2, help='Jumlah worker gunicorn')
+    parser.add_argument('--port', type=int, default=5057)
+    parser.add_argument('--customers', type=int, default=32, help='Virtual user flash sale')
+    parser.add_argument('--admins', type=int, default=2, help='Virtual user admin yang me-reload daftar order')
+    parser.add_argument('--google-users', type=int, default=0, help='Virtual user login Google berulang')
+    parser.add_argument('--product-id', type=int, help='Produk flash sale (default: produk aktif pertama)')
+    parser.add_argument('--stock', type=int, default=50, help='Stok awal produk flash sale')
+    parser.add_argument('--shards', type=int, default=0, help='Stok produk flash sale dibagi ke N shard (0 = satu baris)')
+    parser.add_argument('--transfer-ratio', type=float, default=0.5, help='Porsi checkout TRANSFER_BANK (memanggil stub Snap)')
+    parser.add_argument('--duration', type=int, default=30)
+    parser.add_argument('--think-ms', type=int, default=0, help='Jeda rata-rata antar iterasi per virtual user')
+    parser.add_argument('--latency-ms', type=int, default=200, help='Latensi buatan stub Midtrans / Google')
+    parser.add_argument('--lock-sample-ms', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-save', action='store_true', help='Jangan tulis ke load.jsonl')
+    args = parser.parse_args()
+
+    stub, stub_url = start_stub(args.latency_ms / 1000.0, BENCH_USER_EMAIL)
+    # Sebelum create_app: konfigurasi Midtrans / OAuth dibaca dari env
+    os.environ.update(stub_environ(stub_url))
+
+    from app import create_app
+
+    app = create_app()
+    lock_errors = [0]
+    with app.app_context():
+        customer_emails, first_order_id = prepare(args)
+        dialect = db.engine.dialect.name
+        db.session.remove()
+
+        @event.listens_for(db.engine, 'handle_error')
+        def count_lock_error(context):
+            if any(marker in str(context.original_exception).lower() for marker in LOCK_ERRORS):
+                lock_errors[0] += 1
+
+    base_url = 'http://127.0.0.1:%d' % args.port
+    server = proc = None
+    if args.server == 'inprocess':
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args):
+                pass
+
+        server = make_server('127.0.0.1', args.port, app, threaded=True, request_handler=QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    else:
+        proc = start_gunicorn(args.server, args.port, args.num_workers)
+
+    recorder = Recorder()
+    sampler = LockSampler(app, args.lock_sample_ms / 1000.0)
+    try:
+        wait_until_ready(base_url)
+        sampler.start()
+        duration = run_load(base_url, args, customer_emails, recorder)
+    finally:
+        sampler.stopped.set()
+        if server:
+            server.shutdown()
+        if proc:
+            proc.terminate()
+            proc.wait(timeout=60)
+        stub.shutdown()
+    sampler.join(timeout=5)
+
+    with app.app_context():
+        stock = stock_check(args.product_id, args.stock, first_order_id)
+        db.session.remove()
+    scenarios = recorder.summary(duration)
+    locks = sampler.summary()
+    # Error lock hanya terlihat jika server berjalan di proses ini
+    locks['lock_errors'] = lock_errors[0] if server else None
+    checkouts_ok = recorder.count('flash_sale', 'process_order', 201)
+
+    print('server %s, %d customer, %d admin, %d google, %.0f s, stub %d ms' % (
+        args.server, args.customers, args.admins, args.google_users, duration, args.latency_ms))
+    print('%-11s %-20s %7s %7s %6s %7s %8s %8s %8s' % (
+        'scenario', 'step', 'req', 'req/s', 'err%', 'ditolak', 'p50 ms', 'p95 ms', 'p99 ms'))
+    for name, entry in scenarios.items():
+        for step, r in list(entry['steps'].items()) + [('(total)', entry['total'])]:
+            print('%-11s %-20s %7d %7.1f %6.2f %7d %8.1f %8.1f %8.1f' % (
+                name, step, r['requests'], r['rps'], r['error_rate'] * 100, r['rejected'],
+                r['p50_ms'], r['p95_ms'], r['p99_ms']))
+    print('lock DB: ' + ', '.join(f'{k}={v}' for k, v in locks.items()))
+    print('stok produk %d: awal %d, akhir %d, terjual %d dalam %d order (201 diterima klien: %d)' % (
+        stock['product_id'], stock['initial_stock'], stock['final_stock'], stock['sold'], stock['orders'], checkouts_ok))
+    if stock['ok']:
+        print('cek stok OK')
+    else:
+        print('CEK STOK GAGAL: oversold %d, pengurangan stok hilang %d' % (stock['oversold'], stock['lost_updates']))
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+        with open(RESULTS_FILE, 'a') as f:
+            f.write(json.dumps({
+                'commit': git_commit(),
+                'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+                'config': {key: getattr(args, key) for key in (
+                    'server', 'num_workers', 'customers', 'admins', 'google_users', 'stock', 'shards',
+                    'transfer_ratio', 'duration', 'think_ms', 'latency_ms')},
+                'dialect': dialect,
+                'scenarios': scenarios,
+                'locks': locks,
+                'stock': stock,
+                'checkouts_ok': checkouts_ok,
+            }) + '\n')
+
+    sys.exit(0 if stock['ok'] else 1)
+
+
+if __name__ == '__main__':
+    main()
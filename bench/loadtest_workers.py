@@ -0,0 +1,162 @@
+"""Bandingkan worker model gunicorn (sync / gthread / gevent) pada endpoint katalog dan checkout.
+
+Script ini menjalankan gunicorn untuk setiap worker class, login sebagai user yang sudah ada,
+lalu menembak `/produk-user` (katalog) dan `/api/order/process` (checkout COD, beli langsung)
+secara paralel. Hasil: throughput, p50/p95/p99 dan jumlah error per worker class.
+
+Contoh:
+
+    DATABASE_URI=postgresql://... python bench/loadtest_workers.py \\
+        --email user@example.com --password secret --product-id 1 \\
+        --workers sync gthread gevent --concurrency 32 --duration 20
+
+Pastikan produk yang dipakai punya stok cukup besar karena checkout mengurangi stok.
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return values[k]
+
+
+def make_client(base_url, email, password):
+    """Buat opener dengan cookie jar yang sudah login"""
+    jar = http.cookiejar.CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    body = urllib.parse.urlencode({'email': email, 'password': password}).encode()
+    opener.open(base_url + '/login', data=body, timeout=30).read()
+    if not any(c.name == 'session' for c in jar):
+        raise RuntimeError('Login gagal, periksa --email / --password')
+    return opener
+
+
+def wait_until_ready(base_url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(base_url + '/login', timeout=2).read()
+            return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.3)
+    raise RuntimeError('gunicorn tidak siap dalam %ss' % timeout)
+
+
+def run_scenario(opener, base_url, endpoint, product_id, concurrency, duration):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+
+    def request_once():
+        if endpoint == 'catalog':
+            req = urllib.request.Request(base_url + '/produk-user')
+        else:
+            payload = json.dumps({'payment': 'COD', 'productId': product_id, 'quantity': 1}).encode()
+            req = urllib.request.Request(base_url + '/api/order/process', data=payload,
+                                         headers={'Content-Type': 'application/json'})
+        return opener.open(req, timeout=30).read()
+
+    def worker():
+        while time.time() < stop_at:
+            start = time.perf_counter()
+            try:
+                request_once()
+                ok = True
+            except Exception:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': len(latencies) / duration,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'mean_ms': (statistics.mean(latencies) * 1000) if latencies else 0.0,
+    }
+
+
+def start_gunicorn(worker_class, port, num_workers):
+    env = dict(os.environ)
+    env.update({
+        'GUNICORN_WORKER_CLASS': worker_class,
+        'GUNICORN_BIND': '127.0.0.1:%d' % port,
+        'GUNICORN_WORKERS': str(num_workers),
+        'GUNICORN_ACCESSLOG': '',
+    })
+    return subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--email', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--product-id', type=int, required=True)
+    parser.add_argument('--workers', nargs='+', default=['sync', 'gthread', 'gevent'])
+    parser.add_argument('--num-workers', type=int, default=4)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=int, default=20)
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--output', help='Simpan hasil ke file JSON')
+    args = parser.parse_args()
+
+    base_url = 'http://127.0.0.1:%d' % args.port
+    results = []
+    for worker_class in args.workers:
+        proc = start_gunicorn(worker_class, args.port, args.num_workers)
+        try:
+            wait_until_ready(base_url)
+            opener = make_client(base_url, args.email, args.password)
+            for endpoint in ('catalog', 'checkout'):
+                stats = run_scenario(opener, base_url, endpoint, args.product_id,
+                                     args.concurrency, args.duration)
+                stats.update({'worker_class': worker_class, 'endpoint': endpoint})
+                results.append(stats)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=60)
+
+    print('%-8s %-9s %8s %8s %9s %9s %9s' % ('worker', 'endpoint', 'req/s', 'errors', 'p50 ms', 'p95 ms', 'p99 ms'))
+    for r in results:
+        print('%-8s %-9s %8.1f %8d %9.1f %9.1f %9.1f' % (
+            r['worker_class'], r['endpoint'], r['rps'], r['errors'], r['p50_ms'], r['p95_ms'], r['p99_ms']))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
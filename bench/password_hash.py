@@ -0,0 +1,137 @@
+"""Pilih parameter PASSWORD_HASH_METHOD dan ukur efek process pool saat badai login.
+
+Untuk setiap metode: latensi satu hash (median dari --samples), lalu badai verify dari
+--threads thread selama --duration detik dengan PASSWORD_HASH_WORKERS = tiap nilai --workers.
+Selama badai satu thread "ping" mengukur keterlambatan pekerjaan ringan di proses yang sama
+(mewakili request lain di worker gunicorn). Rekomendasi = metode terkuat (urutan --methods) yang
+median hash-nya <= --target-ms.
+
+    python bench/password_hash.py --methods pbkdf2:sha256:300000 pbkdf2:sha256:600000 scrypt:32768:8:1 \\
+        --workers 0 4 --threads 16 --target-ms 250
+
+Hasil ditambahkan ke bench/results/passwords.jsonl.
+"""
+import argparse
+import datetime
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loadtest_workers import percentile
+from passwords import PasswordHasher, PasswordHasherBusy, normalize_method
+from startup_time import git_commit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_FILE = os.path.join(ROOT, 'bench', 'results', 'passwords.jsonl')
+PASSWORD = 'correct horse battery staple'
+
+
+def single_hash_ms(method, samples):
+    hasher = PasswordHasher(method, workers=0)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        hasher.hash(PASSWORD)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def storm(method, workers, threads, duration, max_pending):
+    hasher = PasswordHasher(method, workers=workers, max_pending=max_pending, queue_timeout=duration)
+    stored = hasher.hash(PASSWORD)  # sekaligus memanaskan pool
+    latencies, pings = [], []
+    busy = [0]
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+
+    def login():
+        while time.time() < stop_at:
+            start = time.perf_counter()
+            try:
+                hasher.verify(stored, PASSWORD)
+            except PasswordHasherBusy:
+                with lock:
+                    busy[0] += 1
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    def ping():
+        while time.time() < stop_at:
+            start = time.perf_counter()
+            time.sleep(0.005)
+            pings.append(time.perf_counter() - start - 0.005)
+
+    pool = [threading.Thread(target=login) for _ in range(threads)] + [threading.Thread(target=ping)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    if hasher._pool is not None:
+        hasher._pool.shutdown()
+    return {
+        'workers': workers,
+        'verify_per_s': round(len(latencies) / duration, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+        'ping_delay_p99_ms': round(percentile(pings, 99) * 1000, 1),
+        'busy': busy[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--methods', nargs='+', default=[
+        'pbkdf2:sha256:300000', 'pbkdf2:sha256:600000', 'scrypt:16384:8:1', 'scrypt:32768:8:1'])
+    parser.add_argument('--workers', nargs='+', type=int, default=[0, min(4, os.cpu_count() or 1)])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=5)
+    parser.add_argument('--samples', type=int, default=5)
+    parser.add_argument('--max-pending', type=int, default=32)
+    parser.add_argument('--target-ms', type=float, default=250, help='Batas latensi satu hash untuk rekomendasi')
+    parser.add_argument('--no-save', action='store_true', help='Jangan tulis ke passwords.jsonl')
+    args = parser.parse_args()
+
+    results = []
+    for method in args.methods:
+        method = normalize_method(method)
+        entry = {'method': method, 'hash_ms': round(single_hash_ms(method, args.samples), 1), 'storms': []}
+        for workers in args.workers:
+            entry['storms'].append(storm(method, workers, args.threads, args.duration, args.max_pending))
+        results.append(entry)
+
+    print(f'{os.cpu_count()} CPU, {args.threads} thread login, {args.duration:g} s per badai')
+    print('%-24s %8s %8s %10s %9s %9s %10s %6s' % (
+        'metode', 'hash ms', 'workers', 'verify/s', 'p50 ms', 'p99 ms', 'ping p99', 'busy'))
+    for entry in results:
+        for storm_result in entry['storms']:
+            print('%-24s %8.1f %8d %10.1f %9.1f %9.1f %10.1f %6d' % (
+                entry['method'], entry['hash_ms'], storm_result['workers'], storm_result['verify_per_s'],
+                storm_result['p50_ms'], storm_result['p99_ms'], storm_result['ping_delay_p99_ms'],
+                storm_result['busy']))
+    fitting = [entry['method'] for entry in results if entry['hash_ms'] <= args.target_ms]
+    recommended = fitting[-1] if fitting else None
+    print(f'Rekomendasi (hash <= {args.target_ms:g} ms): PASSWORD_HASH_METHOD={recommended or "-"}')
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+        with open(RESULTS_FILE, 'a') as f:
+            f.write(json.dumps({
+                'commit': git_commit(),
+                'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+                'cpu_count': os.cpu_count(),
+                'threads': args.threads,
+                'duration': args.duration,
+                'target_ms': args.target_ms,
+                'recommended': recommended,
+                'results': results,
+            }) + '\n')
+
+
+if __name__ == '__main__':
+    main()
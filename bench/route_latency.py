@@ -0,0 +1,193 @@
+"""Benchmark end-to-end semua route lewat Flask test client, hasil disimpan per commit.
+
+Per route diukur p50/p95 latensi, jumlah query SQL per request (event before_cursor_execute di
+engine, termasuk query session/idempotency) dan ukuran response. Login memakai akun dari
+bench/seed_data.py (bench-user / bench-admin). Setiap route dipanaskan dulu (--warmup), jadi
+angkanya kondisi steady state dengan cache aplikasi sudah terisi.
+
+Hasil ditambahkan ke bench/results/routes.jsonl bersama hash commit dan jumlah baris tabel
+utama, lalu p50 dibandingkan dengan run sebelumnya pada dataset yang sama.
+
+    DATABASE_URI=sqlite:///bench.db python bench/seed_data.py --scale small --create-tables
+    DATABASE_URI=sqlite:///bench.db python bench/route_latency.py --iterations 30
+    DATABASE_URI=sqlite:///bench.db python bench/route_latency.py --routes dashboard admin_orders --gzip
+
+Route yang merusak data (hapus / edit) dan yang butuh layanan luar (login Google, Midtrans,
+SSE) tidak diukur; checkout memakai COD pada produk berstok besar.
+"""
+import argparse
+import datetime
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, func
+
+from app import create_app
+from models import Cart, Order, Product, User, db
+from seed_data import BENCH_ADMIN_EMAIL, BENCH_PASSWORD, BENCH_USER_EMAIL
+from startup_time import git_commit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_FILE = os.path.join(ROOT, 'bench', 'results', 'routes.jsonl')
+
+
+def routes(ids):
+    """(nama, akun, method, url, kwargs request)"""
+    product, order, user, cart = ids['product'], ids['order'], ids['user'], ids['cart']
+    return [
+        ('dashboard', 'user', 'GET', '/dashboard', {}),
+        ('produk_user', 'user', 'GET', '/produk-user', {}),
+        ('cart_user', 'user', 'GET', '/cart', {}),
+        ('order_user', 'user', 'GET', '/order-user', {}),
+        ('order_detail', 'user', 'GET', f'/order/detail/{order}', {}),
+        ('profile_user', 'user', 'GET', '/profile-user', {}),
+        ('form_order_user', 'user', 'GET', f'/form-order-user?product_id={product}', {}),
+        ('product_image', 'user', 'GET', f'/product/{product}/image', {}),
+        ('user_avatar', 'admin', 'GET', f'/user/{user}/avatar', {}),
+        ('add_to_cart', 'user', 'POST', f'/add-to-cart/{product}', {}),
+        ('cart_checkout_api', 'user', 'POST', '/api/cart/checkout', {'json': {'cart_ids': [cart]}}),
+        ('process_order', 'user', 'POST', '/api/order/process',
+         {'json': {'payment': 'COD', 'productId': product, 'quantity': 1}}),
+        ('admin_dashboard', 'admin', 'GET', '/admin/dashboard', {}),
+        ('admin_products', 'admin', 'GET', '/admin/products', {}),
+        ('admin_products_data', 'admin', 'GET', '/admin/products/data', {}),
+        ('admin_orders', 'admin', 'GET', '/admin/orders', {}),
+        ('admin_orders_data', 'admin', 'GET', '/admin/orders/data?status=pending', {}),
+        ('admin_orders_detail', 'admin', 'GET', f'/admin/orders-detail/{order}/{ids["bench_user"]}', {}),
+        ('admin_users', 'admin', 'GET', '/admin/users', {}),
+        ('admin_users_data', 'admin', 'GET', '/admin/users/data', {}),
+        ('admin_add_product', 'admin', 'GET', '/admin/add-product', {}),
+        ('admin_edit_product', 'admin', 'GET', f'/admin/edit-product?product_id={product}', {}),
+        ('admin_add_user', 'admin', 'GET', '/admin/add-user', {}),
+        ('admin_edit_user', 'admin', 'GET', f'/admin/edit-user?user_id={user}', {}),
+        ('admin_report', 'admin', 'GET', '/admin/report', {}),
+    ]
+
+
+def dataset_counts():
+    return {model.__tablename__: db.session.query(func.count(model.id)).scalar()
+            for model in (User, Product, Order, Cart)}
+
+
+def pick_ids():
+    bench_user = db.session.query(User.id).filter_by(email=BENCH_USER_EMAIL).scalar()
+    if bench_user is None:
+        raise SystemExit('Akun bench tidak ditemukan, jalankan bench/seed_data.py dulu')
+    # Produk aktif dengan stok terbesar supaya checkout berulang tidak kehabisan stok
+    product = db.session.query(Product.id).filter(Product.product_status == True).order_by(
+        Product.product_stock.desc(), Product.id).limit(1).scalar()
+    order = db.session.query(Order.id).filter_by(user_id=bench_user).order_by(Order.id.desc()).limit(1).scalar()
+    user = db.session.query(User.id).filter(User.image_profile.any()).order_by(User.id).limit(1).scalar()
+    cart = db.session.query(Cart.id).filter_by(user_id=bench_user).order_by(Cart.id).limit(1).scalar()
+    return {'bench_user': bench_user, 'product': product, 'order': order or 0,
+            'user': user or bench_user, 'cart': cart or 0}
+
+
+def login(app, email):
+    client = app.test_client()
+    response = client.post('/login', data={'email': email, 'password': BENCH_PASSWORD})
+    if response.status_code != 302:
+        raise SystemExit(f'Login {email} gagal ({response.status_code})')
+    return client
+
+
+def measure(client, method, url, kwargs, iterations, warmup, query_counter, headers):
+    latencies, queries, sizes, statuses = [], [], [], set()
+    for i in range(warmup + iterations):
+        query_counter[0] = 0
+        start = time.perf_counter()
+        response = client.open(url, method=method, headers=headers, **kwargs)
+        body = response.get_data()
+        elapsed = time.perf_counter() - start
+        if i < warmup:
+            continue
+        latencies.append(elapsed * 1000)
+        queries.append(query_counter[0])
+        sizes.append(len(body))
+        statuses.add(response.status_code)
+    latencies.sort()
+    return {
+        'p50_ms': round(statistics.median(latencies), 2),
+        'p95_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2),
+        'queries': statistics.median(queries),
+        'bytes': int(statistics.median(sizes)),
+        'status': sorted(statuses),
+    }
+
+
+def same_dataset(a, b):
+    """Jumlah baris tiap tabel selisih <= 1% (benchmark sendiri menambah order)"""
+    return a.keys() == b.keys() and all(abs(a[k] - b[k]) <= max(1, a[k] * 0.01) for k in a)
+
+
+def load_previous(dataset):
+    if not os.path.exists(RESULTS_FILE):
+        return None
+    with open(RESULTS_FILE) as f:
+        runs = [json.loads(line) for line in f if line.strip()]
+    same = [run for run in runs if same_dataset(run.get('dataset', {}), dataset)]
+    return same[-1] if same else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--routes', nargs='+', help='Hanya route dengan nama ini')
+    parser.add_argument('--gzip', action='store_true', help='Kirim Accept-Encoding: gzip (ukur byte terkompresi)')
+    parser.add_argument('--no-save', action='store_true', help='Jangan tulis ke routes.jsonl')
+    args = parser.parse_args()
+
+    app = create_app()
+    headers = {'Accept-Encoding': 'gzip'} if args.gzip else {}
+    with app.app_context():
+        query_counter = [0]
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def count_query(*_):
+            query_counter[0] += 1
+
+        ids = pick_ids()
+        dataset = dataset_counts()
+        db.session.remove()
+
+    clients = {'user': login(app, BENCH_USER_EMAIL), 'admin': login(app, BENCH_ADMIN_EMAIL)}
+    results = {}
+    for name, account, method, url, kwargs in routes(ids):
+        if args.routes and name not in args.routes:
+            continue
+        results[name] = measure(clients[account], method, url, kwargs, args.iterations, args.warmup,
+                                query_counter, headers)
+
+    previous = load_previous(dataset)
+    print('dataset: ' + ', '.join(f'{table}={count}' for table, count in dataset.items()))
+    print('%-22s %9s %9s %8s %10s  %s' % ('route', 'p50 ms', 'p95 ms', 'queries', 'bytes', 'status'))
+    for name, r in results.items():
+        line = '%-22s %9.2f %9.2f %8g %10d  %s' % (
+            name, r['p50_ms'], r['p95_ms'], r['queries'], r['bytes'], ','.join(map(str, r['status'])))
+        before = previous and previous['routes'].get(name)
+        if before:
+            change = (r['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0
+            line += '   p50 %+.0f%%, queries %g -> %g (vs %s)' % (change, before['queries'], r['queries'], previous['commit'])
+        print(line)
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+        with open(RESULTS_FILE, 'a') as f:
+            f.write(json.dumps({
+                'commit': git_commit(),
+                'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+                'iterations': args.iterations,
+                'gzip': args.gzip,
+                'dataset': dataset,
+                'routes': results,
+            }) + '\n')
+
+
+if __name__ == '__main__':
+    main()
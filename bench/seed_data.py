@@ -0,0 +1,301 @@
+"""Isi database dengan data sintetis bervolume besar untuk benchmark.
+
+Data dibuat lewat tabel model yang sama (User, ImageUsers, Product, Image, Cart, Order,
+ProductOrder) dengan bulk insert Core per batch dan id yang sudah ditentukan di Python, jadi
+tidak ada round trip per baris. Gambar berupa PNG valid berukuran nyata (--image-kb); beberapa
+blob unik dipakai bergantian supaya waktu seeding tidak habis untuk membuat byte acak. Semua angka
+acak memakai --seed yang sama sehingga dataset bisa dibuat ulang persis.
+
+Selalu membuat (jika belum ada) akun tetap untuk bench/route_latency.py:
+bench-admin@example.com dan bench-user@example.com, password `bench`.
+
+    DATABASE_URI=postgresql://... python bench/seed_data.py --scale large     # 100k user, 20k produk, 2M order
+    DATABASE_URI=sqlite:///bench.db python bench/seed_data.py --scale small --orders 50000
+"""
+import argparse
+import os
+import random
+import struct
+import sys
+import time
+import zlib
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, insert, text
+from werkzeug.security import generate_password_hash
+
+from fragment_cache import bump_cache_version
+from models import (Base, Cart, GenderEnum, Image, ImageUsers, Order, OrderStatusEnum, PaymentMethodEnum,
+                    Product, ProductOrder, RoleEnum, User, db)
+
+SCALES = {
+    'small': {'users': 1000, 'products': 200, 'orders': 20000},
+    'medium': {'users': 10000, 'products': 2000, 'orders': 200000},
+    'large': {'users': 100000, 'products': 20000, 'orders': 2000000},
+}
+
+BENCH_PASSWORD = 'bench'
+BENCH_ADMIN_EMAIL = 'bench-admin@example.com'
+BENCH_USER_EMAIL = 'bench-user@example.com'
+
+FIRST_NAMES = ['Budi', 'Siti', 'Agus', 'Dewi', 'Rizky', 'Putri', 'Andi', 'Rina', 'Fajar', 'Ayu',
+               'Dimas', 'Nur', 'Yusuf', 'Indah', 'Bayu', 'Lestari', 'Hendra', 'Wulan', 'Eko', 'Maya']
+LAST_NAMES = ['Santoso', 'Wijaya', 'Saputra', 'Pratama', 'Hidayat', 'Kusuma', 'Nugroho', 'Lubis',
+              'Siregar', 'Harahap', 'Setiawan', 'Rahmawati', 'Gunawan', 'Putra', 'Halim']
+CITIES = ['Jakarta', 'Bandung', 'Surabaya', 'Medan', 'Yogyakarta', 'Semarang', 'Makassar', 'Denpasar']
+CATEGORIES = ['Elektronik', 'Fashion', 'Makanan', 'Minuman', 'Kesehatan', 'Kecantikan', 'Olahraga',
+              'Rumah Tangga', 'Buku', 'Mainan', 'Otomotif', 'Aksesoris']
+ADJECTIVES = ['Premium', 'Original', 'Lite', 'Pro', 'Klasik', 'Organik', 'Mini', 'Jumbo', 'Eco', 'Plus']
+NOUNS = ['Kopi', 'Kaos', 'Sepatu', 'Headset', 'Tas', 'Madu', 'Teh', 'Jaket', 'Botol', 'Lampu',
+         'Kemeja', 'Sabun', 'Charger', 'Dompet', 'Bantal', 'Keripik', 'Sambal', 'Payung']
+
+
+def png_blob(rng, target_bytes):
+    """PNG RGB valid (IDAT tanpa kompresi) dengan ukuran file kira-kira target_bytes"""
+    side = max(1, int((target_bytes / 3) ** 0.5))
+    row = side * 3
+    raw = b''.join(b'\x00' + rng.randbytes(row) for _ in range(side))
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    header = struct.pack('>IIBBBBB', side, side, 8, 2, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(raw, 0)) + chunk(b'IEND', b'')
+
+
+def stock_level(rng):
+    """5% habis, 10% stok sangat besar (dipakai benchmark checkout), sisanya 1-500"""
+    r = rng.random()
+    if r < 0.05:
+        return 0
+    if r < 0.15:
+        return 1000000
+    return rng.randint(1, 500)
+
+
+def next_id(model):
+    return (db.session.query(func.max(model.id)).scalar() or 0) + 1
+
+
+class BulkWriter:
+    """Kumpulkan baris per tabel lalu insert per batch, tiap batch dalam transaksi sendiri"""
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.pending = {}
+        self.counts = {}
+
+    def add(self, model, row):
+        self.pending.setdefault(model, []).append(row)
+
+    def flush_if_full(self, *models):
+        if any(len(self.pending.get(model, ())) >= self.batch_size for model in models):
+            self.flush(*models)
+
+    def flush(self, *models):
+        # models diberikan berurutan parent dulu (foreign key)
+        for model in models:
+            rows = self.pending.get(model)
+            if not rows:
+                continue
+            with db.engine.begin() as conn:
+                conn.execute(insert(model.__table__), rows)
+            self.counts[model.__tablename__] = self.counts.get(model.__tablename__, 0) + len(rows)
+            self.pending[model] = []
+
+
+def ensure_bench_accounts(password_hash):
+    ids = {}
+    for email, role, first_name in ((BENCH_ADMIN_EMAIL, RoleEnum.ADMIN, 'Bench Admin'),
+                                    (BENCH_USER_EMAIL, RoleEnum.USER, 'Bench User')):
+        user = db.session.query(User).filter_by(email=email).first()
+        if user is None:
+            user = User(first_name=first_name, last_name='Seed', email=email, role=role,
+                        password_hash=password_hash, address='Jl. Benchmark No. 1, Jakarta')
+            db.session.add(user)
+            db.session.commit()
+        ids[role] = user.id
+    return ids[RoleEnum.ADMIN], ids[RoleEnum.USER]
+
+
+def seed(args):
+    rng = random.Random(args.seed)
+    writer = BulkWriter(args.batch_size)
+    now = datetime.now()
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+    _, bench_user_id = ensure_bench_accounts(password_hash)
+
+    product_blobs = [png_blob(rng, args.image_kb * 1024) for _ in range(args.unique_images)]
+    avatar_blobs = [png_blob(rng, args.avatar_kb * 1024) for _ in range(args.unique_images)]
+
+    started = time.perf_counter()
+
+    # Users (+ foto profil untuk sebagian)
+    first_user = next_id(User)
+    image_user_id = next_id(ImageUsers)
+    for i in range(args.users):
+        user_id = first_user + i
+        created = now - timedelta(days=rng.randint(0, 730), seconds=rng.randint(0, 86400))
+        writer.add(User, {
+            'id': user_id,
+            'first_name': rng.choice(FIRST_NAMES),
+            'last_name': rng.choice(LAST_NAMES),
+            'email': f'user{user_id}@bench.example.com',
+            'password_hash': password_hash,
+            'phone_number': f'08{rng.randint(100000000, 999999999)}',
+            'address': f'Jl. {rng.choice(LAST_NAMES)} No. {rng.randint(1, 200)}, {rng.choice(CITIES)}',
+            'gender': rng.choice(list(GenderEnum)),
+            'role': RoleEnum.USER,
+            'created_at': created,
+            'updated_at': created,
+            'is_active': rng.random() > 0.02,
+            'birth_date': datetime(rng.randint(1960, 2006), rng.randint(1, 12), rng.randint(1, 28)),
+        })
+        if rng.random() < args.avatar_ratio:
+            blob = rng.choice(avatar_blobs)
+            writer.add(ImageUsers, {'id': image_user_id, 'user_id': user_id, 'file_data': blob,
+                                    'file_name': f'avatar_{user_id}.png', 'file_size': len(blob), 'file_type': 'image/png'})
+            image_user_id += 1
+        writer.flush_if_full(User, ImageUsers)
+    writer.flush(User, ImageUsers)
+    user_ids = list(range(first_user, first_user + args.users)) or [bench_user_id]
+
+    # Produk + gambar
+    first_product = next_id(Product)
+    image_id = next_id(Image)
+    prices = {}
+    names = {}
+    categories = {}
+    for i in range(args.products):
+        product_id = first_product + i
+        created = now - timedelta(days=rng.randint(0, 730))
+        prices[product_id] = rng.randint(10, 4000) * 500
+        names[product_id] = f'{rng.choice(NOUNS)} {rng.choice(ADJECTIVES)} {product_id}'
+        categories[product_id] = rng.choice(CATEGORIES)
+        writer.add(Product, {
+            'id': product_id,
+            'product_name': names[product_id],
+            'product_description': f'{names[product_id]} kualitas terbaik dari {rng.choice(CITIES)}. ' * 3,
+            'product_category': categories[product_id],
+            'product_price': prices[product_id],
+            'product_stock': stock_level(rng),
+            'product_status': rng.random() > 0.1,
+            'created_at': created,
+            'updated_at': created,
+        })
+        for _ in range(args.images_per_product):
+            blob = rng.choice(product_blobs)
+            writer.add(Image, {'id': image_id, 'product_id': product_id, 'file_data': blob,
+                               'file_name': f'product_{product_id}.png', 'file_size': len(blob), 'file_type': 'image/png'})
+            image_id += 1
+        writer.flush_if_full(Product, Image)
+    writer.flush(Product, Image)
+    product_ids = list(prices)
+    if not product_ids:
+        print('Tidak ada produk baru, order dan cart dilewati')
+        return writer.counts, time.perf_counter() - started
+
+    # Keranjang: sebagian user punya 1-5 item, bench user selalu punya 3
+    cart_id = next_id(Cart)
+    for user_id in user_ids + [bench_user_id]:
+        if user_id != bench_user_id and rng.random() > args.cart_ratio:
+            continue
+        for product_id in rng.sample(product_ids, min(len(product_ids), 3 if user_id == bench_user_id else rng.randint(1, 5))):
+            writer.add(Cart, {'id': cart_id, 'user_id': user_id, 'product_id': product_id,
+                              'quantity': rng.randint(1, 3), 'created_at': now - timedelta(days=rng.randint(0, 30))})
+            cart_id += 1
+        writer.flush_if_full(Cart)
+    writer.flush(Cart)
+
+    # Order + item (snapshot harga/nama) + kolom ringkasan
+    order_id = next_id(Order)
+    line_id = next_id(ProductOrder)
+    statuses = [OrderStatusEnum.APPROVE] * 12 + [OrderStatusEnum.PENDING] * 5 + [OrderStatusEnum.CANCEL] * 3
+    for i in range(args.orders):
+        user_id = bench_user_id if i % max(1, args.orders // args.bench_user_orders) == 0 else rng.choice(user_ids)
+        created = now - timedelta(days=rng.randint(0, 730), seconds=rng.randint(0, 86400))
+        lines = [(product_id, rng.randint(1, 4)) for product_id in
+                 rng.sample(product_ids, min(len(product_ids), rng.choice((1, 1, 2, 2, 3, 4))))]
+        payment = rng.choice(list(PaymentMethodEnum))
+        for product_id, quantity in lines:
+            writer.add(ProductOrder, {'id': line_id, 'order_id': order_id, 'order_created_at': created,
+                                      'product_id': product_id,
+                                      'quantity': quantity, 'unit_price': prices[product_id],
+                                      'product_name': names[product_id], 'product_category': categories[product_id]})
+            line_id += 1
+        writer.add(Order, {
+            'id': order_id,
+            'user_id': user_id,
+            'created_at': created,
+            'updated_at': created,
+            'amount': sum(prices[p] * q for p, q in lines),
+            'payment_method': payment,
+            'midtrans_order_id': f'ORDER-{order_id}-seed' if payment == PaymentMethodEnum.TRANSFER_BANK else None,
+            'status': rng.choice(statuses),
+            'item_count': sum(q for _, q in lines),
+            'line_count': len(lines),
+            'first_product_id': lines[0][0],
+            'first_product_name': names[lines[0][0]],
+        })
+        order_id += 1
+        writer.flush_if_full(Order, ProductOrder)
+        if (i + 1) % 100000 == 0:
+            print(f'  {i + 1} order ({(i + 1) / (time.perf_counter() - started):.0f} order/s)')
+    writer.flush(Order, ProductOrder)
+
+    reset_sequences()
+    bump_cache_version('catalog')
+    db.session.commit()
+    return writer.counts, time.perf_counter() - started
+
+
+def reset_sequences():
+    """Id diisi manual, jadi sequence PostgreSQL harus dimajukan ke MAX(id)"""
+    if db.engine.dialect.name != 'postgresql':
+        return
+    with db.engine.begin() as conn:
+        for model in (User, ImageUsers, Product, Image, Cart, Order, ProductOrder):
+            table = model.__tablename__
+            conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                              f"COALESCE((SELECT MAX(id) FROM {table}), 1))"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--users', type=int)
+    parser.add_argument('--products', type=int)
+    parser.add_argument('--orders', type=int)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--image-kb', type=int, default=80, help='Ukuran gambar produk')
+    parser.add_argument('--avatar-kb', type=int, default=20, help='Ukuran foto profil')
+    parser.add_argument('--images-per-product', type=int, default=1)
+    parser.add_argument('--unique-images', type=int, default=16)
+    parser.add_argument('--avatar-ratio', type=float, default=0.3)
+    parser.add_argument('--cart-ratio', type=float, default=0.2)
+    parser.add_argument('--bench-user-orders', type=int, default=50, help='Jumlah order milik bench-user')
+    parser.add_argument('--create-tables', action='store_true', help='Base.metadata.create_all dulu (DB kosong)')
+    args = parser.parse_args()
+    for key, value in SCALES[args.scale].items():
+        if getattr(args, key) is None:
+            setattr(args, key, value)
+
+    # Diimpor di sini: load_scenarios.py mengimpor konstanta akun sebelum env stub OAuth diset
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        if args.create_tables:
+            Base.metadata.create_all(db.engine)
+        counts, elapsed = seed(args)
+        total = sum(counts.values())
+        for table, count in sorted(counts.items()):
+            print(f'{table:20s} {count:>10d}')
+        print(f'{total} baris dalam {elapsed:.1f} detik ({total / max(elapsed, 1e-9):.0f} baris/detik)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Ukur waktu cold start aplikasi dan simpan hasilnya agar bisa dibandingkan antar commit.
+
+Setiap run dijalankan di proses Python baru dan mengukur:
+- import_ms: `import app`
+- create_app_ms: `create_app()`
+- first_request_ms: request pertama `GET /login` lewat test client
+
+Hasil (median dari --runs) ditambahkan ke bench/results/startup.jsonl bersama hash commit,
+lalu dibandingkan dengan entri sebelumnya.
+
+    DATABASE_URI=sqlite:///bench.db python bench/startup_time.py --runs 10
+"""
+import argparse
+import datetime
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_FILE = os.path.join(ROOT, 'bench', 'results', 'startup.jsonl')
+
+PROBE = r'''
+import json, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+flask_app = app.create_app()
+t2 = time.perf_counter()
+flask_app.test_client().get('/login')
+t3 = time.perf_counter()
+print(json.dumps({
+    'import_ms': (t1 - t0) * 1000,
+    'create_app_ms': (t2 - t1) * 1000,
+    'first_request_ms': (t3 - t2) * 1000,
+    'total_ms': (t3 - t0) * 1000,
+}))
+'''
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def measure_once():
+    out = subprocess.check_output([sys.executable, '-c', PROBE], cwd=ROOT, text=True)
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def load_previous():
+    if not os.path.exists(RESULTS_FILE):
+        return None
+    with open(RESULTS_FILE) as f:
+        lines = [line for line in f if line.strip()]
+    return json.loads(lines[-1]) if lines else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--no-save', action='store_true', help='Jangan tulis ke startup.jsonl')
+    args = parser.parse_args()
+
+    samples = [measure_once() for _ in range(args.runs)]
+    result = {
+        'commit': git_commit(),
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'runs': args.runs,
+    }
+    for key in ('import_ms', 'create_app_ms', 'first_request_ms', 'total_ms'):
+        result[key] = round(statistics.median(s[key] for s in samples), 2)
+
+    previous = load_previous()
+    for key in ('import_ms', 'create_app_ms', 'first_request_ms', 'total_ms'):
+        line = '%-17s %9.2f ms' % (key, result[key])
+        if previous and key in previous:
+            line += '   (sebelumnya %9.2f ms @ %s)' % (previous[key], previous.get('commit'))
+        print(line)
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+        with open(RESULTS_FILE, 'a') as f:
+            f.write(json.dumps(result) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""Kontensi stok produk panas: reservasi satu baris vs shard pada konkurensi tinggi.
+
+Setiap thread mengulang transaksi checkout minimal: reserve(produk, 1), transaksi ditahan
+--hold-ms (mensimulasikan insert order dan item di transaksi yang sama), lalu commit. Pada mode
+satu baris semua transaksi antre di lock baris product_db; pada mode shard hanya transaksi yang
+kebetulan memilih shard yang sama. Setelah tiap run dicek stok akhir = stok awal - reservasi
+yang berhasil.
+
+SQLite mengunci seluruh database saat menulis, jadi shard tidak membantu di sana; bandingkan di
+PostgreSQL / MySQL:
+
+    DATABASE_URI=postgresql://... python bench/stock_contention.py --product-id 1 \\
+        --shards 0 4 16 --threads 8 32 128 --hold-ms 5
+
+Hasil ditambahkan ke bench/results/stock.jsonl.
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from loadtest_workers import percentile
+from models import Product, db
+from startup_time import git_commit
+from stock import configure_shards, current_stock, reserve, set_stock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_FILE = os.path.join(ROOT, 'bench', 'results', 'stock.jsonl')
+
+
+def prepare(product_id, shards, stock):
+    product = db.session.get(Product, product_id)
+    if product is None:
+        raise SystemExit(f'Produk {product_id} tidak ditemukan')
+    configure_shards(product, shards)
+    set_stock(product, stock)
+    db.session.commit()
+    db.session.remove()
+
+
+def run(app, product_id, threads, duration, hold):
+    latencies = []
+    errors = [0]
+    rejected = [0]
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+
+    def worker():
+        with app.app_context():
+            while time.time() < stop_at:
+                start = time.perf_counter()
+                try:
+                    ok = reserve(db.session.get(Product, product_id), 1)
+                    time.sleep(hold)
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    with lock:
+                        errors[0] += 1
+                    print(f'reserve error: {e}')
+                    continue
+                elapsed = time.perf_counter() - start
+                with lock:
+                    if ok:
+                        latencies.append(elapsed)
+                    else:
+                        rejected[0] += 1
+            db.session.remove()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return {
+        'reserved': len(latencies),
+        'rejected': rejected[0],
+        'errors': errors[0],
+        'tps': round(len(latencies) / duration, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--product-id', type=int, required=True)
+    parser.add_argument('--shards', nargs='+', type=int, default=[0, 8], help='0 = satu baris')
+    parser.add_argument('--threads', nargs='+', type=int, default=[8, 32, 64])
+    parser.add_argument('--duration', type=int, default=10)
+    parser.add_argument('--hold-ms', type=float, default=5, help='Lama transaksi ditahan setelah reservasi')
+    parser.add_argument('--stock', type=int, default=10 ** 7)
+    parser.add_argument('--no-save', action='store_true', help='Jangan tulis ke stock.jsonl')
+    args = parser.parse_args()
+
+    # Satu koneksi per thread, tanpa antre di pool
+    app = create_app({'SQLALCHEMY_ENGINE_OPTIONS': {
+        'pool_pre_ping': True, 'pool_size': max(args.threads) + 2, 'max_overflow': 0}})
+    results = []
+    with app.app_context():
+        dialect = db.engine.dialect.name
+        for shards in args.shards:
+            for threads in args.threads:
+                prepare(args.product_id, shards, args.stock)
+                stats = run(app, args.product_id, threads, args.duration, args.hold_ms / 1000.0)
+                final = current_stock(db.session.get(Product, args.product_id))
+                stats.update({'shards': shards, 'threads': threads, 'final_stock': final,
+                              'consistent': final == args.stock - stats['reserved']})
+                db.session.remove()
+                results.append(stats)
+        # Kembalikan produk ke mode satu baris
+        prepare(args.product_id, 0, args.stock)
+
+    print(f'{dialect}, hold {args.hold_ms:g} ms, {args.duration} s per run')
+    print('%7s %8s %9s %9s %9s %9s %8s %7s  %s' % (
+        'shards', 'threads', 'reserve/s', 'p50 ms', 'p95 ms', 'p99 ms', 'ditolak', 'errors', 'stok'))
+    for r in results:
+        print('%7s %8d %9.1f %9.1f %9.1f %9.1f %8d %7d  %s' % (
+            r['shards'] or '-', r['threads'], r['tps'], r['p50_ms'], r['p95_ms'], r['p99_ms'],
+            r['rejected'], r['errors'], 'OK' if r['consistent'] else 'TIDAK KONSISTEN'))
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+        with open(RESULTS_FILE, 'a') as f:
+            f.write(json.dumps({
+                'commit': git_commit(),
+                'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+                'dialect': dialect,
+                'hold_ms': args.hold_ms,
+                'duration': args.duration,
+                'runs': results,
+            }) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Kompresi response HTML/JSON (gzip, atau brotli jika paketnya terpasang).
+
+Response biasa dikompres utuh jika ukurannya >= COMPRESS_MIN_SIZE. Response streaming
+(misalnya file besar atau generator) dikompres per chunk dengan zlib compressobj, jadi tidak
+perlu ditampung penuh di memori. Aset di /assets sudah dikompres saat build (Content-Encoding
+sudah di-set) sehingga dilewati.
+"""
+import gzip
+import zlib
+
+from flask import request
+
+DEFAULT_MIMETYPES = (
+    'text/html', 'text/css', 'text/plain', 'text/javascript',
+    'application/json', 'application/javascript', 'image/svg+xml',
+)
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def _stream_gzip(chunks, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = format gzip
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def _choose_encoding(streamed):
+    accepted = request.accept_encodings
+    if not streamed and accepted['br'] and _brotli() is not None:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def init_compression(app):
+    app.config.setdefault('COMPRESS_MIN_SIZE', 1024)
+    app.config.setdefault('COMPRESS_LEVEL', 6)
+    app.config.setdefault('COMPRESS_BR_LEVEL', 4)
+    app.config.setdefault('COMPRESS_MIMETYPES', DEFAULT_MIMETYPES)
+
+    @app.after_request
+    def compress_response(response):
+        if (response.status_code != 200
+                or response.mimetype not in app.config['COMPRESS_MIMETYPES']
+                or 'Content-Encoding' in response.headers
+                or request.method == 'HEAD'):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        streamed = response.is_streamed
+        if not streamed and (response.content_length or 0) < app.config['COMPRESS_MIN_SIZE']:
+            return response
+
+        encoding = _choose_encoding(streamed)
+        if encoding is None:
+            return response
+
+        if streamed:
+            response.direct_passthrough = False
+            response.response = _stream_gzip(response.iter_encoded(), app.config['COMPRESS_LEVEL'])
+            response.headers.pop('Content-Length', None)
+        elif encoding == 'br':
+            response.set_data(_brotli().compress(response.get_data(), quality=app.config['COMPRESS_BR_LEVEL']))
+        else:
+            response.set_data(gzip.compress(response.get_data(), compresslevel=app.config['COMPRESS_LEVEL'], mtime=0))
+        response.headers['Content-Encoding'] = encoding
+
+        # Body berubah, jadi ETag kuat dari body asli diturunkan menjadi weak
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
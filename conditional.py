@@ -0,0 +1,68 @@
+"""Conditional GET dengan weak ETag dari versi data.
+
+Versi data sebuah tabel = (jumlah baris, MAX(created_at), MAX(updated_at)). Insert dan delete
+mengubah jumlah baris, update mengubah updated_at, dan semuanya murah karena memakai index
+updated_at/created_at. ETag dihitung SEBELUM view dijalankan, jadi request yang datanya tidak
+berubah langsung dijawab 304 tanpa query listing maupun render template.
+
+    @bp.route('/admin/products', methods=['GET', 'POST'])
+    @login_required
+    @conditional(Product)
+    def admin_products(): ...
+"""
+import hashlib
+from functools import wraps
+
+from flask import current_app, request, session
+from flask_login import current_user
+from sqlalchemy import func
+
+from models import db
+
+
+def table_stamp(model):
+    columns = [func.count()]
+    for name in ('created_at', 'updated_at'):
+        if hasattr(model, name):
+            columns.append(func.max(getattr(model, name)))
+    return tuple(db.session.query(*columns).select_from(model).one())
+
+
+def data_etag(*models, extra=None):
+    parts = [request.method, request.full_path, sorted(request.form.items(multi=True))]
+    if current_user.is_authenticated:
+        # Header/sidebar menampilkan data user login, jadi ikut masuk ETag
+        parts += [current_user.id, current_user.updated_at]
+    parts += [table_stamp(model) for model in models]
+    if extra is not None:
+        parts.append(extra())
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+def conditional(*models, extra=None):
+    """Set weak ETag di response 200 dan jawab 304 untuk GET/HEAD yang If-None-Match-nya cocok.
+
+    POST (listing DataTables) tetap mendapat ETag, tapi 304 hanya berlaku untuk GET/HEAD. Selama
+    ada pesan flash yang belum ditampilkan tidak ada 304 maupun ETag: halaman harus dirender
+    untuk menampilkannya, dan versi yang memuat flash itu tidak boleh dipakai ulang browser.
+    Halaman user yang menampilkan jumlah keranjang di header menyertakan Cart di `models`.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if session.get('_flashes'):
+                return view(*args, **kwargs)
+            etag = data_etag(*models, extra=extra)
+            if request.method in ('GET', 'HEAD') and request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+                response.set_etag(etag, weak=True)
+                response.headers['Cache-Control'] = 'private, no-cache'
+                return response
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag, weak=True)
+                response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,206 @@
+"""Fragment cache untuk HTML katalog (kartu produk dan grid).
+
+Dua tingkat:
+- lokal: LRU in-memory per worker, dibatasi total byte (FRAGMENT_CACHE_MAX_BYTES)
+- shared (opsional): Redis jika FRAGMENT_CACHE_REDIS_URL di-set dan paket `redis` terpasang
+
+Invalidasi memakai counter versi di tabel cache_version_db. Versi di-bump di transaksi yang
+sama dengan penulisan data admin (tambah/edit/hapus produk). Checkout dan pembatalan order
+mem-bump di transaksi pendek tersendiri setelah commit order (bump_cache_version_now), supaya
+lock baris versi tidak ditahan sepanjang transaksi order dan checkout semua produk tidak antre
+di satu baris. Versi ikut menjadi bagian key, jadi entri lama tidak pernah terbaca lagi dan akhirnya
+tergusur oleh LRU / TTL.
+"""
+import json
+import threading
+from collections import OrderedDict, defaultdict
+
+from flask import current_app
+
+from models import CacheVersion, db
+
+
+def _size_of(value):
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    return len(json.dumps(value).encode('utf-8'))
+
+
+class LRUByteCache:
+    """LRU thread-safe dengan batas total ukuran (byte), bukan jumlah entri"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            self._data.move_to_end(key)
+            return item[0]
+
+    def set(self, key, value):
+        size = _size_of(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            self._data[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._data.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisTier:
+    def __init__(self, url, ttl, prefix='frag:'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, json.dumps(value), ex=self.ttl)
+
+
+class FragmentCache:
+    def __init__(self, max_bytes, shared=None):
+        self.local = LRUByteCache(max_bytes)
+        self.shared = shared
+        self._stats = defaultdict(lambda: {'hits_local': 0, 'hits_shared': 0, 'misses': 0})
+        self._stats_lock = threading.Lock()
+
+    def _count(self, kind, field):
+        with self._stats_lock:
+            self._stats[kind][field] += 1
+
+    def get(self, kind, key):
+        full_key = f'{kind}:{key}'
+        value = self.local.get(full_key)
+        if value is not None:
+            self._count(kind, 'hits_local')
+            return value
+        if self.shared is not None:
+            try:
+                value = self.shared.get(full_key)
+            except Exception as e:
+                print(f"Fragment cache shared tier error: {e}")
+                value = None
+            if value is not None:
+                self._count(kind, 'hits_shared')
+                self.local.set(full_key, value)
+                return value
+        self._count(kind, 'misses')
+        return None
+
+    def set(self, kind, key, value):
+        full_key = f'{kind}:{key}'
+        self.local.set(full_key, value)
+        if self.shared is not None:
+            try:
+                self.shared.set(full_key, value)
+            except Exception as e:
+                print(f"Fragment cache shared tier error: {e}")
+
+    def get_or_render(self, kind, key, render):
+        value = self.get(kind, key)
+        if value is None:
+            value = render()
+            self.set(kind, key, value)
+        return value
+
+    def stats(self):
+        with self._stats_lock:
+            per_kind = {}
+            for kind, counts in self._stats.items():
+                total = counts['hits_local'] + counts['hits_shared'] + counts['misses']
+                hits = counts['hits_local'] + counts['hits_shared']
+                per_kind[kind] = dict(counts, hit_ratio=round(hits / total, 3) if total else 0.0)
+        return {
+            'entries': len(self.local),
+            'bytes': self.local.current_bytes,
+            'max_bytes': self.local.max_bytes,
+            'evictions': self.local.evictions,
+            'shared_tier': self.shared is not None,
+            'kinds': per_kind,
+        }
+
+
+def init_fragment_cache(app):
+    app.config.setdefault('FRAGMENT_CACHE_MAX_BYTES', 32 * 1024 * 1024)
+    app.config.setdefault('FRAGMENT_CACHE_REDIS_URL', None)
+    app.config.setdefault('FRAGMENT_CACHE_TTL', 60 * 60)
+
+    shared = None
+    if app.config['FRAGMENT_CACHE_REDIS_URL']:
+        try:
+            shared = RedisTier(app.config['FRAGMENT_CACHE_REDIS_URL'], app.config['FRAGMENT_CACHE_TTL'])
+        except ImportError:
+            print("FRAGMENT_CACHE_REDIS_URL di-set tapi paket redis tidak terpasang, hanya memakai cache lokal")
+    app.extensions['fragment_cache'] = FragmentCache(app.config['FRAGMENT_CACHE_MAX_BYTES'], shared)
+
+
+def get_fragment_cache():
+    return current_app.extensions['fragment_cache']
+
+
+def get_cache_version(name):
+    version = db.session.query(CacheVersion.version).filter_by(name=name).scalar()
+    return version or 0
+
+
+def _increment(name):
+    return db.session.query(CacheVersion).filter_by(name=name).update(
+        {CacheVersion.version: CacheVersion.version + 1}, synchronize_session=False
+    )
+
+
+def ensure_cache_version(name):
+    """Buat baris versi jika belum ada; aman dipanggil bersamaan (INSERT ... ON CONFLICT DO NOTHING)"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        if db.session.get(CacheVersion, name) is None:
+            db.session.add(CacheVersion(name=name, version=0))
+            db.session.flush()
+        return
+    db.session.execute(insert(CacheVersion).values(name=name, version=0).on_conflict_do_nothing(
+        index_elements=[CacheVersion.name]))
+
+
+def bump_cache_version(name):
+    """Naikkan versi di transaksi yang sedang berjalan (commit dilakukan oleh pemanggil)"""
+    if not _increment(name):
+        # Bump pertama (baris belum di-seed init-db): dua bump bersamaan tidak bentrok di INSERT
+        ensure_cache_version(name)
+        _increment(name)
+
+
+def bump_cache_version_now(name):
+    """Naikkan versi dan commit di transaksi sendiri; panggil setelah data yang berubah di-commit"""
+    bump_cache_version(name)
+    db.session.commit()
@@ -0,0 +1,100 @@
+"""Konfigurasi gunicorn.
+
+Semua nilai bisa dioverride lewat environment variable, contoh:
+
+    GUNICORN_WORKER_CLASS=gthread GUNICORN_THREADS=8 gunicorn -c gunicorn.conf.py wsgi:app
+
+Worker class yang didukung: sync, gthread, gevent (butuh `pip install gevent`,
+dan `psycogreen` jika memakai PostgreSQL). Default gevent: feed SSE /admin/orders/events
+menahan koneksi berjam-jam, di gthread setiap stream memegang satu thread. Tanpa paket gevent
+default kembali ke gthread, dan stream dibatasi setengah jumlah thread per worker
+(ORDER_EVENTS_MAX_STREAMS, sisanya dijawab 503).
+"""
+import importlib.util
+import multiprocessing
+import os
+import sys
+
+DEFAULT_WORKER_CLASS = 'gevent' if importlib.util.find_spec('gevent') else 'gthread'
+if 'GUNICORN_WORKER_CLASS' not in os.environ and DEFAULT_WORKER_CLASS != 'gevent':
+    print('gevent tidak terpasang, worker gthread dipakai: stream SSE dibatasi per worker', file=sys.stderr)
+
+if os.environ.get('GUNICORN_WORKER_CLASS', DEFAULT_WORKER_CLASS) == 'gevent':
+    # Patch sebelum app (requests, urllib3, ssl) di-import di master oleh preload_app; patch yang
+    # baru dilakukan worker setelah fork memicu RecursionError ssl / MonkeyPatchWarning
+    from gevent import monkey
+    monkey.patch_all()
+
+WORKER_CLASSES = {
+    'sync': 'sync',
+    'gthread': 'gthread',
+    'gevent': 'gevent',
+}
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+worker_class = WORKER_CLASSES[os.environ.get('GUNICORN_WORKER_CLASS', DEFAULT_WORKER_CLASS)]
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+
+# Hash password (passwords.py): setiap worker punya pool PASSWORD_HASH_WORKERS proses (default 1),
+# jadi hash bersamaan di host = workers x PASSWORD_HASH_WORKERS. PASSWORD_HASH_HOST_WORKERS
+# membagi anggaran host itu ke semua worker (minimal 1 per worker)
+if 'PASSWORD_HASH_HOST_WORKERS' in os.environ:
+    os.environ.setdefault('PASSWORD_HASH_WORKERS',
+                          str(max(1, int(os.environ['PASSWORD_HASH_HOST_WORKERS']) // workers)))
+
+# gthread: jumlah thread per worker, gevent: jumlah greenlet per worker
+threads = int(os.environ.get('GUNICORN_THREADS', 4)) if worker_class == 'gthread' else 1
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+# Stream SSE per worker (dibaca create_app). gthread: sisakan setengah thread untuk request biasa;
+# sync: satu stream memblokir seluruh worker, jadi SSE dimatikan (halaman admin refresh manual)
+if worker_class == 'gthread':
+    os.environ.setdefault('ORDER_EVENTS_MAX_STREAMS', str(max(1, threads // 2)))
+elif worker_class == 'sync':
+    os.environ.setdefault('ORDER_EVENTS_MAX_STREAMS', '0')
+
+# Load app sekali di master lalu fork ke worker (hemat memori, startup lebih cepat)
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+# Timeout & graceful shutdown: saat SIGTERM worker diberi waktu menyelesaikan request
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Recycle worker secara berkala untuk menahan kebocoran memori
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+accesslog = os.environ.get('GUNICORN_ACCESSLOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOGLEVEL', 'info')
+
+
+def _dispose_engine(close):
+    from wsgi import app
+    from models import db
+
+    with app.app_context():
+        db.engine.dispose(close=close)
+
+
+def post_fork(server, worker):
+    # Koneksi pool yang dibuat di master (karena preload) tidak boleh dipakai bersama
+    # oleh beberapa proses. close=False: jangan tutup socket milik parent, cukup buang.
+    if worker_class == 'gevent':
+        try:
+            from psycogreen.gevent import patch_psycopg
+            patch_psycopg()
+        except ImportError:
+            server.log.warning('psycogreen tidak terpasang, query psycopg2 akan memblokir event loop')
+    if preload_app:
+        _dispose_engine(close=False)
+
+
+def worker_exit(server, worker):
+    # Tutup koneksi DB dengan rapi saat worker berhenti (SIGTERM / max_requests)
+    _dispose_engine(close=True)
+
+
+def on_exit(server):
+    server.log.info('Gunicorn shutdown selesai')
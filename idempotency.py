@@ -0,0 +1,172 @@
+"""Idempotency-Key untuk endpoint yang membuat data (checkout).
+
+Klien mengirim header `Idempotency-Key` (maks. 64 karakter, sama untuk setiap retry request yang
+sama). Request pertama "mengklaim" key di idempotency_key_db lalu menyimpan status + body
+response-nya. Request berikutnya dengan key yang sama:
+- body sama, response sudah tersimpan: response lama diputar ulang (header Idempotent-Replayed),
+  tanpa menyentuh produk, stok maupun Midtrans
+- body sama, request pertama masih berjalan: menunggu (polling) maks. IDEMPOTENCY_WAIT detik,
+  lalu 409 jika belum selesai
+- body berbeda: 422
+
+Request yang isinya juga ditentukan state di server (checkout keranjang membaca
+session['checkout_cart_ids']) memberi fungsi context ke @idempotent(context=...): hasilnya (id
+keranjang + jumlah) ikut fingerprint, jadi key yang dipakai ulang setelah isi keranjang berubah
+dijawab 422, bukan replay order lain. Jika context kosong (keranjang sudah di-checkout oleh
+request pertama), retry dicocokkan dengan body saja supaya tetap mendapat replay.
+
+Response 5xx atau exception tidak disimpan (key dilepas) supaya klien boleh mencoba lagi. Klaim
+yang macet lebih lama dari IDEMPOTENCY_LOCK_TIMEOUT (worker mati) dan entri yang sudah
+kadaluarsa (IDEMPOTENCY_TTL) boleh diambil alih. Entri kadaluarsa dibersihkan dengan
+`flask idempotency-purge`.
+
+Klaim dan penyimpanan memakai koneksi sendiri (db.engine.begin), terpisah dari db.session view.
+"""
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+
+import click
+from flask import current_app, jsonify, request
+from flask.cli import with_appcontext
+from flask_login import current_user
+from sqlalchemy import and_, delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models import IdempotencyKey, db
+
+table = IdempotencyKey.__table__
+
+
+def _digest(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part)
+    return digest.hexdigest()[:32]
+
+
+def _fingerprint(context):
+    """32 hex dari method/path/body, + 32 hex dari context jika ada (kolom fingerprint 64 karakter)"""
+    fingerprint = _digest(f'{request.method} {request.path}\n'.encode('utf-8'), request.get_data())
+    value = context() if context else None
+    if value:
+        fingerprint += _digest(json.dumps(value, sort_keys=True, default=str).encode('utf-8'))
+    return fingerprint
+
+
+def _same_request(stored, fingerprint):
+    # Tanpa bagian context (state sudah dipakai request pertama): cukup method/path/body yang sama
+    return stored == fingerprint or (len(fingerprint) == 32 and stored[:32] == fingerprint)
+
+
+def _where(user_id, key):
+    return and_(table.c.user_id == user_id, table.c.request_key == key)
+
+
+def _claim(user_id, key, fingerprint):
+    """Coba jadi pemilik key. Kembalikan None jika berhasil, atau baris yang sudah ada."""
+    now = datetime.now()
+    ttl = timedelta(seconds=current_app.config['IDEMPOTENCY_TTL'])
+    values = {'fingerprint': fingerprint, 'response_status': None, 'response_body': None,
+              'created_at': now, 'expires_at': now + ttl}
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(insert(table).values(user_id=user_id, request_key=key, **values))
+        return None
+    except IntegrityError:
+        pass
+
+    with db.engine.begin() as conn:
+        row = conn.execute(select(table).where(_where(user_id, key))).first()
+        if row is None:
+            # Baru saja dihapus (purge / key dilepas): coba insert lagi di putaran berikutnya
+            return False
+        stale = now - timedelta(seconds=current_app.config['IDEMPOTENCY_LOCK_TIMEOUT'])
+        if row.expires_at < now or (row.response_status is None and row.created_at < stale):
+            # Ambil alih hanya jika baris belum diubah request lain (compare-and-set pada created_at)
+            taken = conn.execute(update(table).where(
+                _where(user_id, key), table.c.created_at == row.created_at
+            ).values(**values)).rowcount
+            return None if taken else False
+    return row
+
+
+def _store(user_id, key, response):
+    with db.engine.begin() as conn:
+        conn.execute(update(table).where(_where(user_id, key)).values(
+            response_status=response.status_code, response_body=response.get_data(as_text=True)
+        ))
+
+
+def _release(user_id, key):
+    with db.engine.begin() as conn:
+        conn.execute(delete(table).where(_where(user_id, key), table.c.response_status.is_(None)))
+
+
+def _replay(row):
+    response = current_app.response_class(row.response_body, status=row.response_status, mimetype='application/json')
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view=None, context=None):
+    """Jawab request ulang dengan Idempotency-Key yang sama dari response tersimpan (butuh login).
+
+    context: fungsi tanpa argumen untuk state server yang ikut menentukan isi request (lihat atas).
+    """
+    if view is None:
+        return lambda view: idempotent(view, context)
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key', '').strip()
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > 64:
+            return jsonify({'success': False, 'message': 'Idempotency-Key maksimal 64 karakter'}), 400
+
+        user_id = current_user.id
+        fingerprint = _fingerprint(context)
+        deadline = time.monotonic() + current_app.config['IDEMPOTENCY_WAIT']
+        while True:
+            row = _claim(user_id, key, fingerprint)
+            if row is None:
+                break
+            if row is not False:
+                if not _same_request(row.fingerprint, fingerprint):
+                    return jsonify({'success': False, 'message': 'Idempotency-Key sudah dipakai untuk request lain'}), 422
+                if row.response_status is not None:
+                    return _replay(row)
+            if time.monotonic() >= deadline:
+                return jsonify({'success': False, 'message': 'Request dengan Idempotency-Key ini masih diproses'}), 409
+            time.sleep(current_app.config['IDEMPOTENCY_POLL_INTERVAL'])
+
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+        except Exception:
+            _release(user_id, key)
+            raise
+        if response.status_code >= 500 or response.is_streamed:
+            _release(user_id, key)
+        else:
+            _store(user_id, key, response)
+        return response
+    return wrapper
+
+
+def init_idempotency(app):
+    app.config.setdefault('IDEMPOTENCY_TTL', 24 * 60 * 60)
+    app.config.setdefault('IDEMPOTENCY_WAIT', 10)
+    app.config.setdefault('IDEMPOTENCY_POLL_INTERVAL', 0.1)
+    app.config.setdefault('IDEMPOTENCY_LOCK_TIMEOUT', 60)
+
+
+@click.command('idempotency-purge')
+@with_appcontext
+def idempotency_purge_command():
+    """Hapus idempotency key yang sudah kadaluarsa"""
+    with db.engine.begin() as conn:
+        deleted = conn.execute(delete(table).where(table.c.expires_at < datetime.now())).rowcount
+    click.echo(f'{deleted} idempotency key kadaluarsa dihapus')
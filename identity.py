@@ -0,0 +1,118 @@
+"""Identitas user login dari snapshot di session, tanpa query users_db di setiap request.
+
+Saat user dimuat dari database, kolom yang dipakai header/sidebar dan pengecekan akses (id, role,
+is_active, nama, email, URL avatar, auth_version) disimpan di session (server-side, atau cookie
+bertanda tangan untuk SESSION_BACKEND=cookie). Request berikutnya memakai snapshot itu selama
+IDENTITY_TTL detik (default 30; 0 = selalu dari database), lalu dimuat ulang dan divalidasi lagi
+(user dihapus / non-aktif = logout).
+
+Perubahan yang memengaruhi identitas (toggle status, ubah role/profil, foto) memanggil
+bump_identity(user) yang menaikkan users_db.auth_version. Setiap request membandingkan
+auth_version snapshot dengan database (satu kolom, lewat primary key, tanpa join/avatar), jadi
+semua worker langsung memuat ulang snapshot setelah perubahan di-commit.
+
+Atribut lain (gender, birth_date, relationship, ...) tetap bisa dibaca dari current_user: objek
+User dimuat sekali per request saat atribut itu pertama diakses. Untuk mengubah data user,
+muat User dari database, jangan menulis ke current_user.
+"""
+import time
+
+from flask import current_app, session, url_for
+from flask_login import UserMixin
+
+from models import ImageUsers, RoleEnum, User, db
+
+SESSION_KEY = '_identity'
+
+
+class Identity(UserMixin):
+    """current_user dari snapshot; atribut User lain dimuat dari database saat dibutuhkan"""
+
+    def __init__(self, data):
+        self.__dict__.update(data)
+        self._user = None
+
+    @property
+    def is_active(self):
+        return self.active
+
+    def is_admin(self):
+        return self.role == RoleEnum.ADMIN.value
+
+    @property
+    def user(self):
+        if self._user is None:
+            self._user = db.session.get(User, self.id)
+        return self._user
+
+    def __getattr__(self, name):
+        # Hanya dipanggil untuk atribut yang tidak ada di snapshot
+        if name.startswith('_') or not hasattr(User, name):
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+
+def avatar_url(user_id):
+    avatar = db.session.query(ImageUsers.id, ImageUsers.file_size).filter_by(user_id=user_id).order_by(
+        ImageUsers.id).first()
+    return url_for('main.user_avatar', user_id=user_id, v=f'{avatar.id}-{avatar.file_size}') if avatar else None
+
+
+def snapshot(user):
+    return {
+        'id': user.id,
+        'role': user.role.value if hasattr(user.role, 'value') else user.role,
+        'active': bool(user.is_active),
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'email': user.email,
+        'phone_number': user.phone_number,
+        'address': user.address,
+        'avatar_url': avatar_url(user.id),
+        # String: ikut ETag conditional GET, tidak perlu tipe datetime
+        'updated_at': user.updated_at.isoformat() if user.updated_at else None,
+        'auth_version': user.auth_version or 0,
+        'checked_at': time.time(),
+    }
+
+
+def _fresh(data, user_id):
+    if data is None or data.get('id') != user_id:
+        return False
+    if time.time() - data.get('checked_at', 0) > current_app.config['IDENTITY_TTL']:
+        return False
+    # None jika user sudah dihapus
+    version = db.session.query(User.auth_version).filter_by(id=user_id).scalar()
+    return version is not None and version == data.get('auth_version', 0)
+
+
+def load_identity(user_id):
+    """Dipakai login_manager.user_loader: snapshot jika masih segar, selain itu User dimuat ulang"""
+    user_id = int(user_id)
+    if current_app.config['IDENTITY_TTL'] <= 0:
+        return db.session.get(User, user_id)
+    data = session.get(SESSION_KEY)
+    if _fresh(data, user_id):
+        return Identity(data)
+    user = db.session.get(User, user_id)
+    if user is None or not user.is_active:
+        session.pop(SESSION_KEY, None)
+        return None
+    data = snapshot(user)
+    session[SESSION_KEY] = data
+    identity = Identity(data)
+    identity._user = user
+    return identity
+
+
+def bump_identity(user):
+    """Naikkan auth_version (commit oleh pemanggil); snapshot lama tidak dipakai lagi di worker mana pun"""
+    user.auth_version = (user.auth_version or 0) + 1
+
+
+def forget_identity():
+    session.pop(SESSION_KEY, None)
+
+
+def init_identity(app):
+    app.config.setdefault('IDENTITY_TTL', 30)
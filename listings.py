@@ -0,0 +1,269 @@
+"""Data listing DataTables admin (produk, pesanan, user) + cache hasil per filter.
+
+Parameter filter dikanonikalisasi dulu (trim, huruf kecil/besar sesuai kolom, nilai tidak
+valid dan kosong dibuang, urutan tetap), jadi `?name=Kopi%20` dan `?name=kopi` memakai entri
+cache yang sama. Key cache juga memuat versi data tabel (lihat conditional.table_stamp), sehingga
+entri otomatis tidak terpakai lagi setelah ada perubahan; LISTING_CACHE_TTL membatasi umurnya.
+
+Gambar dikirim sebagai URL route (product_image / user_avatar), bukan data URI base64,
+supaya payload JSON dan entri cache tetap kecil.
+"""
+import hashlib
+import time
+from datetime import datetime
+
+from flask import current_app, url_for
+from sqlalchemy import func
+
+from conditional import table_stamp
+from fragment_cache import get_fragment_cache
+from models import Image, ImageUsers, Order, OrderArchive, OrderStatusEnum, Product, User, db
+from order_archive import archived_summary, day_range
+
+
+def _text(value):
+    value = (value or '').strip().lower()
+    return value or None
+
+
+def _choice(*allowed, upper=False):
+    def normalize(value):
+        value = (value or '').strip()
+        value = value.upper() if upper else value.lower()
+        return value if value in allowed else None
+    return normalize
+
+
+def _number(value):
+    try:
+        number = float((value or '').strip())
+    except ValueError:
+        return None
+    return int(number) if number.is_integer() else number
+
+
+def _date(value):
+    try:
+        return datetime.strptime((value or '').strip(), '%Y-%m-%d').date().isoformat()
+    except ValueError:
+        return None
+
+
+def _exact(value):
+    return (value or '').strip() or None
+
+
+FILTERS = {
+    'products': {'name': _text, 'category': _exact, 'maxPrice': _number, 'status': _choice('aktif', 'nonaktif')},
+    'orders': {'customer': _text, 'date': _date, 'maxAmount': _number, 'status': _choice('pending', 'approve', 'cancel')},
+    'users': {'name': _text, 'email': _text, 'role': _choice('ADMIN', 'USER', upper=True),
+              'gender': _choice('MALE', 'FEMALE', 'OTHER', upper=True)},
+}
+
+
+def canonical_filters(kind, params):
+    """Filter yang dikenal saja, sudah dinormalisasi, tanpa nilai kosong, urut nama"""
+    filters = {}
+    for name, normalize in FILTERS[kind].items():
+        value = normalize(params.get(name))
+        if value is not None:
+            filters[name] = value
+    return dict(sorted(filters.items()))
+
+
+def avatar_urls(user_ids):
+    rows = db.session.query(ImageUsers.user_id, ImageUsers.id, ImageUsers.file_size).filter(
+        ImageUsers.user_id.in_(user_ids)
+    ).order_by(ImageUsers.id.desc()).all() if user_ids else []
+    # order desc + dict: foto pertama (id terkecil) yang tersisa, sama seperti image_profile[0]
+    return {
+        user_id: url_for('main.user_avatar', user_id=user_id, v=f'{image_id}-{size}')
+        for user_id, image_id, size in rows
+    }
+
+
+def product_rows(filters):
+    query = db.session.query(
+        Product.id, Product.product_name, Product.product_category, Product.product_price,
+        Product.product_stock, Product.product_status
+    )
+    if 'name' in filters:
+        query = query.filter(func.lower(Product.product_name).like(f"%{filters['name']}%"))
+    if 'category' in filters:
+        query = query.filter(Product.product_category == filters['category'])
+    if 'maxPrice' in filters:
+        query = query.filter(Product.product_price <= filters['maxPrice'])
+    if filters.get('status') == 'aktif':
+        query = query.filter(Product.product_status == True)
+    elif filters.get('status') == 'nonaktif':
+        query = query.filter(Product.product_status == False)
+    products = query.order_by(Product.id.desc()).all()
+
+    product_ids = [p.id for p in products]
+    with_image = {pid for (pid,) in db.session.query(Image.product_id).filter(
+        Image.product_id.in_(product_ids)).distinct()} if product_ids else set()
+
+    data = []
+    for p in products:
+        display_status = 'Available' if p.product_status else 'Unavailable'
+        if (p.product_stock or 0) <= 0:
+            display_status = 'Out Of Stock'
+        data.append({
+            'product_id': p.id,
+            'product_name': p.product_name,
+            'product_category': p.product_category or 'Tanpa Kategori',
+            'product_price': f"{float(p.product_price or 0):,.0f}",
+            'product_stock': p.product_stock or 0,
+            'product_status': display_status,
+            'product_image': url_for('main.product_image', product_id=p.id) if p.id in with_image else None,
+        })
+    return data
+
+
+def order_rows(filters, ids=None):
+    query = db.session.query(
+        Order.id, Order.user_id, Order.item_count, Order.created_at, Order.amount,
+        Order.payment_method, Order.status, User.first_name, User.last_name, User.email
+    ).outerjoin(User, Order.user_id == User.id)
+    if ids is not None:
+        # Dipakai feed event admin untuk membangun baris order tertentu saja
+        query = query.filter(Order.id.in_(ids))
+    if 'customer' in filters:
+        pattern = f"%{filters['customer']}%"
+        query = query.filter(db.or_(
+            User.first_name.ilike(pattern), User.last_name.ilike(pattern), User.email.ilike(pattern)
+        ))
+    if 'date' in filters:
+        # Rentang, bukan DATE(created_at): bisa memakai index dan partition pruning (order_archive.py)
+        query = query.filter(day_range(Order.created_at, datetime.strptime(filters['date'], '%Y-%m-%d').date()))
+    if 'maxAmount' in filters:
+        query = query.filter(Order.amount <= filters['maxAmount'])
+    if 'status' in filters:
+        query = query.filter(Order.status == OrderStatusEnum(filters['status'].upper()))
+    orders = query.order_by(Order.created_at.desc()).all()
+
+    avatars = avatar_urls({o.user_id for o in orders if o.user_id})
+    data = []
+    for o in orders:
+        customer_avatar = avatars.get(o.user_id) or (
+            f"https://ui-avatars.com/api/?name={o.first_name}+{o.last_name}&background=0077b5&color=fff"
+        )
+        data.append({
+            'id': o.id,
+            'user_id': o.user_id,
+            'total_items': o.item_count or 0,
+            'customer_name': f"{o.first_name} {o.last_name}",
+            'customer_email': o.email,
+            'customer_avatar': customer_avatar,
+            'created_at': o.created_at.isoformat(),
+            'date': o.created_at.strftime("%d %B %Y"),
+            'time': o.created_at.strftime("%H:%M"),
+            'amount': "{:,.0f}".format(o.amount or 0),
+            'payment_method': o.payment_method.value if o.payment_method else '-',
+            'status': o.status.value if hasattr(o.status, 'value') else str(o.status),
+        })
+    return data
+
+
+def encode_cursor(created_at, row_id):
+    return f'{created_at:%Y%m%d%H%M%S%f}-{row_id}'
+
+
+def decode_cursor(value):
+    """(created_at, id) dari cursor; None jika kosong/tidak valid (halaman pertama)"""
+    try:
+        stamp, row_id = (value or '').split('-')
+        return datetime.strptime(stamp, '%Y%m%d%H%M%S%f'), int(row_id)
+    except ValueError:
+        return None
+
+
+def keyset_page(query, model, cursor, limit):
+    """Satu halaman urut (created_at, id) menurun setelah cursor: (baris, cursor berikutnya / None).
+
+    Keyset, bukan OFFSET: halaman ke-n tetap satu range scan di index (user_id, created_at).
+    """
+    position = decode_cursor(cursor)
+    if position is not None:
+        created_at, row_id = position
+        query = query.filter(db.or_(model.created_at < created_at,
+                                    db.and_(model.created_at == created_at, model.id < row_id)))
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
+
+
+def order_history(user_id, cursor=None, limit=20, archived=False):
+    """Riwayat order pelanggan per halaman, hanya kolom ringkasan (item lengkap di order_detail)"""
+    if archived:
+        rows, next_cursor = keyset_page(db.session.query(OrderArchive).filter(OrderArchive.user_id == user_id),
+                                        OrderArchive, cursor, limit)
+        return [archived_summary(row) for row in rows], next_cursor
+
+    rows, next_cursor = keyset_page(db.session.query(
+        Order.id, Order.created_at, Order.status, Order.amount, Order.item_count, Order.line_count,
+        Order.first_product_id, Order.first_product_name,
+    ).filter(Order.user_id == user_id), Order, cursor, limit)
+    return [{
+        'id': o.id,
+        'created_at': o.created_at,
+        'status': o.status.value if hasattr(o.status, 'value') else (o.status or 'PENDING'),
+        'amount': o.amount,
+        'item_count': o.item_count,
+        'line_count': o.line_count,
+        'first_product_id': o.first_product_id,
+        'first_product_name': o.first_product_name,
+    } for o in rows], next_cursor
+
+
+def user_rows(filters):
+    query = db.session.query(
+        User.id, User.first_name, User.last_name, User.email, User.role, User.gender, User.birth_date
+    )
+    if 'name' in filters:
+        query = query.filter(User.first_name.ilike(f"%{filters['name']}%"))
+    if 'email' in filters:
+        query = query.filter(User.email.ilike(f"%{filters['email']}%"))
+    if 'role' in filters:
+        query = query.filter(User.role == filters['role'])
+    if 'gender' in filters:
+        query = query.filter(User.gender == filters['gender'])
+    users = query.order_by(User.id).all()
+
+    avatars = avatar_urls({u.id for u in users})
+    return [{
+        'id': u.id,
+        'first_name': u.first_name,
+        'last_name': u.last_name or '',
+        'email': u.email,
+        'role': u.role.value if hasattr(u.role, 'value') else str(u.role),
+        'gender': u.gender.value if hasattr(u.gender, 'value') else str(u.gender),
+        'birth_date': u.birth_date.strftime("%d %B %Y") if u.birth_date else '-',
+        'profile_picture': avatars.get(u.id),
+    } for u in users]
+
+
+LISTINGS = {
+    'products': (product_rows, (Product,)),
+    'orders': (order_rows, (Order, User)),
+    'users': (user_rows, (User,)),
+}
+
+
+def listing_data(kind, params):
+    """Baris listing untuk filter ini, dari cache jika filter + versi data sama"""
+    build, models = LISTINGS[kind]
+    filters = canonical_filters(kind, params)
+    stamps = [table_stamp(model) for model in models]
+    key = hashlib.sha1(repr((filters, stamps)).encode('utf-8')).hexdigest()
+
+    cache = get_fragment_cache()
+    cached = cache.get(f'listing_{kind}', key)
+    if cached is not None and cached['expires'] > time.time():
+        return cached['data']
+
+    data = build(filters)
+    cache.set(f'listing_{kind}', key, {'expires': time.time() + current_app.config['LISTING_CACHE_TTL'], 'data': data})
+    return data
@@ -0,0 +1,284 @@
+"""Migrasi schema berversi tanpa downtime.
+
+Setiap file di folder migrations/ bernama `NNNN_deskripsi.py` dan mendefinisikan
+`upgrade(m)`, di mana `m` adalah MigrationContext. Semua operasi dijalankan dalam mode
+autocommit (dibutuhkan oleh CREATE INDEX CONCURRENTLY) dan dibuat idempotent, jadi
+migrasi yang gagal di tengah jalan aman untuk dijalankan ulang.
+
+    flask --app app db-status
+    flask --app app db-upgrade --dry-run      # tampilkan SQL + perkiraan dampak lock
+    flask --app app db-upgrade --max-replica-lag 5
+"""
+import datetime
+import glob
+import importlib.util
+import os
+import time
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import inspect, text
+
+from models import db
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+VERSION_TABLE = 'schema_migrations'
+
+# Mode lock PostgreSQL per jenis operasi dan apa yang diblok selama lock dipegang
+LOCK_IMPACT = {
+    'add_column': ('ACCESS EXCLUSIVE', 'baca + tulis (singkat, hanya ubah katalog)'),
+    'create_index_concurrently': ('SHARE UPDATE EXCLUSIVE', 'tidak memblok baca/tulis'),
+    'create_index': ('SHARE', 'tulis selama index dibangun'),
+    'backfill': ('ROW EXCLUSIVE', 'baris dalam batch yang sedang di-update'),
+    'validate': ('SHARE UPDATE EXCLUSIVE', 'tidak memblok baca/tulis (scan seluruh tabel)'),
+    'execute': ('ACCESS EXCLUSIVE', 'baca + tulis (anggap terburuk)'),
+}
+
+
+class Migration:
+    def __init__(self, path):
+        self.path = path
+        self.version = os.path.basename(path).split('_', 1)[0]
+        spec = importlib.util.spec_from_file_location(f'migration_{self.version}', path)
+        self.module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(self.module)
+        doc = (self.module.__doc__ or '').strip()
+        self.description = doc.splitlines()[0] if doc else ''
+
+    def upgrade(self, context):
+        self.module.upgrade(context)
+
+
+class MigrationContext:
+    """Helper yang dipakai script migrasi, sekaligus menjalankan dry-run"""
+
+    def __init__(self, engine, dry_run=False, max_replica_lag=5.0, lock_timeout='5s',
+                 batch_size=1000, batch_pause=0.05, echo=click.echo):
+        self.engine = engine
+        self.dialect = engine.dialect.name
+        self.dry_run = dry_run
+        self.max_replica_lag = max_replica_lag
+        self.lock_timeout = lock_timeout
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.echo = echo
+        self.conn = engine.connect().execution_options(isolation_level='AUTOCOMMIT')
+        if self.dialect == 'postgresql':
+            # Jangan antre lama di belakang transaksi panjang: lebih baik gagal lalu di-retry
+            self.conn.execute(text(f"SET lock_timeout = '{lock_timeout}'"))
+
+    def close(self):
+        self.conn.close()
+
+    # ---- introspeksi ----
+    def has_table(self, table):
+        return inspect(self.conn).has_table(table)
+
+    def has_column(self, table, column):
+        # Dry-run: tabel dari create_table sebelumnya belum benar-benar dibuat
+        if self.dry_run and not self.has_table(table):
+            return False
+        return column in {c['name'] for c in inspect(self.conn).get_columns(table)}
+
+    def has_index(self, name, table):
+        if self.dry_run and not self.has_table(table):
+            return False
+        return name in {i['name'] for i in inspect(self.conn).get_indexes(table)}
+
+    def estimate_rows(self, table):
+        if self.dialect == 'postgresql':
+            row = self.conn.execute(text(
+                "SELECT reltuples::bigint, pg_total_relation_size(oid) FROM pg_class WHERE relname = :t"
+            ), {'t': table}).first()
+            if row:
+                return max(int(row[0]), 0), int(row[1])
+        count = self.conn.execute(text(f'SELECT COUNT(*) FROM {table}')).scalar()
+        return int(count or 0), None
+
+    def blocking_sessions(self, table):
+        """Transaksi yang sedang memegang lock di tabel (akan membuat DDL antre)"""
+        if self.dialect != 'postgresql':
+            return []
+        return self.conn.execute(text("""
+            SELECT a.pid, a.state, now() - a.xact_start AS xact_age, l.mode
+            FROM pg_locks l
+            JOIN pg_class c ON c.oid = l.relation
+            JOIN pg_stat_activity a ON a.pid = l.pid
+            WHERE c.relname = :t AND a.pid <> pg_backend_pid() AND l.granted
+            ORDER BY a.xact_start
+        """), {'t': table}).fetchall()
+
+    def replica_lag(self):
+        if self.dialect != 'postgresql':
+            return 0.0
+        lag = self.conn.execute(text(
+            "SELECT COALESCE(MAX(EXTRACT(EPOCH FROM replay_lag)), 0) FROM pg_stat_replication"
+        )).scalar()
+        return float(lag or 0)
+
+    def wait_for_replicas(self):
+        while True:
+            lag = self.replica_lag()
+            if lag <= self.max_replica_lag:
+                return
+            self.echo(f'  replica lag {lag:.1f}s > {self.max_replica_lag}s, menunggu...')
+            time.sleep(min(lag, 10))
+
+    # ---- operasi ----
+    def report(self, kind, table, sql, extra=''):
+        lock, blocks = LOCK_IMPACT[kind]
+        if self.dialect == 'sqlite':
+            lock, blocks = 'DATABASE WRITE LOCK', 'semua penulisan ke database'
+        try:
+            rows, size = self.estimate_rows(table)
+        except Exception:
+            # Tabel belum ada (dibuat oleh langkah sebelumnya yang juga di-dry-run)
+            rows, size = 0, None
+        size_txt = f', {size / 1024 / 1024:.1f} MB' if size is not None else ''
+        self.echo(f'  {sql}')
+        self.echo(f'    lock={lock} | memblok: {blocks} | {table}: ~{rows} baris{size_txt}{extra}')
+        for pid, state, age, mode in self.blocking_sessions(table):
+            self.echo(f'    ! pid {pid} ({state}, umur transaksi {age}) memegang {mode}')
+
+    def execute(self, sql, table, kind='execute'):
+        if self.dry_run:
+            self.report(kind, table, sql)
+            return
+        self.echo(f'  {sql}')
+        self.conn.execute(text(sql))
+
+    def create_table(self, table, ddl):
+        """Buat tabel baru (tidak ada tabel lain yang di-lock)"""
+        sql = f'CREATE TABLE IF NOT EXISTS {table} ({ddl})'
+        self.echo(f'  {sql}')
+        if self.dry_run:
+            self.echo('    lock=- | memblok: tidak ada (tabel baru)')
+            return
+        self.conn.execute(text(sql))
+
+    def add_column(self, table, column, ddl):
+        """Tambah kolom nullable tanpa default volatile supaya tidak rewrite tabel"""
+        if self.has_column(table, column):
+            self.echo(f'  kolom {table}.{column} sudah ada, dilewati')
+            return
+        self.execute(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}', table, 'add_column')
+
+    def create_index(self, name, table, columns, unique=False, where=None, concurrently=True):
+        concurrently = concurrently and self.dialect == 'postgresql'
+        if self.dialect == 'postgresql' and not self.dry_run:
+            # CONCURRENTLY yang gagal meninggalkan index INVALID, buang dulu sebelum retry
+            invalid = self.conn.execute(text("""
+                SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+                WHERE c.relname = :n AND NOT i.indisvalid
+            """), {'n': name}).first()
+            if invalid:
+                self.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}', table, 'create_index_concurrently')
+        if self.has_index(name, table):
+            self.echo(f'  index {name} sudah ada, dilewati')
+            return
+        sql = 'CREATE {unique}INDEX {conc}IF NOT EXISTS {name} ON {table} ({cols}){where}'.format(
+            unique='UNIQUE ' if unique else '',
+            conc='CONCURRENTLY ' if concurrently else '',
+            name=name, table=table, cols=', '.join(columns),
+            where=f' WHERE {where}' if where else '',
+        )
+        self.execute(sql, table, 'create_index_concurrently' if concurrently else 'create_index')
+
+    def backfill(self, table, set_clause, where, key='id', batch_size=None):
+        """UPDATE bertahap per rentang primary key, throttle berdasarkan replica lag"""
+        batch_size = batch_size or self.batch_size
+        sql = f'UPDATE {table} SET {set_clause} WHERE {key} >= :lo AND {key} < :hi AND ({where})'
+        if self.dry_run:
+            # Kolom mungkin belum ada saat dry-run, jadi pakai perkiraan jumlah baris tabel
+            rows = self.estimate_rows(table)[0] if self.has_table(table) else 0
+            self.report('backfill', table, sql, f' | ~{rows // batch_size + 1} batch x {batch_size}')
+            return
+        lo, hi = self.conn.execute(text(f'SELECT MIN({key}), MAX({key}) FROM {table} WHERE {where}')).first()
+        if lo is None:
+            self.echo(f'  backfill {table}: tidak ada baris yang perlu diisi')
+            return
+        batches = (hi - lo) // batch_size + 1
+        self.echo(f'  backfill {table}: {batches} batch x {batch_size}')
+        updated = 0
+        for start in range(lo, hi + 1, batch_size):
+            self.wait_for_replicas()
+            result = self.conn.execute(text(sql), {'lo': start, 'hi': start + batch_size})
+            updated += result.rowcount or 0
+            time.sleep(self.batch_pause)
+        self.echo(f'  backfill {table}: {updated} baris diperbarui')
+
+
+def load_migrations():
+    paths = sorted(glob.glob(os.path.join(MIGRATIONS_DIR, '[0-9][0-9][0-9][0-9]_*.py')))
+    return [Migration(path) for path in paths]
+
+
+def ensure_version_table(engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            f'CREATE TABLE IF NOT EXISTS {VERSION_TABLE} ('
+            'version VARCHAR(16) PRIMARY KEY, description VARCHAR(255), applied_at TIMESTAMP NOT NULL)'
+        ))
+
+
+def applied_versions(engine):
+    ensure_version_table(engine)
+    with engine.connect() as conn:
+        return {row[0] for row in conn.execute(text(f'SELECT version FROM {VERSION_TABLE}'))}
+
+
+def mark_applied(engine, migration):
+    with engine.begin() as conn:
+        conn.execute(
+            text(f'INSERT INTO {VERSION_TABLE} (version, description, applied_at) VALUES (:v, :d, :t)'),
+            {'v': migration.version, 'd': migration.description[:255], 't': datetime.datetime.now()},
+        )
+
+
+def stamp_all(engine):
+    """Tandai semua migrasi sudah jalan (dipakai init-db, karena create_all sudah memakai model terbaru)"""
+    done = applied_versions(engine)
+    for migration in load_migrations():
+        if migration.version not in done:
+            mark_applied(engine, migration)
+
+
+def upgrade(engine, target=None, dry_run=False, **options):
+    done = applied_versions(engine)
+    pending = [m for m in load_migrations() if m.version not in done and (target is None or m.version <= target)]
+    if not pending:
+        click.echo('Schema sudah versi terbaru')
+        return []
+    for migration in pending:
+        click.echo(f'{"[dry-run] " if dry_run else ""}{migration.version}: {migration.description}')
+        context = MigrationContext(engine, dry_run=dry_run, **options)
+        try:
+            migration.upgrade(context)
+        finally:
+            context.close()
+        if not dry_run:
+            mark_applied(engine, migration)
+    return pending
+
+
+@click.command('db-upgrade')
+@click.option('--dry-run', is_flag=True, help='Tampilkan SQL dan perkiraan dampak lock tanpa mengubah apa pun')
+@click.option('--target', default=None, help='Berhenti di versi ini (contoh: 0002)')
+@click.option('--max-replica-lag', default=5.0, show_default=True, help='Detik; backfill berhenti sejenak jika lag melebihi ini')
+@click.option('--lock-timeout', default='5s', show_default=True)
+@click.option('--batch-size', default=1000, show_default=True)
+@with_appcontext
+def db_upgrade_command(dry_run, target, max_replica_lag, lock_timeout, batch_size):
+    """Jalankan migrasi yang belum diterapkan"""
+    upgrade(db.engine, target=target, dry_run=dry_run, max_replica_lag=max_replica_lag,
+            lock_timeout=lock_timeout, batch_size=batch_size)
+
+
+@click.command('db-status')
+@with_appcontext
+def db_status_command():
+    """Tampilkan migrasi yang sudah/belum diterapkan"""
+    done = applied_versions(db.engine)
+    for migration in load_migrations():
+        mark = 'x' if migration.version in done else ' '
+        click.echo(f'[{mark}] {migration.version}  {migration.description}')
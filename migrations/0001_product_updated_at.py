@@ -0,0 +1,6 @@
+"""Tambah product_db.updated_at (sudah di-set oleh admin_update_product) dan isi dari created_at"""
+
+
+def upgrade(m):
+    m.add_column('product_db', 'updated_at', 'TIMESTAMP NULL')
+    m.backfill('product_db', 'updated_at = created_at', 'updated_at IS NULL')
@@ -0,0 +1,6 @@
+"""Tambah order_db.midtrans_order_id untuk mencocokkan notifikasi pembayaran Midtrans"""
+
+
+def upgrade(m):
+    m.add_column('order_db', 'midtrans_order_id', 'VARCHAR(100) NULL')
+    m.create_index('ix_order_db_midtrans_order_id', 'order_db', ['midtrans_order_id'], unique=True)
@@ -0,0 +1,11 @@
+"""Index untuk foreign key dan listing order yang sering di-query"""
+
+
+def upgrade(m):
+    m.create_index('ix_order_db_user_id_created_at', 'order_db', ['user_id', 'created_at'])
+    m.create_index('ix_order_db_created_at', 'order_db', ['created_at'])
+    m.create_index('ix_product_order_db_order_id', 'product_order_db', ['order_id'])
+    m.create_index('ix_product_order_db_product_id', 'product_order_db', ['product_id'])
+    m.create_index('ix_cart_db_user_id', 'cart_db', ['user_id'])
+    m.create_index('ix_image_product_db_product_id', 'image_product_db', ['product_id'])
+    m.create_index('ix_image_users_db_user_id', 'image_users_db', ['user_id'])
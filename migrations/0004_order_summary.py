@@ -0,0 +1,19 @@
+"""Kolom ringkasan item di order_db agar listing order tidak perlu join product_order_db"""
+
+FIRST_LINE = 'SELECT {col} FROM product_order_db po {join}WHERE po.order_id = order_db.id ORDER BY po.id LIMIT 1'
+
+
+def upgrade(m):
+    m.add_column('order_db', 'item_count', 'INTEGER NULL')
+    m.add_column('order_db', 'line_count', 'INTEGER NULL')
+    m.add_column('order_db', 'first_product_id', 'INTEGER NULL')
+    m.add_column('order_db', 'first_product_name', 'VARCHAR(100) NULL')
+    m.backfill(
+        'order_db',
+        'item_count = (SELECT COALESCE(SUM(po.quantity), 0) FROM product_order_db po WHERE po.order_id = order_db.id), '
+        'line_count = (SELECT COUNT(*) FROM product_order_db po WHERE po.order_id = order_db.id), '
+        'first_product_id = (' + FIRST_LINE.format(col='po.product_id', join='') + '), '
+        'first_product_name = (' + FIRST_LINE.format(
+            col='p.product_name', join='JOIN product_db p ON p.id = po.product_id ') + ')',
+        'item_count IS NULL',
+    )
@@ -0,0 +1,17 @@
+"""Snapshot harga, nama dan kategori produk di product_order_db"""
+
+LIVE = '(SELECT p.{col} FROM product_db p WHERE p.id = product_order_db.product_id)'
+
+
+def upgrade(m):
+    m.add_column('product_order_db', 'unit_price', 'INTEGER NULL')
+    m.add_column('product_order_db', 'product_name', 'VARCHAR(100) NULL')
+    m.add_column('product_order_db', 'product_category', 'VARCHAR(50) NULL')
+    # Order lama tidak punya snapshot; harga produk saat ini adalah perkiraan terbaik
+    m.backfill(
+        'product_order_db',
+        'unit_price = ' + LIVE.format(col='product_price') + ', '
+        'product_name = ' + LIVE.format(col='product_name') + ', '
+        'product_category = ' + LIVE.format(col='product_category'),
+        'unit_price IS NULL AND product_id IS NOT NULL',
+    )
@@ -0,0 +1,8 @@
+"""Tabel counter versi untuk invalidasi fragment cache katalog"""
+
+
+def upgrade(m):
+    m.create_table('cache_version_db', 'name VARCHAR(50) PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0')
+    m.execute("INSERT INTO cache_version_db (name, version) SELECT 'catalog', 0 "
+              "WHERE NOT EXISTS (SELECT 1 FROM cache_version_db WHERE name = 'catalog')",
+              'cache_version_db')
@@ -0,0 +1,11 @@
+"""Kolom updated_at di order_db dan users_db + index updated_at untuk ETag listing"""
+
+
+def upgrade(m):
+    m.add_column('order_db', 'updated_at', 'TIMESTAMP NULL')
+    m.add_column('users_db', 'updated_at', 'TIMESTAMP NULL')
+    m.backfill('order_db', 'updated_at = created_at', 'updated_at IS NULL')
+    m.backfill('users_db', 'updated_at = created_at', 'updated_at IS NULL')
+    m.create_index('ix_order_db_updated_at', 'order_db', ['updated_at'])
+    m.create_index('ix_users_db_updated_at', 'users_db', ['updated_at'])
+    m.create_index('ix_product_db_updated_at', 'product_db', ['updated_at'])
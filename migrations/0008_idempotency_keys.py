@@ -0,0 +1,8 @@
+"""Tabel idempotency key untuk /api/order/process"""
+
+
+def upgrade(m):
+    m.create_table('idempotency_key_db', 'user_id INTEGER NOT NULL, request_key VARCHAR(64) NOT NULL, '
+                   'fingerprint VARCHAR(64) NOT NULL, response_status INTEGER NULL, response_body TEXT NULL, '
+                   'created_at TIMESTAMP NOT NULL, expires_at TIMESTAMP NOT NULL, PRIMARY KEY (user_id, request_key)')
+    m.create_index('ix_idempotency_key_db_expires_at', 'idempotency_key_db', ['expires_at'])
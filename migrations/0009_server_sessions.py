@@ -0,0 +1,7 @@
+"""Tabel session_db untuk session server-side"""
+
+
+def upgrade(m):
+    binary = 'BYTEA' if m.dialect == 'postgresql' else 'BLOB'
+    m.create_table('session_db', f'sid VARCHAR(64) PRIMARY KEY, data {binary} NOT NULL, expires_at TIMESTAMP NOT NULL')
+    m.create_index('ix_session_db_expires_at', 'session_db', ['expires_at'])
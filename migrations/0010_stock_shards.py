@@ -0,0 +1,9 @@
+"""Stok ter-shard untuk produk flash sale: product_db.stock_shards dan tabel product_stock_shard_db"""
+
+
+def upgrade(m):
+    m.add_column('product_db', 'stock_shards', 'INTEGER NULL')
+    m.create_table('product_stock_shard_db',
+                   'product_id INTEGER NOT NULL REFERENCES product_db (id) ON DELETE CASCADE, '
+                   'shard INTEGER NOT NULL, stock INTEGER NOT NULL DEFAULT 0, '
+                   'PRIMARY KEY (product_id, shard)')
@@ -0,0 +1,13 @@
+"""Tabel arsip order_archive_db dan product_order_db.order_created_at (kunci partisi item)"""
+
+
+def upgrade(m):
+    binary = 'BYTEA' if m.dialect == 'postgresql' else 'BLOB'
+    m.create_table('order_archive_db', 'id INTEGER PRIMARY KEY, user_id INTEGER NULL, created_at TIMESTAMP NOT NULL, '
+                   'status VARCHAR(20) NOT NULL, amount INTEGER NOT NULL, archived_at TIMESTAMP NOT NULL, '
+                   f'payload {binary} NOT NULL')
+    m.create_index('ix_order_archive_db_user_id_created_at', 'order_archive_db', ['user_id', 'created_at'])
+    m.add_column('product_order_db', 'order_created_at', 'TIMESTAMP NULL')
+    m.backfill('product_order_db',
+               'order_created_at = (SELECT o.created_at FROM order_db o WHERE o.id = product_order_db.order_id)',
+               'order_created_at IS NULL AND order_id IS NOT NULL')
@@ -0,0 +1,18 @@
+"""Partisi bulanan order_db (created_at) dan product_order_db (order_created_at), hanya PostgreSQL.
+
+Jalankan setelah kode yang mengisi product_order_db.order_created_at ter-deploy (lihat README).
+"""
+from order_archive import partition_orders
+
+
+def upgrade(m):
+    if m.dialect != 'postgresql':
+        m.echo(f'  {m.dialect}: tabel order tidak dipartisi (fallback: index created_at + flask orders-archive)')
+        return
+    # Kunci partisi wajib terisi: order lama tanpa created_at dan item tanpa order ikut diberi tanggal
+    m.backfill('order_db', 'created_at = COALESCE(updated_at, CURRENT_TIMESTAMP)', 'created_at IS NULL')
+    m.backfill('product_order_db',
+               'order_created_at = COALESCE((SELECT o.created_at FROM order_db o '
+               'WHERE o.id = product_order_db.order_id), CURRENT_TIMESTAMP)',
+               'order_created_at IS NULL')
+    partition_orders(m)
@@ -0,0 +1,7 @@
+"""Partial index product_db (product_stock, id) WHERE product_stock < 10 untuk daftar stok menipis"""
+
+
+def upgrade(m):
+    # MySQL tidak punya partial index: index biasa pada kolom yang sama
+    where = None if m.dialect == 'mysql' else 'product_stock < 10'
+    m.create_index('ix_product_db_low_stock', 'product_db', ['product_stock', 'id'], where=where)
@@ -0,0 +1,6 @@
+"""users_db.auth_version: naik saat status/role/profil user berubah, snapshot identitas di session dimuat ulang"""
+
+
+def upgrade(m):
+    # Default konstan: tanpa rewrite tabel (PostgreSQL 11+, MySQL instant)
+    m.add_column('users_db', 'auth_version', 'INTEGER NOT NULL DEFAULT 0')
@@ -1,11 +1,12 @@
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 from sqlalchemy.orm import declarative_base, relationship
-from sqlalchemy import Column, ForeignKey, Integer, LargeBinary, String, DateTime, Boolean, Text, Enum
+from sqlalchemy import Column, ForeignKey, Index, Integer, LargeBinary, String, DateTime, Boolean, Text, Enum, text
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 import enum
 
+from passwords import hash_password, verify_password
+
 Base = declarative_base()
 db = SQLAlchemy()
 class PaymentMethodEnum(str,enum.Enum):
@@ -27,6 +28,9 @@ class GenderEnum(str,enum.Enum):
     OTHER = "OTHER"
 class User(Base, UserMixin):
     __tablename__ = 'users_db'
+    __table_args__ = (
+        Index('ix_users_db_updated_at', 'updated_at'),
+    )
     id = Column(Integer, primary_key=True)
     first_name = Column(String(50), nullable=True)
     last_name = Column(String(50), nullable=True)
@@ -37,18 +41,21 @@ class User(Base, UserMixin):
     gender = Column(Enum(GenderEnum,native_enum=False,validate_strings=True),default=GenderEnum.OTHER,nullable=True)  
     role = Column(Enum(RoleEnum,native_enum=False,validate_strings=True),default=RoleEnum.USER,nullable=False)
     created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, nullable=True, onupdate=datetime.now)
     is_active = Column(Boolean, default=True)
     birth_date = Column(DateTime, nullable=True)  
+    # Naik lewat identity.bump_identity: snapshot identitas di session dimuat ulang
+    auth_version = Column(Integer, nullable=False, default=0, server_default='0')
 
     image_profile = relationship("ImageUsers", backref="user", cascade="all, delete-orphan")
     cart_items = relationship("Cart", back_populates="user", cascade="all, delete-orphan")
     def set_password(self, password):
-        """Set password hash"""
-        self.password_hash = generate_password_hash(password)
+        """Set password hash (di process pool, lihat passwords.py)"""
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
         """Check password against hash"""
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
 
     def is_admin(self):
         """Check if user is admin"""
@@ -63,6 +70,9 @@ class User(Base, UserMixin):
     
 class ImageUsers(Base):
     __tablename__ = "image_users_db"
+    __table_args__ = (
+        Index('ix_image_users_db_user_id', 'user_id'),
+    )
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users_db.id', ondelete='CASCADE'))
     file_data = Column(LargeBinary)
@@ -72,21 +82,34 @@ class ImageUsers(Base):
     
 class Product(Base):
     __tablename__ = 'product_db'
+    __table_args__ = (
+        Index('ix_product_db_updated_at', 'updated_at'),
+        # Partial index untuk daftar stok menipis (product_stats.py); MySQL mendapat index biasa
+        Index('ix_product_db_low_stock', 'product_stock', 'id',
+              postgresql_where=text('product_stock < 10'), sqlite_where=text('product_stock < 10')),
+    )
     id = Column(Integer, primary_key=True)
     product_name = Column(String(100), nullable=False)
     product_description = Column(Text, nullable=True)
     product_category = Column(String(50), nullable=True)
     product_price = Column(Integer, nullable=False)
     product_stock = Column(Integer, default=0)
+    # Jumlah shard stok (mode flash sale, lihat stock.py); NULL = stok satu baris di product_stock
+    stock_shards = Column(Integer, nullable=True)
     product_status = Column(Boolean, default=True)  # Fixed: removed (20)
     created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, nullable=True, onupdate=datetime.now)
     
     # Hanya satu relationship yang menggunakan backref
     images = relationship("Image", backref="product", cascade="all, delete-orphan")
     cart_items = relationship("Cart", back_populates="product", cascade="all, delete-orphan")
+    shards = relationship("ProductStockShard", cascade="all, delete-orphan")
 
 class Image(Base):
     __tablename__ = "image_product_db"
+    __table_args__ = (
+        Index('ix_image_product_db_product_id', 'product_id'),
+    )
     id = Column(Integer, primary_key=True)
     product_id = Column(Integer, ForeignKey('product_db.id', ondelete='CASCADE'))
     file_data = Column(LargeBinary)
@@ -96,6 +119,9 @@ class Image(Base):
 
 class Cart(Base):
     __tablename__ = 'cart_db'
+    __table_args__ = (
+        Index('ix_cart_db_user_id', 'user_id'),
+    )
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users_db.id'), nullable=False)
     product_id = Column(Integer, ForeignKey('product_db.id'), nullable=False)
@@ -108,12 +134,25 @@ class Cart(Base):
 
 class Order(Base):
     __tablename__ = 'order_db'
+    __table_args__ = (
+        Index('ix_order_db_user_id_created_at', 'user_id', 'created_at'),
+        Index('ix_order_db_created_at', 'created_at'),
+        Index('ix_order_db_midtrans_order_id', 'midtrans_order_id', unique=True),
+        Index('ix_order_db_updated_at', 'updated_at'),
+    )
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users_db.id'))
     created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, nullable=True, onupdate=datetime.now)
     amount = Column(Integer, nullable=False)
     payment_method = Column(Enum(PaymentMethodEnum,native_enum=False,validate_strings=True),nullable=False)
     notes = Column(String(255), nullable=True)
+    midtrans_order_id = Column(String(100), nullable=True)
+    # Ringkasan item untuk halaman listing (diisi di process_order, dicek oleh orders-check-summary)
+    item_count = Column(Integer, default=0)
+    line_count = Column(Integer, default=0)
+    first_product_id = Column(Integer, nullable=True)
+    first_product_name = Column(String(100), nullable=True)
     status = Column(
     Enum(OrderStatusEnum, native_enum=False, validate_strings=True),
     default=OrderStatusEnum.PENDING,
@@ -122,15 +161,88 @@ class Order(Base):
     user = relationship("User", backref="orders")
     products_ordered = relationship("Product", secondary='product_order_db', backref="orders")
 
+    def apply_summary(self, lines):
+        """Isi kolom ringkasan dari list (product_id, product_name, quantity) sesuai urutan item"""
+        self.item_count = sum(int(qty or 0) for _, _, qty in lines)
+        self.line_count = len(lines)
+        self.first_product_id = lines[0][0] if lines else None
+        self.first_product_name = lines[0][1] if lines else None
+
     def __repr__(self):
         return f'<Order {self.id} - User {self.user_id}>'
     
 class ProductOrder(Base):
     __tablename__ = 'product_order_db'
+    __table_args__ = (
+        Index('ix_product_order_db_order_id', 'order_id'),
+        Index('ix_product_order_db_product_id', 'product_id'),
+    )
     id = Column(Integer, primary_key=True)
     product_id = Column(Integer, ForeignKey('product_db.id'))
     order_id = Column(Integer, ForeignKey('order_db.id'))
+    # Salinan order_db.created_at: kunci partisi bulanan product_order_db di PostgreSQL (order_archive.py)
+    order_created_at = Column(DateTime, nullable=True)
     quantity = Column(Integer, nullable=False)
+    # Snapshot produk saat checkout, supaya riwayat order tidak ikut berubah saat produk diedit
+    unit_price = Column(Integer, nullable=True)
+    product_name = Column(String(100), nullable=True)
+    product_category = Column(String(50), nullable=True)
 
     product = relationship("Product", backref="product_orders")
-    order = relationship("Order", backref="product_orders")
\ No newline at end of file
+    order = relationship("Order", backref="product_orders")
+
+
+class CacheVersion(Base):
+    """Counter versi untuk invalidasi cache (contoh: 'catalog' naik setiap produk/stok berubah)"""
+    __tablename__ = 'cache_version_db'
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+class ProductStockShard(Base):
+    """Potongan stok produk mode shard; stok sebenarnya = jumlah semua shard produk itu"""
+    __tablename__ = 'product_stock_shard_db'
+    product_id = Column(Integer, ForeignKey('product_db.id', ondelete='CASCADE'), primary_key=True)
+    shard = Column(Integer, primary_key=True)
+    stock = Column(Integer, nullable=False, default=0)
+
+
+class OrderArchive(Base):
+    """Order lama (APPROVE/CANCEL) yang dipindah dari order_db; order + item disimpan di payload (JSON zlib)"""
+    __tablename__ = 'order_archive_db'
+    __table_args__ = (
+        Index('ix_order_archive_db_user_id_created_at', 'user_id', 'created_at'),
+    )
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    status = Column(String(20), nullable=False)
+    amount = Column(Integer, nullable=False)
+    archived_at = Column(DateTime, nullable=False, default=datetime.now)
+    payload = Column(LargeBinary, nullable=False)
+
+
+class IdempotencyKey(Base):
+    """Response tersimpan per (user, Idempotency-Key); response_status NULL = request pertama masih diproses"""
+    __tablename__ = 'idempotency_key_db'
+    __table_args__ = (
+        Index('ix_idempotency_key_db_expires_at', 'expires_at'),
+    )
+    user_id = Column(Integer, primary_key=True)
+    request_key = Column(String(64), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    response_status = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
+    expires_at = Column(DateTime, nullable=False)
+
+
+class SessionRecord(Base):
+    """Session Flask server-side (lihat server_session.py); cookie hanya membawa sid"""
+    __tablename__ = 'session_db'
+    __table_args__ = (
+        Index('ix_session_db_expires_at', 'expires_at'),
+    )
+    sid = Column(String(64), primary_key=True)
+    data = Column(LargeBinary, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
@@ -0,0 +1,353 @@
+"""Partisi bulanan order_db / product_order_db dan arsip order lama.
+
+PostgreSQL: order_db dipartisi RANGE per bulan pada created_at dan product_order_db pada
+order_created_at (salinan created_at order-nya), lihat migrasi 0012. Isi tabel lama tidak
+disalin: tabel itu di-attach utuh sebagai partisi `<tabel>_legacy` (MINVALUE s/d cutoff), setelah
+CHECK constraint divalidasi online supaya ATTACH tidak perlu scan. Order baru masuk ke partisi
+bulanan `<tabel>_pYYYYMM`; `flask orders-partitions` (cron harian/mingguan) menyiapkan partisi
+beberapa bulan ke depan, partisi DEFAULT menampung sisanya. Filter tanggal ditulis sebagai rentang
+`created_at >= a AND created_at < b` supaya planner hanya membuka partisi bulan terkait.
+
+Karena primary key tabel berpartisi harus memuat kunci partisi, PK menjadi (id, created_at) dan
+foreign key product_order_db.order_id -> order_db.id dihapus; item selalu ditulis bersama order-nya
+dalam satu transaksi dan dihapus bersama oleh arsip. Alasan yang sama berlaku untuk index unik
+lain: ix_order_db_midtrans_order_id menjadi unik pada (midtrans_order_id, created_at), jadi
+database TIDAK lagi menjamin midtrans_order_id unik secara global. Keunikan bergantung pada
+formatnya (`ORDER-<id>-<timestamp>`, snap_param di app.py) yang memuat id order dari sequence.
+
+SQLite / MySQL (fallback): tabel tidak dipartisi. Listing memakai index created_at yang sudah ada
+dan ukuran tabel dijaga oleh arsip di bawah.
+
+Arsip: `flask orders-archive` memindahkan order APPROVE/CANCEL yang lebih tua dari
+ORDER_ARCHIVE_DAYS hari (default 365) ke order_archive_db per batch: satu baris per order berisi
+kolom ringkas (user, tanggal, status, total) dan payload JSON terkompresi zlib berisi order + item.
+Partisi PostgreSQL yang sudah kosong setelah diarsip di-detach dan di-drop. Arsip tetap bisa dibaca
+lewat archived_order() / archived_summary() (detail pesanan dan `/order-user?arsip=1`).
+"""
+import json
+import re
+import time
+import zlib
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import delete, insert, inspect, select, text
+
+from models import Order, OrderArchive, OrderStatusEnum, PaymentMethodEnum, ProductOrder, db
+
+# Tabel berpartisi dan kunci partisinya; urutan penting (FK ke order_db dihapus saat order_db diubah)
+PARTITIONED = (('order_db', 'created_at'), ('product_order_db', 'order_created_at'))
+CLOSED_STATUSES = (OrderStatusEnum.APPROVE, OrderStatusEnum.CANCEL)
+
+orders_table = Order.__table__
+lines_table = ProductOrder.__table__
+archive_table = OrderArchive.__table__
+
+_BOUND = re.compile(r"FROM \((MINVALUE|'[^']+')\) TO \((MAXVALUE|'[^']+')\)")
+_CUTOFF = re.compile(r"< '([^']+)'")
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(value, months):
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def day_range(column, day):
+    """Filter satu hari kalender sebagai rentang (bisa memakai index dan partition pruning)"""
+    start = datetime.combine(day, datetime.min.time())
+    return (column >= start) & (column < start + timedelta(days=1))
+
+
+# ---- partisi (PostgreSQL) ----
+
+def is_partitioned(conn, table):
+    if conn.dialect.name != 'postgresql':
+        return False
+    return conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :t"
+    ), {'t': table}).first() is not None
+
+
+def partitions(conn, table):
+    """[(nama, batas bawah, batas atas)], None = MINVALUE/MAXVALUE; partisi DEFAULT tidak ikut"""
+    rows = conn.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = CAST(:t AS regclass) ORDER BY 1"
+    ), {'t': table})
+    result = []
+    for name, bound in rows:
+        match = _BOUND.search(bound or '')
+        if match:
+            lo, hi = (None if value.endswith('VALUE') else datetime.fromisoformat(value.strip("'"))
+                      for value in match.groups())
+            result.append((name, lo, hi))
+    return result
+
+
+def ensure_partitions(conn, months_ahead=3, echo=print):
+    """Buat partisi bulanan dari batas atas partisi terakhir sampai months_ahead bulan ke depan"""
+    created = 0
+    end = add_months(month_start(datetime.now()), months_ahead + 1)
+    for table, _ in PARTITIONED:
+        if not is_partitioned(conn, table):
+            continue
+        bounds = [hi for _, _, hi in partitions(conn, table) if hi is not None]
+        start = max(bounds) if bounds else month_start(datetime.now())
+        while start < end:
+            upper = add_months(start, 1)
+            sql = (f"CREATE TABLE IF NOT EXISTS {table}_p{start:%Y%m} PARTITION OF {table} "
+                   f"FOR VALUES FROM ('{start}') TO ('{upper}')")
+            echo(f'  {sql}')
+            conn.execute(text(sql))
+            created += 1
+            start = upper
+    return created
+
+
+def _constraint_def(conn, table, name):
+    return conn.execute(text(
+        "SELECT pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = CAST(:t AS regclass) AND conname = :n"
+    ), {'t': table, 'n': name}).scalar()
+
+
+def partition_table(m, table, key, cutoff):
+    """Ubah tabel biasa menjadi tabel berpartisi; isi lama menjadi partisi <table>_legacy (< cutoff).
+
+    m adalah MigrationContext (migrate.py). Langkah berat (index unik, validasi CHECK) berjalan online;
+    pertukaran tabel satu transaksi singkat yang hanya mengubah katalog.
+    """
+    if is_partitioned(m.conn, table):
+        m.echo(f'  {table} sudah berpartisi, dilewati')
+        return
+    legacy = f'{table}_legacy'
+    check = f'{legacy}_range'
+    pk_index = f'{table}_id_{key}_key'
+
+    # Index lama direplikasi di tabel induk; index unik harus ikut memuat kunci partisi
+    plan = []
+    for index in inspect(m.conn).get_indexes(table):
+        if index['name'] == pk_index or index['name'].endswith('_uniq'):
+            continue
+        columns = list(index['column_names'])
+        if index['unique'] and key not in columns:
+            m.echo(f"  ! {index['name']}: unik hanya per ({', '.join(columns)}, {key}), tidak lagi global")
+            columns.append(key)
+            m.create_index(f"{index['name']}_uniq", table, columns, unique=True)
+        plan.append((index['name'], columns, index['unique']))
+    m.create_index(pk_index, table, ['id', key], unique=True)
+
+    # CHECK yang sudah valid membuat ATTACH PARTITION tidak perlu scan tabel di bawah lock
+    existing = _constraint_def(m.conn, table, check)
+    if existing:
+        cutoff = datetime.fromisoformat(_CUTOFF.search(existing).group(1))
+    else:
+        m.execute(f"ALTER TABLE {table} ADD CONSTRAINT {check} "
+                  f"CHECK ({key} IS NOT NULL AND {key} < '{cutoff}') NOT VALID", table)
+    m.execute(f'ALTER TABLE {table} VALIDATE CONSTRAINT {check}', table, 'validate')
+    m.execute(f'ALTER TABLE {table} ALTER COLUMN {key} SET NOT NULL', table)
+
+    with m.engine.begin() as conn:
+        conn.execute(text(f"SET LOCAL lock_timeout = '{m.lock_timeout}'"))
+        pkey = inspect(conn).get_pk_constraint(table)['name']
+        sequence = conn.execute(text("SELECT pg_get_serial_sequence(:t, 'id')"), {'t': table}).scalar()
+        referencing = conn.execute(text(
+            "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+            "WHERE contype = 'f' AND confrelid = CAST(:t AS regclass) AND conrelid <> confrelid"
+        ), {'t': table}).all()
+        foreign_keys = conn.execute(text(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE contype = 'f' AND conrelid = CAST(:t AS regclass)"
+        ), {'t': table}).all()
+
+        statements = [f'ALTER TABLE {other} DROP CONSTRAINT {name}' for other, name in referencing]
+        statements += [
+            f'ALTER TABLE {table} RENAME TO {legacy}',
+            f'ALTER TABLE {legacy} DROP CONSTRAINT {pkey}',
+            f'ALTER TABLE {legacy} ADD CONSTRAINT {legacy}_pkey PRIMARY KEY USING INDEX {pk_index}',
+        ]
+        statements += [f'ALTER INDEX {name} RENAME TO {name}_legacy' for name, _, _ in plan]
+        statements += [
+            f'CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE ({key})',
+            f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, {key})',
+        ]
+        statements += [f"CREATE {'UNIQUE ' if unique else ''}INDEX {name} ON {table} ({', '.join(columns)})"
+                       for name, columns, unique in plan]
+        statements += [f'ALTER TABLE {table} ADD CONSTRAINT {name} {definition}' for name, definition in foreign_keys]
+        if sequence:
+            statements.append(f'ALTER SEQUENCE {sequence} OWNED BY {table}.id')
+        statements += [
+            f"ALTER TABLE {table} ATTACH PARTITION {legacy} FOR VALUES FROM (MINVALUE) TO ('{cutoff}')",
+            f'ALTER TABLE {legacy} DROP CONSTRAINT {check}',
+            f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT',
+        ]
+        m.echo(f'  -- satu transaksi, lock=ACCESS EXCLUSIVE singkat di {table} (hanya katalog, tanpa salin data)')
+        for sql in statements:
+            m.echo(f'  {sql}')
+            if not m.dry_run:
+                conn.execute(text(sql))
+
+
+def partition_orders(m, months_ahead=3):
+    """Partisi order_db dan product_order_db (dipakai migrasi 0012 dan init-db di PostgreSQL)"""
+    # Cutoff dua bulan ke depan: order yang masuk selama migrasi tetap lolos CHECK partisi legacy
+    cutoff = add_months(month_start(datetime.now()), 2)
+    for table, key in PARTITIONED:
+        partition_table(m, table, key, cutoff)
+    if not m.dry_run:
+        ensure_partitions(m.conn, months_ahead, m.echo)
+
+
+def drop_empty_partitions(before, echo=print):
+    """Detach + drop partisi yang seluruh rentangnya < before dan sudah kosong"""
+    dropped = []
+    with db.engine.connect() as conn:
+        conn = conn.execution_options(isolation_level='AUTOCOMMIT')
+        for table, _ in PARTITIONED:
+            if not is_partitioned(conn, table):
+                continue
+            for name, _, hi in partitions(conn, table):
+                if hi is None or hi > before:
+                    continue
+                if conn.execute(text(f'SELECT 1 FROM {name} LIMIT 1')).first():
+                    continue
+                for sql in (f'ALTER TABLE {table} DETACH PARTITION {name}', f'DROP TABLE {name}'):
+                    echo(f'  {sql}')
+                    conn.execute(text(sql))
+                dropped.append(name)
+    return dropped
+
+
+# ---- arsip ----
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def archive_batch(before, batch_size=500):
+    """Pindahkan satu batch order tertutup yang dibuat sebelum `before`; commit di sini"""
+    orders = db.session.execute(select(orders_table).where(
+        orders_table.c.created_at < before, orders_table.c.status.in_(CLOSED_STATUSES)
+    ).order_by(orders_table.c.created_at).limit(batch_size)).mappings().all()
+    if not orders:
+        return 0
+    ids = [order['id'] for order in orders]
+    lines = {}
+    for line in db.session.execute(select(lines_table).where(lines_table.c.order_id.in_(ids)).order_by(
+            lines_table.c.id)).mappings():
+        lines.setdefault(line['order_id'], []).append(dict(line))
+
+    now = datetime.now()
+    db.session.execute(insert(archive_table), [{
+        'id': order['id'],
+        'user_id': order['user_id'],
+        'created_at': order['created_at'],
+        'status': order['status'].value,
+        'amount': order['amount'],
+        'archived_at': now,
+        'payload': zlib.compress(json.dumps(
+            {'order': dict(order), 'lines': lines.get(order['id'], [])}, default=_json_default
+        ).encode('utf-8'), 9),
+    } for order in orders])
+    db.session.execute(delete(lines_table).where(lines_table.c.order_id.in_(ids)))
+    db.session.execute(delete(orders_table).where(orders_table.c.id.in_(ids)))
+    db.session.commit()
+    return len(orders)
+
+
+def archive_orders(before, batch_size=500, pause=0.05, echo=print):
+    total = 0
+    while True:
+        moved = archive_batch(before, batch_size)
+        total += moved
+        if moved:
+            echo(f'  {total} order diarsip')
+        if moved < batch_size:
+            return total
+        time.sleep(pause)
+
+
+def _load(row):
+    data = json.loads(zlib.decompress(row.payload))
+    order = data['order']
+    for name in ('created_at', 'updated_at'):
+        order[name] = datetime.fromisoformat(order[name]) if order.get(name) else None
+    return order, data['lines']
+
+
+def archived_order(order_id, user_id=None):
+    """Order dari arsip dengan atribut seperti Order (untuk template detail), None jika tidak ada"""
+    query = db.session.query(OrderArchive).filter(OrderArchive.id == order_id)
+    if user_id is not None:
+        query = query.filter(OrderArchive.user_id == user_id)
+    row = query.first()
+    if row is None:
+        return None
+    order, lines = _load(row)
+    order.update(
+        status=OrderStatusEnum(order['status']),
+        payment_method=PaymentMethodEnum(order['payment_method']),
+        product_orders=[SimpleNamespace(**line) for line in lines],
+        archived=True,
+    )
+    return SimpleNamespace(**order)
+
+
+def archived_summary(row):
+    """Ringkasan satu order arsip (format sama dengan listing order_user)"""
+    order, _ = _load(row)
+    return {
+        'id': row.id,
+        'created_at': row.created_at,
+        'status': row.status,
+        'amount': row.amount,
+        'item_count': order.get('item_count'),
+        'line_count': order.get('line_count'),
+        'first_product_id': order.get('first_product_id'),
+        'first_product_name': order.get('first_product_name'),
+    }
+
+
+def init_order_archive(app):
+    app.config.setdefault('ORDER_ARCHIVE_DAYS', 365)
+    app.config.setdefault('ORDER_PARTITIONS_AHEAD', 3)
+
+
+@click.command('orders-partitions')
+@click.option('--months-ahead', type=int, default=None, help='Default ORDER_PARTITIONS_AHEAD')
+@with_appcontext
+def orders_partitions_command(months_ahead):
+    """Siapkan partisi bulanan order_db/product_order_db ke depan (PostgreSQL)"""
+    if db.engine.dialect.name != 'postgresql':
+        click.echo(f'{db.engine.dialect.name}: tabel order tidak dipartisi, tidak ada yang dibuat')
+        return
+    months_ahead = current_app.config['ORDER_PARTITIONS_AHEAD'] if months_ahead is None else months_ahead
+    with db.engine.connect() as conn:
+        created = ensure_partitions(conn.execution_options(isolation_level='AUTOCOMMIT'), months_ahead, click.echo)
+    click.echo(f'{created} partisi dibuat')
+
+
+@click.command('orders-archive')
+@click.option('--older-than-days', type=int, default=None, help='Default ORDER_ARCHIVE_DAYS')
+@click.option('--batch-size', default=500, show_default=True)
+@click.option('--dry-run', is_flag=True, help='Hanya hitung order yang akan diarsip')
+@with_appcontext
+def orders_archive_command(older_than_days, batch_size, dry_run):
+    """Pindahkan order APPROVE/CANCEL lama ke order_archive_db dan drop partisi yang kosong"""
+    days = current_app.config['ORDER_ARCHIVE_DAYS'] if older_than_days is None else older_than_days
+    before = datetime.combine(datetime.now().date() - timedelta(days=days), datetime.min.time())
+    if dry_run:
+        count = db.session.query(Order).filter(Order.created_at < before, Order.status.in_(CLOSED_STATUSES)).count()
+        click.echo(f'{count} order sebelum {before:%Y-%m-%d} akan diarsip')
+        return
+    total = archive_orders(before, batch_size, echo=click.echo)
+    dropped = drop_empty_partitions(before, click.echo)
+    click.echo(f'{total} order sebelum {before:%Y-%m-%d} diarsip, {len(dropped)} partisi kosong di-drop')
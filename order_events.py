@@ -0,0 +1,203 @@
+"""Feed event order untuk halaman admin lewat Server-Sent Events.
+
+Event (`order_created`, `order_status`) dipublish setelah commit oleh process_order dan
+aksi admin, lalu dikirim ke semua koneksi /admin/orders/events. Data event berisi baris
+listing yang sama dengan /admin/orders/data, jadi tabel admin cukup menambah/mengganti satu
+baris tanpa reload.
+
+- Broker lokal per proses: setiap subscriber punya antrean terbatas; subscriber yang terlalu
+  lambat diputus dan browser otomatis reconnect (EventSource).
+- Riwayat ORDER_EVENTS_BACKLOG event terakhir disimpan, sehingga reconnect dengan
+  Last-Event-ID bisa menyusul event yang terlewat. Jika celahnya terlalu jauh, klien
+  mendapat event `reset` dan me-reload tabel.
+- Dengan banyak worker gunicorn, set ORDER_EVENTS_REDIS_URL (butuh paket `redis`) supaya event
+  dari satu worker diteruskan ke subscriber di worker lain.
+- Koneksi idle hanya menunggu di queue.get, tapi tetap memegang satu thread worker gthread.
+  gunicorn.conf.py memakai worker gevent secara default; stream per worker dibatasi
+  ORDER_EVENTS_MAX_STREAMS (0 = SSE dimatikan) dan koneksi di atas batas dijawab 503, supaya
+  stream tidak menghabiskan thread untuk request biasa.
+"""
+import itertools
+import json
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+
+from flask import current_app, jsonify, request
+
+from models import db
+
+
+class OrderEventBroker:
+    def __init__(self, backlog=200, queue_size=100, max_subscribers=100):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._history = deque(maxlen=backlog)
+        self._ids = itertools.count(1)
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.dropped = 0
+        self.rejected = 0
+
+    def subscribe(self, last_event_id=None):
+        """Daftarkan subscriber baru; kembalikan (antrean, event yang terlewat atau None jika celah).
+
+        Antrean None jika sudah ada max_subscribers stream di proses ini.
+        """
+        subscriber = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                self.rejected += 1
+                return None, None
+            self._subscribers.add(subscriber)
+            missed = []
+            if last_event_id is not None:
+                missed = [event for event in self._history if event['id'] > last_event_id]
+                oldest = self._history[0]['id'] if self._history else 1
+                newest = self._history[-1]['id'] if self._history else 0
+                # Celah terlalu jauh, atau id dari proses lain (worker berbeda / sudah restart)
+                if last_event_id < oldest - 1 or last_event_id > newest:
+                    missed = None
+        return subscriber, missed
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def dispatch(self, name, data):
+        with self._lock:
+            event = {'id': next(self._ids), 'event': name, 'data': data}
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                # Klien terlalu lambat: kosongkan antreannya dan kirim sinyal putus,
+                # browser akan reconnect lalu menyusul/reload tabel
+                self.unsubscribe(subscriber)
+                with subscriber.mutex:
+                    subscriber.queue.clear()
+                subscriber.put_nowait(None)
+                self.dropped += 1
+
+    def stats(self):
+        with self._lock:
+            return {'subscribers': len(self._subscribers), 'max_subscribers': self.max_subscribers,
+                    'backlog': len(self._history), 'dropped': self.dropped, 'rejected': self.rejected}
+
+
+class RedisRelay:
+    """Teruskan event antar worker lewat Redis pub/sub"""
+
+    def __init__(self, url, broker, channel='order_events'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.broker = broker
+        self.channel = channel
+        self.origin = uuid.uuid4().hex
+        self._thread = None
+
+    def publish(self, name, data):
+        self.client.publish(self.channel, json.dumps({'origin': self.origin, 'event': name, 'data': data}))
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._listen, name='order-events-relay', daemon=True)
+        self._thread.start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                for message in pubsub.listen():
+                    payload = json.loads(message['data'])
+                    if payload['origin'] != self.origin:
+                        self.broker.dispatch(payload['event'], payload['data'])
+            except Exception as e:
+                print(f"Order events relay error: {e}")
+                time.sleep(1)
+
+
+def init_order_events(app):
+    app.config.setdefault('ORDER_EVENTS_BACKLOG', 200)
+    app.config.setdefault('ORDER_EVENTS_HEARTBEAT', 15)
+    app.config.setdefault('ORDER_EVENTS_REDIS_URL', None)
+    app.config.setdefault('ORDER_EVENTS_MAX_STREAMS', 100)
+
+    broker = OrderEventBroker(backlog=app.config['ORDER_EVENTS_BACKLOG'],
+                              max_subscribers=app.config['ORDER_EVENTS_MAX_STREAMS'])
+    relay = None
+    if app.config['ORDER_EVENTS_REDIS_URL']:
+        try:
+            relay = RedisRelay(app.config['ORDER_EVENTS_REDIS_URL'], broker)
+        except ImportError:
+            print("ORDER_EVENTS_REDIS_URL di-set tapi paket redis tidak terpasang, event hanya lokal per worker")
+    app.extensions['order_events'] = (broker, relay)
+
+
+def publish_order_event(name, data):
+    """Kirim event ke subscriber lokal (+ worker lain via Redis). Panggil SETELAH commit."""
+    broker, relay = current_app.extensions['order_events']
+    broker.dispatch(name, data)
+    if relay is not None:
+        try:
+            relay.publish(name, data)
+        except Exception as e:
+            print(f"Order events relay error: {e}")
+
+
+def _format(event):
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+def event_stream_response():
+    broker, relay = current_app.extensions['order_events']
+    if relay is not None:
+        # Thread listener dibuat di worker (setelah fork), bukan di master gunicorn
+        relay.start()
+    heartbeat = current_app.config['ORDER_EVENTS_HEARTBEAT']
+
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    subscriber, missed = broker.subscribe(last_event_id)
+    if subscriber is None:
+        # Halaman admin mencoba lagi nanti; tabel tetap bisa di-refresh manual
+        response = jsonify({'success': False, 'message': 'Terlalu banyak koneksi feed pesanan'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '30'
+        return response
+    # Stream bisa terbuka berjam-jam: kembalikan koneksi DB ke pool sekarang
+    db.session.close()
+
+    def stream():
+        try:
+            yield 'retry: 3000\n\n'
+            if missed is None:
+                yield 'event: reset\ndata: {}\n\n'
+            else:
+                for event in missed:
+                    yield _format(event)
+            while True:
+                try:
+                    event = subscriber.get(timeout=heartbeat)
+                except queue.Empty:
+                    # Komentar SSE menjaga koneksi tetap hidup melewati proxy
+                    yield ': ping\n\n'
+                    continue
+                if event is None:
+                    return
+                yield _format(event)
+        finally:
+            broker.unsubscribe(subscriber)
+
+    response = current_app.response_class(stream(), mimetype='text/event-stream')
+    # Juga jika koneksi ditutup sebelum generator sempat berjalan (finally di atas tidak dipanggil)
+    response.call_on_close(lambda: broker.unsubscribe(subscriber))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
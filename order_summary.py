@@ -0,0 +1,85 @@
+"""Pemeriksa konsistensi kolom ringkasan order (item_count, line_count, first_product_*).
+
+Kolom ringkasan ditulis sekali di process_order. Jika ada perubahan langsung ke
+product_order_db (script manual, restore data, dsb) ringkasan bisa menyimpang; command ini
+menghitung ulang dari product_order_db dan memperbaikinya.
+
+    flask --app app orders-check-summary            # hanya laporan
+    flask --app app orders-check-summary --repair
+"""
+from collections import defaultdict
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func
+
+from models import Order, Product, ProductOrder, db
+
+
+def expected_lines(order_ids):
+    """Ambil item per order sebagai list (product_id, product_name, quantity) urut sesuai id item"""
+    rows = db.session.query(
+        ProductOrder.order_id, ProductOrder.product_id,
+        func.coalesce(ProductOrder.product_name, Product.product_name), ProductOrder.quantity
+    ).outerjoin(Product, Product.id == ProductOrder.product_id).filter(
+        ProductOrder.order_id.in_(order_ids)
+    ).order_by(ProductOrder.order_id, ProductOrder.id).all()
+
+    lines = defaultdict(list)
+    for order_id, product_id, product_name, quantity in rows:
+        lines[order_id].append((product_id, product_name, quantity))
+    return lines
+
+
+def check_order_summaries(repair=False, batch_size=1000, echo=click.echo):
+    checked = drifted = 0
+    last_id = 0
+    while True:
+        orders = db.session.query(Order).filter(Order.id > last_id).order_by(Order.id).limit(batch_size).all()
+        if not orders:
+            break
+        last_id = orders[-1].id
+        lines_by_order = expected_lines([o.id for o in orders])
+
+        for order in orders:
+            checked += 1
+            lines = lines_by_order.get(order.id, [])
+            expected = Order()
+            expected.apply_summary(lines)
+            # Nama produk pertama adalah snapshot saat checkout, jadi hanya dianggap drift jika kosong
+            drift = (
+                order.item_count != expected.item_count
+                or order.line_count != expected.line_count
+                or order.first_product_id != expected.first_product_id
+                or (order.first_product_name is None and expected.first_product_name is not None)
+            )
+            if not drift:
+                continue
+            drifted += 1
+            echo(f'Order #{order.id}: item_count {order.item_count} -> {expected.item_count}, '
+                 f'line_count {order.line_count} -> {expected.line_count}, '
+                 f'first_product_id {order.first_product_id} -> {expected.first_product_id}')
+            if repair:
+                if order.first_product_id != expected.first_product_id or not order.first_product_name:
+                    order.first_product_name = expected.first_product_name
+                order.item_count = expected.item_count
+                order.line_count = expected.line_count
+                order.first_product_id = expected.first_product_id
+
+        if repair:
+            db.session.commit()
+        else:
+            db.session.rollback()
+        db.session.expunge_all()
+    return checked, drifted
+
+
+@click.command('orders-check-summary')
+@click.option('--repair', is_flag=True, help='Perbaiki ringkasan yang menyimpang')
+@click.option('--batch-size', default=1000, show_default=True)
+@with_appcontext
+def check_summary_command(repair, batch_size):
+    """Bandingkan ringkasan order dengan product_order_db"""
+    checked, drifted = check_order_summaries(repair=repair, batch_size=batch_size)
+    action = 'diperbaiki' if repair else 'ditemukan'
+    click.echo(f'{checked} order dicek, {drifted} ringkasan menyimpang {action}')
@@ -0,0 +1,220 @@
+"""Lapisan HTTP keluar bersama untuk Midtrans Snap dan Google OAuth.
+
+Setiap dependency punya:
+- requests.Session dengan pool koneksi keep-alive (dibuat per proses, aman setelah fork gunicorn)
+- timeout default (connect, read) dan batas panggilan bersamaan; jika slot penuh lebih lama
+  dari queue_timeout, panggilan ditolak dengan DependencyUnavailable
+- circuit breaker: setelah failure_threshold kegagalan beruntun (timeout, koneksi gagal,
+  HTTP 5xx/429) circuit terbuka selama reset_timeout detik dan panggilan langsung ditolak,
+  lalu satu panggilan percobaan menentukan circuit ditutup lagi atau tetap terbuka
+- metrik latensi (p50/p95/p99), jumlah gagal dan ditolak, lihat /admin/outbound
+
+midtransclient memakai objek `requests` lewat snap.http_client.http_client, jadi cukup diganti
+dengan Dependency. Client authlib membuat OAuth2Session baru per panggilan, jadi dipakai
+PooledOAuth2Session yang meminjam adapter bersama.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+import requests
+from authlib.integrations.requests_client import OAuth2Session
+from flask import current_app
+from requests.adapters import HTTPAdapter
+
+DEFAULTS = {
+    'connect_timeout': 3.0,
+    'read_timeout': 10.0,
+    'max_concurrency': 20,
+    'queue_timeout': 1.0,
+    'failure_threshold': 5,
+    'reset_timeout': 30.0,
+}
+
+
+class DependencyUnavailable(Exception):
+    """Panggilan ditolak tanpa menghubungi server (circuit terbuka atau slot penuh)"""
+
+    def __init__(self, name, reason):
+        super().__init__(f"{name} tidak tersedia ({reason})")
+        self.name = name
+        self.reason = reason
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self._trial_running:
+                # Hanya satu panggilan percobaan sampai hasilnya diketahui
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+
+class Dependency:
+    """Pengganti `requests` untuk satu layanan luar: request(method, url, **kwargs)"""
+
+    def __init__(self, name, connect_timeout, read_timeout, max_concurrency, queue_timeout,
+                 failure_threshold, reset_timeout):
+        self.name = name
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._session = None
+        self.reset_metrics()
+
+    def reset_metrics(self):
+        with self._lock:
+            self.calls = 0
+            self.failures = 0
+            self.rejected = {'open': 0, 'busy': 0}
+            self.in_flight = 0
+            self.latencies = deque(maxlen=1000)
+
+    @property
+    def adapter(self):
+        return self.session.get_adapter('https://')
+
+    @property
+    def session(self):
+        # Pool koneksi tidak boleh dibagi antar proses (master -> worker gunicorn)
+        if self._pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.max_concurrency)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            self._session, self._pid = session, os.getpid()
+        return self._session
+
+    def call(self, send, *args, **kwargs):
+        """Jalankan send(*args, **kwargs) (satu request HTTP) di bawah breaker, batas slot dan timeout"""
+        # Slot dulu: allow() di half-open menandai panggilan percobaan, yang harus selalu selesai
+        # dengan record_success/record_failure
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self._reject('busy')
+        if not self.breaker.allow():
+            self._slots.release()
+            self._reject('open')
+
+        kwargs.setdefault('timeout', self.timeout)
+        with self._lock:
+            self.in_flight += 1
+        start = time.perf_counter()
+        failed = True
+        try:
+            response = send(*args, **kwargs)
+            failed = response.status_code >= 500 or response.status_code == 429
+            return response
+        finally:
+            elapsed = time.perf_counter() - start
+            self._slots.release()
+            if failed:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            with self._lock:
+                self.in_flight -= 1
+                self.calls += 1
+                self.failures += failed
+                self.latencies.append(elapsed)
+
+    def request(self, method, url, **kwargs):
+        return self.call(self.session.request, method, url, **kwargs)
+
+    def _reject(self, reason):
+        with self._lock:
+            self.rejected[reason] += 1
+        raise DependencyUnavailable(self.name, reason)
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            stats = {
+                'state': self.breaker.state,
+                'calls': self.calls,
+                'failures': self.failures,
+                'rejected': dict(self.rejected),
+                'in_flight': self.in_flight,
+                'max_concurrency': self.max_concurrency,
+                'timeout': self.timeout,
+            }
+        for pct in (50, 95, 99):
+            value = latencies[min(len(latencies) - 1, int(len(latencies) * pct / 100))] if latencies else 0
+            stats[f'p{pct}_ms'] = round(value * 1000, 1)
+        return stats
+
+
+class PooledOAuth2Session(OAuth2Session):
+    """OAuth2Session authlib yang lewat Dependency `dependency_name` (pool, timeout, breaker)"""
+
+    dependency_name = 'google'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.dependency = get_dependency(self.dependency_name)
+        adapter = self.dependency.adapter
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    def request(self, method, url, **kwargs):
+        return self.dependency.call(super().request, method, url, **kwargs)
+
+    def close(self):
+        # Adapter milik pool bersama, jangan ditutup bersama session sementara ini
+        pass
+
+
+def config_from_env(name):
+    prefix = f'OUTBOUND_{name.upper()}_'
+    return {
+        key: type(default)(os.environ[prefix + key.upper()])
+        for key, default in DEFAULTS.items() if prefix + key.upper() in os.environ
+    }
+
+
+def init_outbound(app):
+    app.config.setdefault('OUTBOUND_DEPENDENCIES', {'midtrans': {}, 'google': {}})
+    app.extensions['outbound'] = {
+        name: Dependency(name, **dict(DEFAULTS, **options))
+        for name, options in app.config['OUTBOUND_DEPENDENCIES'].items()
+    }
+
+
+def get_dependency(name):
+    return current_app.extensions['outbound'][name]
+
+
+def outbound_stats():
+    return {name: dependency.stats() for name, dependency in current_app.extensions['outbound'].items()}
@@ -0,0 +1,214 @@
+"""Hash password di process pool terbatas, parameter bisa diatur, rehash otomatis saat login.
+
+PBKDF2/scrypt menghabiskan ratusan ms CPU per login; tanpa batas, badai login di thread request
+memakan semua core dan request lain di worker ikut melambat. Di sini hash/verify dikirim ke
+ProcessPoolExecutor (PASSWORD_HASH_WORKERS proses per worker gunicorn, dibuat saat pertama dipakai
+setelah fork), jadi paling banyak sejumlah itu hash berjalan bersamaan per worker (di host:
+jumlah worker x PASSWORD_HASH_WORKERS, lihat gunicorn.conf.py) dan pekerjaan Python lain di
+proses worker tidak ikut bersaing. Antrian dibatasi PASSWORD_HASH_MAX_PENDING:
+request yang tidak mendapat slot dalam PASSWORD_HASH_QUEUE_TIMEOUT detik dijawab 503 + Retry-After
+alih-alih menumpuk. PASSWORD_HASH_WORKERS=0 menjalankan hash langsung di thread request.
+
+PASSWORD_HASH_METHOD memakai format werkzeug (`pbkdf2:sha256:600000`, `scrypt:32768:8:1`);
+pilih parameter dengan `python bench/password_hash.py`. Hash tersimpan yang metodenya berbeda
+diganti dengan hash baru saat login berhasil (needs_rehash). Password lebih panjang dari
+PASSWORD_MAX_BYTES ditolak sebelum di-hash. Statistik: /admin/passwords (`?reset=1`).
+"""
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app, has_app_context
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = f'pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}'
+DEFAULT_MAX_BYTES = 1024
+MAX_POOL_FAILURES = 3
+
+
+class PasswordHasherBusy(Exception):
+    """Semua slot hash terpakai lebih lama dari PASSWORD_HASH_QUEUE_TIMEOUT"""
+
+
+class PasswordTooLong(ValueError):
+    pass
+
+
+def normalize_method(method):
+    """Lengkapi parameter default werkzeug, supaya bisa dibandingkan dengan prefix hash tersimpan"""
+    parts = (method or DEFAULT_METHOD).split(':')
+    if parts[0] == 'pbkdf2':
+        parts += ['sha256', str(DEFAULT_PBKDF2_ITERATIONS)][len(parts) - 1:]
+    elif parts[0] == 'scrypt':
+        parts += ['32768', '8', '1'][len(parts) - 1:]
+    return ':'.join(parts)
+
+
+def _hash(password, method):
+    return generate_password_hash(password, method)
+
+
+def _verify(password_hash, password):
+    return check_password_hash(password_hash, password)
+
+
+class PasswordHasher:
+    def __init__(self, method=DEFAULT_METHOD, workers=0, max_pending=32, queue_timeout=2.0,
+                 max_bytes=DEFAULT_MAX_BYTES):
+        self.method = normalize_method(method)
+        self.workers = workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self.max_bytes = max_bytes
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = None
+        self._pid = None
+        self._failures = 0
+        self._lock = threading.Lock()
+        self.reset_metrics()
+
+    def reset_metrics(self):
+        with self._lock:
+            self.counts = {'hash': 0, 'verify': 0, 'rehash': 0, 'busy': 0, 'too_long': 0, 'pool_restart': 0}
+            self.latencies = deque(maxlen=1000)
+            self.waits = deque(maxlen=1000)
+
+    def count(self, kind):
+        with self._lock:
+            self.counts[kind] += 1
+
+    def _executor(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    # forkserver: worker tidak di-fork dari proses multi-thread (aman dari lock yatim)
+                    if 'forkserver' in multiprocessing.get_all_start_methods():
+                        context = multiprocessing.get_context('forkserver')
+                        context.set_forkserver_preload([__name__])
+                    else:
+                        context = multiprocessing.get_context('spawn')
+                    self._pool = ProcessPoolExecutor(self.workers, mp_context=context)
+                    self._pid = os.getpid()
+        return self._pool
+
+    def _run(self, kind, fn, *args):
+        started = time.perf_counter()
+        if not self.workers:
+            result = fn(*args)
+        else:
+            if not self._slots.acquire(timeout=self.queue_timeout):
+                self.count('busy')
+                raise PasswordHasherBusy()
+            try:
+                with self._lock:
+                    self.waits.append(time.perf_counter() - started)
+                try:
+                    result = self._executor().submit(fn, *args).result()
+                    self._failures = 0
+                except BrokenProcessPool:
+                    # Proses pool mati (OOM kill dsb): buat ulang lain kali, request ini dihitung langsung
+                    self._broken()
+                    result = fn(*args)
+            finally:
+                self._slots.release()
+        with self._lock:
+            self.counts[kind] += 1
+            self.latencies.append(time.perf_counter() - started)
+        return result
+
+    def _broken(self):
+        with self._lock:
+            self._pid = None
+            self._failures += 1
+            self.counts['pool_restart'] += 1
+            if self._failures >= MAX_POOL_FAILURES and self.workers:
+                print(f"Password hash pool gagal {self._failures}x berturut-turut, hash dijalankan di thread request")
+                self.workers = 0
+
+    def too_long(self, password):
+        return len((password or '').encode('utf-8')) > self.max_bytes
+
+    def hash(self, password):
+        if self.too_long(password):
+            self.count('too_long')
+            raise PasswordTooLong(f'Password maksimal {self.max_bytes} byte')
+        return self._run('hash', _hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        if not password_hash or not password:
+            return False
+        if self.too_long(password):
+            self.count('too_long')
+            return False
+        return self._run('verify', _verify, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True jika hash werkzeug tersimpan dibuat dengan metode/parameter lain"""
+        password_hash = password_hash or ''
+        return password_hash.count('$') == 2 and password_hash.split('$', 1)[0] != self.method
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            waits = sorted(self.waits)
+            stats = {
+                'method': self.method,
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'counts': dict(self.counts),
+            }
+        for name, values in (('latency', latencies), ('wait', waits)):
+            for pct in (50, 95, 99):
+                value = values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0
+                stats[f'{name}_p{pct}_ms'] = round(value * 1000, 1)
+        return stats
+
+
+_inline = PasswordHasher()
+
+
+def get_hasher():
+    """Hasher aplikasi; di luar app context (script) hash dihitung langsung dengan metode default"""
+    if has_app_context() and 'passwords' in current_app.extensions:
+        return current_app.extensions['passwords']
+    return _inline
+
+
+def hash_password(password):
+    return get_hasher().hash(password)
+
+
+def verify_password(password_hash, password):
+    return get_hasher().verify(password_hash, password)
+
+
+def password_needs_rehash(password_hash):
+    return get_hasher().needs_rehash(password_hash)
+
+
+def password_too_long(password):
+    return get_hasher().too_long(password)
+
+
+def init_passwords(app):
+    app.config.setdefault('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+    app.config.setdefault('PASSWORD_HASH_WORKERS', 0)
+    app.config.setdefault('PASSWORD_HASH_MAX_PENDING', 32)
+    app.config.setdefault('PASSWORD_HASH_QUEUE_TIMEOUT', 2.0)
+    app.config.setdefault('PASSWORD_MAX_BYTES', DEFAULT_MAX_BYTES)
+    app.extensions['passwords'] = PasswordHasher(
+        app.config['PASSWORD_HASH_METHOD'], app.config['PASSWORD_HASH_WORKERS'],
+        app.config['PASSWORD_HASH_MAX_PENDING'], app.config['PASSWORD_HASH_QUEUE_TIMEOUT'],
+        app.config['PASSWORD_MAX_BYTES'])
+
+    @app.errorhandler(PasswordHasherBusy)
+    def password_hasher_busy(e):
+        return 'Server sedang sibuk, silakan coba lagi sebentar lagi', 503, {'Retry-After': '1'}
+
+
+def password_stats():
+    return current_app.extensions['passwords'].stats()
@@ -0,0 +1,52 @@
+"""Statistik inventori produk untuk halaman admin produk.
+
+Semua bucket (total, aktif, stok menipis, habis, nilai stok) dihitung dalam satu scan
+`SUM(CASE ...)` atas product_db. Nilai stok per kategori satu query GROUP BY, dan daftar stok
+menipis dibaca dari partial index ix_product_db_low_stock (`product_stock < 10`, migrasi 0013)
+sehingga tidak perlu scan seluruh katalog. Ringkasan JSON: /admin/products/stats.
+"""
+from sqlalchemy import case, func
+
+from models import Product, db
+
+LOW_STOCK = 10  # sama dengan predikat partial index ix_product_db_low_stock
+
+
+def _count_if(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def stock_value():
+    return func.coalesce(func.sum(Product.product_price * Product.product_stock), 0)
+
+
+def inventory_stats():
+    """{'total', 'active', 'low', 'out', 'stock_value'} dari satu query"""
+    row = db.session.query(
+        func.count(Product.id),
+        _count_if(Product.product_status == True),  # noqa: E712
+        _count_if((Product.product_stock < LOW_STOCK) & (Product.product_stock > 0)),
+        _count_if(Product.product_stock <= 0),
+        stock_value(),
+    ).one()
+    return dict(zip(('total', 'active', 'low', 'out', 'stock_value'), (int(value or 0) for value in row)))
+
+
+def category_stats():
+    """Jumlah produk, total stok dan nilai stok per kategori, nilai terbesar dulu"""
+    category = func.coalesce(Product.product_category, 'Tanpa Kategori')
+    rows = db.session.query(
+        category, func.count(Product.id), func.coalesce(func.sum(Product.product_stock), 0), stock_value(),
+    ).group_by(category).order_by(stock_value().desc()).all()
+    return [{'category': name, 'products': int(count), 'stock': int(stock or 0), 'stock_value': int(value or 0)}
+            for name, count, stock, value in rows]
+
+
+def low_stock_products(limit=20):
+    """Produk dengan stok < LOW_STOCK (termasuk habis), stok terkecil dulu"""
+    rows = db.session.query(
+        Product.id, Product.product_name, Product.product_category, Product.product_stock,
+    ).filter(Product.product_stock < LOW_STOCK).order_by(Product.product_stock, Product.id).limit(limit).all()
+    return [{'product_id': p.id, 'product_name': p.product_name,
+             'product_category': p.product_category or 'Tanpa Kategori', 'product_stock': p.product_stock}
+            for p in rows]
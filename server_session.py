@@ -0,0 +1,298 @@
+"""Session Flask disimpan di server; cookie hanya berisi id acak.
+
+Backend (SESSION_BACKEND):
+- `database` (default): tabel session_db, dibagi semua worker tanpa layanan tambahan
+- `redis`: SESSION_REDIS_URL, butuh paket `redis`; kadaluarsa diurus Redis
+- `memory`: dict per proses, untuk test / satu proses saja
+- `cookie`: session cookie bawaan Flask (fitur ini dimatikan)
+
+Data session baru dibaca dari store saat pertama kali disentuh (request aset / tanpa session
+tidak ke store sama sekali) dan hanya ditulis ulang jika berubah atau sisa umurnya tinggal
+kurang dari setengah TTL. Serialisasi memakai tagged JSON Flask yang ringkas, dikompres zlib
+jika besar. Id session diganti saat user login/logout (_user_id berubah) untuk mencegah
+session fixation. Entri kadaluarsa di database/memory dihapus dengan `flask session-purge`.
+"""
+import secrets
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from flask import current_app, has_app_context, has_request_context, request
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models import SessionRecord, db
+
+COMPRESS_THRESHOLD = 512
+
+
+class ServerSession(SessionMixin):
+    """Session yang isinya dimuat lazily dari store lewat loader(sid)"""
+
+    def __init__(self, sid, loader):
+        self.sid = sid
+        self._loader = loader
+        self._data = None
+        self.expires_at = None
+        self.initial_user_id = None
+        self.modified = False
+        self.accessed = False
+
+    @property
+    def loaded(self):
+        return self._data is not None
+
+    @property
+    def data(self):
+        if self._data is None:
+            record = self._loader(self.sid) if self.sid else None
+            if record is None:
+                # Id tidak dikenal (kadaluarsa / buatan klien): id baru dibuat saat disimpan
+                self.sid = None
+                self._data = {}
+            else:
+                self._data, self.expires_at = record
+            self.initial_user_id = self._data.get('_user_id')
+        self.accessed = True
+        return self._data
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __setitem__(self, key, value):
+        self.data[key] = value
+        self.modified = True
+
+    def __delitem__(self, key):
+        del self.data[key]
+        self.modified = True
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def clear(self):
+        self.data.clear()
+        self.modified = True
+
+
+class MemoryStore:
+    def __init__(self, sweep_every=1000):
+        self._data = {}
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.sweep_every = sweep_every
+
+    def get(self, sid):
+        with self._lock:
+            item = self._data.get(sid)
+        if item is None or item[1] < time.time():
+            return None
+        return item
+
+    def set(self, sid, value, ttl):
+        with self._lock:
+            self._data[sid] = (value, time.time() + ttl)
+            self._writes += 1
+            sweep = self._writes % self.sweep_every == 0
+        if sweep:
+            self.purge()
+
+    def delete(self, sid):
+        with self._lock:
+            self._data.pop(sid, None)
+
+    def purge(self):
+        now = time.time()
+        with self._lock:
+            expired = [sid for sid, (_, expires) in self._data.items() if expires < now]
+            for sid in expired:
+                del self._data[sid]
+        return len(expired)
+
+
+class RedisStore:
+    def __init__(self, url, prefix='session:'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, sid):
+        pipe = self.client.pipeline()
+        pipe.get(self.prefix + sid)
+        pipe.ttl(self.prefix + sid)
+        value, ttl = pipe.execute()
+        if value is None:
+            return None
+        return value, time.time() + max(ttl, 0)
+
+    def set(self, sid, value, ttl):
+        self.client.set(self.prefix + sid, value, ex=int(ttl))
+
+    def delete(self, sid):
+        self.client.delete(self.prefix + sid)
+
+    def purge(self):
+        # Redis menghapus key kadaluarsa sendiri
+        return 0
+
+
+class DatabaseStore:
+    """Satu baris per session di session_db, lewat koneksi sendiri (terpisah dari db.session view)"""
+
+    table = SessionRecord.__table__
+
+    def get(self, sid):
+        with db.engine.connect() as conn:
+            row = conn.execute(select(self.table.c.data, self.table.c.expires_at).where(
+                self.table.c.sid == sid)).first()
+        if row is None or row.expires_at < datetime.now():
+            return None
+        return row.data, row.expires_at.timestamp()
+
+    def set(self, sid, value, ttl):
+        expires_at = datetime.now() + timedelta(seconds=ttl)
+        with db.engine.begin() as conn:
+            updated = conn.execute(update(self.table).where(self.table.c.sid == sid).values(
+                data=value, expires_at=expires_at)).rowcount
+            if updated:
+                return
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(insert(self.table).values(sid=sid, data=value, expires_at=expires_at))
+        except IntegrityError:
+            # Request paralel dengan session yang sama baru saja meng-insert
+            with db.engine.begin() as conn:
+                conn.execute(update(self.table).where(self.table.c.sid == sid).values(
+                    data=value, expires_at=expires_at))
+
+    def delete(self, sid):
+        with db.engine.begin() as conn:
+            conn.execute(delete(self.table).where(self.table.c.sid == sid))
+
+    def purge(self):
+        with db.engine.begin() as conn:
+            return conn.execute(delete(self.table).where(self.table.c.expires_at < datetime.now())).rowcount
+
+
+class ServerSessionInterface(SessionInterface):
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, store, skip_endpoints=()):
+        self.store = store
+        # Endpoint tanpa session (file statis): Flask-Login tetap mengecek session di
+        # after_request, jadi store dilewati di sini supaya tidak ada baca per file
+        self.skip_endpoints = frozenset(skip_endpoints)
+
+    def dumps(self, data):
+        raw = self.serializer.dumps(data).encode('utf-8')
+        if len(raw) >= COMPRESS_THRESHOLD:
+            return b'z' + zlib.compress(raw)
+        return b'j' + raw
+
+    def loads(self, value):
+        value = bytes(value)
+        raw = zlib.decompress(value[1:]) if value[:1] == b'z' else value[1:]
+        return self.serializer.loads(raw.decode('utf-8'))
+
+    def _load(self, app, sid):
+        if has_request_context() and request.endpoint in self.skip_endpoints:
+            return None
+        if not has_app_context():
+            # Dimuat di luar request (mis. test_client.session_transaction)
+            with app.app_context():
+                return self._load(app, sid)
+        try:
+            record = self.store.get(sid)
+            if record is None:
+                return None
+            value, expires_at = record
+            return self.loads(value), expires_at
+        except Exception as e:
+            print(f"Session store error: {e}")
+            return None
+
+    def ttl(self, app, session):
+        if session.permanent:
+            return int(app.permanent_session_lifetime.total_seconds())
+        return app.config['SESSION_STORE_TTL']
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid and (len(sid) > 64 or not sid.replace('-', '').replace('_', '').isalnum()):
+            sid = None
+        return ServerSession(sid, lambda sid: self._load(app, sid))
+
+    def save_session(self, app, session, response):
+        if session.accessed:
+            response.vary.add('Cookie')
+        if not session.loaded:
+            # Session tidak disentuh request ini: tidak ada baca/tulis ke store
+            return
+
+        name = self.get_cookie_name(app)
+        cookie_options = dict(domain=self.get_cookie_domain(app), path=self.get_cookie_path(app),
+                              secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app),
+                              httponly=self.get_cookie_httponly(app))
+
+        if not session:
+            if session.modified and session.sid:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, **cookie_options)
+            return
+
+        # Id baru untuk session baru dan setiap kali user login/logout berganti (anti fixation)
+        rotate = session.sid is None or session.get('_user_id') != session.initial_user_id
+        if rotate:
+            if session.sid:
+                self.store.delete(session.sid)
+            session.sid = secrets.token_urlsafe(32)
+
+        ttl = self.ttl(app, session)
+        stale = session.expires_at is None or session.expires_at - time.time() < ttl / 2
+        if rotate or session.modified or stale:
+            self.store.set(session.sid, self.dumps(dict(session)), ttl)
+
+        if rotate or self.should_set_cookie(app, session):
+            response.set_cookie(name, session.sid, expires=self.get_expiration_time(app, session), **cookie_options)
+
+
+def init_server_session(app):
+    app.config.setdefault('SESSION_BACKEND', 'database')
+    app.config.setdefault('SESSION_REDIS_URL', None)
+    app.config.setdefault('SESSION_STORE_TTL', 24 * 60 * 60)
+    app.config.setdefault('SESSION_SKIP_ENDPOINTS', ('static', 'assets'))
+
+    backend = app.config['SESSION_BACKEND']
+    if backend == 'cookie':
+        return
+    if backend == 'redis':
+        try:
+            store = RedisStore(app.config['SESSION_REDIS_URL'])
+        except ImportError:
+            print("SESSION_BACKEND=redis tapi paket redis tidak terpasang, memakai session di database")
+            store = DatabaseStore()
+    elif backend == 'memory':
+        store = MemoryStore()
+    else:
+        store = DatabaseStore()
+    app.session_interface = ServerSessionInterface(store, app.config['SESSION_SKIP_ENDPOINTS'])
+
+
+@click.command('session-purge')
+@with_appcontext
+def session_purge_command():
+    """Hapus session server-side yang sudah kadaluarsa"""
+    interface = current_app.session_interface
+    if not isinstance(interface, ServerSessionInterface):
+        click.echo('SESSION_BACKEND=cookie, tidak ada session di server')
+        return
+    click.echo(f'{interface.store.purge()} session kadaluarsa dihapus')
@@ -0,0 +1,22 @@
+// Ruang tunggu checkout / add-to-cart (admission.py): response 202 {queued, ticket, retry_after}
+// diulang dengan header X-Queue-Ticket sampai giliran tiba. onQueued(data) dipanggil setiap
+// polling supaya halaman bisa menampilkan posisi antrian.
+window.admissionFetch = function (url, options, onQueued) {
+  const send = (ticket) => {
+    const headers = Object.assign({}, options.headers || {});
+    if (ticket) headers['X-Queue-Ticket'] = ticket;
+    return fetch(url, Object.assign({}, options, { headers: headers })).then((response) => {
+      if (response.status !== 202) return response;
+      return response.json().then((data) => {
+        if (onQueued) onQueued(data);
+        return new Promise((resolve) => setTimeout(resolve, (data.retry_after || 1) * 1000))
+          .then(() => send(data.ticket));
+      });
+    });
+  };
+  return send(null);
+};
+
+window.admissionQueueLabel = function (data) {
+  return '<i class="fas fa-hourglass-half mr-2"></i>Antrian #' + data.position;
+};
@@ -0,0 +1,209 @@
+"""Stok produk: reservasi atomik saat checkout, opsional dipecah ke beberapa baris (shard).
+
+Mode satu baris (default): `UPDATE product_db SET product_stock = product_stock - q WHERE id = ?
+AND product_stock >= q`. Tanpa read-modify-write di Python, jadi checkout paralel tidak bisa
+oversell, tetapi semua checkout produk yang sama antre pada lock baris itu sampai commit.
+
+Mode shard untuk produk flash sale (`flask stock-shards <product_id> <n>`): stok dibagi ke n baris
+product_stock_shard_db dan reservasi memilih acak shard yang stoknya cukup, jadi checkout paralel
+mengunci baris yang berbeda. product_db.product_stock produk ini menjadi ringkasan (jumlah
+shard) yang diperbarui rebalancer di background setiap STOCK_REBALANCE_INTERVAL detik; angka di
+katalog bisa tertinggal beberapa detik, keputusan stok saat checkout selalu dari shard.
+Rebalancer juga meratakan isi shard supaya reservasi jarang jatuh ke jalur lambat (stok
+diambil dari beberapa shard sekaligus, semua shard produk di-lock).
+"""
+import os
+import random
+import threading
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import delete, func, insert, select, update
+
+from fragment_cache import bump_cache_version
+from models import Product, ProductStockShard, db
+
+table = ProductStockShard.__table__
+
+
+def split(total, shards):
+    """Bagi total serata mungkin ke sejumlah shard"""
+    return [total // shards + (1 if i < total % shards else 0) for i in range(shards)]
+
+
+def _where(product_id, shard=None):
+    condition = table.c.product_id == product_id
+    if shard is not None:
+        condition = condition & (table.c.shard == shard)
+    return condition
+
+
+def current_stock(product):
+    """Stok sebenarnya (jumlah shard untuk produk mode shard)"""
+    if not product.stock_shards:
+        return db.session.query(Product.product_stock).filter_by(id=product.id).scalar() or 0
+    return db.session.execute(select(func.coalesce(func.sum(table.c.stock), 0)).where(_where(product.id))).scalar()
+
+
+def reserve(product, qty):
+    """Kurangi stok di transaksi db.session yang berjalan; False jika stok tidak cukup"""
+    if not product.stock_shards:
+        updated = db.session.query(Product).filter(Product.id == product.id, Product.product_stock >= qty).update(
+            {Product.product_stock: Product.product_stock - qty}, synchronize_session=False)
+        db.session.expire(product, ['product_stock'])
+        return bool(updated)
+
+    current_app.extensions['stock_rebalancer'].start()
+    candidates = [shard for (shard,) in db.session.execute(
+        select(table.c.shard).where(_where(product.id), table.c.stock >= qty))]
+    random.shuffle(candidates)
+    for shard in candidates:
+        # Bisa gagal jika shard ini baru saja dikuras request lain: coba shard berikutnya
+        if db.session.execute(update(table).where(_where(product.id, shard), table.c.stock >= qty).values(
+                stock=table.c.stock - qty)).rowcount:
+            return True
+    return _reserve_spread(product.id, qty)
+
+
+def _reserve_spread(product_id, qty):
+    """Jalur lambat: tidak ada satu shard yang cukup, ambil dari beberapa shard"""
+    rows = db.session.execute(select(table.c.shard, table.c.stock).where(_where(product_id)).order_by(
+        table.c.shard).with_for_update()).all()
+    if sum(stock for _, stock in rows) < qty:
+        return False
+    remaining = qty
+    for shard, stock in rows:
+        take = min(stock, remaining)
+        if take > 0:
+            db.session.execute(update(table).where(_where(product_id, shard)).values(stock=table.c.stock - take))
+            remaining -= take
+        if not remaining:
+            break
+    return True
+
+
+def release(product, qty):
+    """Kembalikan stok (order dibatalkan) di transaksi db.session yang berjalan"""
+    if not product.stock_shards:
+        db.session.query(Product).filter_by(id=product.id).update(
+            {Product.product_stock: Product.product_stock + qty}, synchronize_session=False)
+        db.session.expire(product, ['product_stock'])
+        return
+    shard = random.randrange(product.stock_shards)
+    db.session.execute(update(table).where(_where(product.id, shard)).values(stock=table.c.stock + qty))
+
+
+def set_stock(product, total):
+    """Stok baru dari admin; untuk produk mode shard dibagi rata ke semua shard"""
+    if product.stock_shards:
+        db.session.execute(select(table.c.shard).where(_where(product.id)).with_for_update()).all()
+        for shard, stock in enumerate(split(total, product.stock_shards)):
+            db.session.execute(update(table).where(_where(product.id, shard)).values(stock=stock))
+    product.product_stock = total
+
+
+def configure_shards(product, shards):
+    """Aktifkan mode shard (shards > 0) atau kembali ke satu baris (0); commit oleh pemanggil"""
+    if product.stock_shards:
+        db.session.execute(select(table.c.shard).where(_where(product.id)).with_for_update()).all()
+    total = current_stock(product)
+    db.session.execute(delete(table).where(_where(product.id)))
+    if shards > 0:
+        db.session.execute(insert(table), [{'product_id': product.id, 'shard': shard, 'stock': stock}
+                                           for shard, stock in enumerate(split(total, shards))])
+    product.stock_shards = shards or None
+    product.product_stock = total
+    bump_cache_version('catalog')
+    return total
+
+
+def rebalance(product_id):
+    """Ratakan shard yang timpang dan perbarui ringkasan product_stock; commit di sini"""
+    rows = db.session.execute(select(table.c.shard, table.c.stock).where(_where(product_id)).order_by(
+        table.c.shard).with_for_update()).all()
+    if not rows:
+        db.session.rollback()
+        return False
+    stocks = [stock for _, stock in rows]
+    total = sum(stocks)
+    target = split(total, len(rows))
+    # Ditulis ulang hanya jika ada shard yang tinggal kurang dari separuh bagiannya
+    if any(stock < share // 2 for stock, share in zip(stocks, target)):
+        for (shard, stock), share in zip(rows, target):
+            if stock != share:
+                db.session.execute(update(table).where(_where(product_id, shard)).values(stock=share))
+    changed = db.session.query(Product).filter(Product.id == product_id, Product.product_stock != total).update(
+        {Product.product_stock: total}, synchronize_session=False)
+    if changed:
+        bump_cache_version('catalog')
+    db.session.commit()
+    return bool(changed)
+
+
+def rebalance_all():
+    product_ids = [product_id for (product_id,) in db.session.query(Product.id).filter(Product.stock_shards > 0)]
+    for product_id in product_ids:
+        rebalance(product_id)
+    return len(product_ids)
+
+
+class StockRebalancer:
+    """Thread background per proses, dimulai saat reservasi shard pertama (setelah fork gunicorn)"""
+
+    def __init__(self, app, interval):
+        self.app = app
+        self.interval = interval
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self.interval <= 0 or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name='stock-rebalancer', daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self.app.app_context():
+                try:
+                    rebalance_all()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Stock rebalancer error: {e}")
+                finally:
+                    db.session.remove()
+
+
+def init_stock(app):
+    app.config.setdefault('STOCK_REBALANCE_INTERVAL', 2.0)
+    app.extensions['stock_rebalancer'] = StockRebalancer(app, app.config['STOCK_REBALANCE_INTERVAL'])
+
+
+@click.command('stock-shards')
+@click.argument('product_id', type=int)
+@click.argument('shards', type=int)
+@with_appcontext
+def stock_shards_command(product_id, shards):
+    """Pecah stok produk ke SHARDS baris (0 = kembali ke satu baris)"""
+    product = db.session.query(Product).filter_by(id=product_id).first()
+    if product is None:
+        raise click.ClickException(f'Produk {product_id} tidak ditemukan')
+    total = configure_shards(product, max(shards, 0))
+    db.session.commit()
+    if shards > 0:
+        click.echo(f'Produk {product_id}: stok {total} dibagi ke {shards} shard')
+    else:
+        click.echo(f'Produk {product_id}: stok {total} kembali ke satu baris')
+
+
+@click.command('stock-rebalance')
+@with_appcontext
+def stock_rebalance_command():
+    """Ratakan shard stok dan perbarui product_stock semua produk mode shard"""
+    click.echo(f'{rebalance_all()} produk mode shard diperiksa')
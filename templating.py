@@ -0,0 +1,140 @@
+"""Bytecode cache Jinja bersama dan profiler waktu render template.
+
+- Bytecode hasil kompilasi template disimpan di JINJA_BYTECODE_CACHE_DIR (default
+  instance/jinja_cache) sehingga semua worker gunicorn, termasuk worker baru setelah
+  restart/max_requests, memakai hasil kompilasi yang sama. `flask compile-templates`
+  mengisi cache ini sebelum deploy.
+- Jika TEMPLATE_PROFILING aktif, waktu render dicatat per template dan per block
+  (inklusif, termasuk block di dalamnya). Ringkasan ada di /admin/template-profile dan
+  setiap response mendapat header Server-Timing.
+"""
+import os
+import threading
+import time
+from collections import defaultdict
+
+import click
+from flask import current_app, g, template_rendered, before_render_template
+from flask.cli import with_appcontext
+from jinja2 import FileSystemBytecodeCache, Template
+
+
+class RenderProfile:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._templates = defaultdict(lambda: [0, 0.0, 0.0])
+        self._blocks = defaultdict(lambda: [0, 0.0, 0.0])
+
+    def _add(self, table, key, elapsed):
+        with self._lock:
+            row = table[key]
+            row[0] += 1
+            row[1] += elapsed
+            row[2] = max(row[2], elapsed)
+
+    def add_template(self, name, elapsed):
+        self._add(self._templates, name, elapsed)
+
+    def add_block(self, template_name, block_name, elapsed):
+        self._add(self._blocks, (template_name, block_name), elapsed)
+
+    def reset(self):
+        with self._lock:
+            self._templates.clear()
+            self._blocks.clear()
+
+    @staticmethod
+    def _row(count, total, worst):
+        return {
+            'count': count,
+            'total_ms': round(total * 1000, 3),
+            'avg_ms': round(total * 1000 / count, 3) if count else 0.0,
+            'max_ms': round(worst * 1000, 3),
+        }
+
+    def report(self):
+        with self._lock:
+            templates = {name: self._row(*row) for name, row in self._templates.items()}
+            blocks = {f'{t}#{b}': self._row(*row) for (t, b), row in self._blocks.items()}
+        by_total = lambda item: -item[1]['total_ms']
+        return {
+            'templates': dict(sorted(templates.items(), key=by_total)),
+            'blocks': dict(sorted(blocks.items(), key=by_total)),
+        }
+
+
+profile = RenderProfile()
+
+
+def _timed_block(template_name, block_name, render_block):
+    def wrapper(context):
+        start = time.perf_counter()
+        try:
+            yield from render_block(context)
+        finally:
+            profile.add_block(template_name, block_name, time.perf_counter() - start)
+    return wrapper
+
+
+class ProfiledTemplate(Template):
+    """Template yang setiap fungsi block-nya dibungkus pencatat waktu"""
+
+    @classmethod
+    def _from_namespace(cls, environment, namespace, globals):
+        template = super()._from_namespace(environment, namespace, globals)
+        template.blocks = {
+            name: _timed_block(template.name, name, render_block)
+            for name, render_block in template.blocks.items()
+        }
+        return template
+
+
+def _before_render(sender, template, context, **extra):
+    stack = g.setdefault('_template_timer_stack', [])
+    stack.append(time.perf_counter())
+
+
+def _after_render(sender, template, context, **extra):
+    stack = g.get('_template_timer_stack')
+    if not stack:
+        return
+    elapsed = time.perf_counter() - stack.pop()
+    profile.add_template(template.name, elapsed)
+    # Hanya template terluar yang dihitung ke Server-Timing
+    if not stack:
+        g._template_render_total = g.get('_template_render_total', 0.0) + elapsed
+
+
+def _server_timing(response):
+    total = g.get('_template_render_total')
+    if total is not None:
+        response.headers.add('Server-Timing', f'tpl;desc="template render";dur={total * 1000:.2f}')
+    return response
+
+
+def init_templating(app):
+    app.config.setdefault('JINJA_BYTECODE_CACHE_DIR', os.path.join(app.instance_path, 'jinja_cache'))
+    app.config.setdefault('TEMPLATE_PROFILING', False)
+
+    cache_dir = app.config['JINJA_BYTECODE_CACHE_DIR']
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        # jinja_options harus di-set sebelum app.jinja_env dibuat pertama kali
+        app.jinja_options = dict(app.jinja_options, bytecode_cache=FileSystemBytecodeCache(cache_dir))
+
+    if app.config['TEMPLATE_PROFILING']:
+        app.jinja_env.template_class = ProfiledTemplate
+        before_render_template.connect(_before_render, app)
+        template_rendered.connect(_after_render, app)
+        app.after_request(_server_timing)
+
+
+@click.command('compile-templates')
+@with_appcontext
+def compile_templates_command():
+    """Kompilasi semua template ke bytecode cache (jalankan saat deploy)"""
+    env = current_app.jinja_env
+    names = env.list_templates(extensions=['html'])
+    for name in names:
+        env.get_template(name)
+    click.echo(f'{len(names)} template dikompilasi ke {current_app.config["JINJA_BYTECODE_CACHE_DIR"]}')
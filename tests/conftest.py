@@ -0,0 +1,57 @@
+"""Fixture bersama: app factory dengan SQLite sementara, hash password langsung di thread test."""
+import pytest
+
+from app import create_app
+from models import Product, RoleEnum, User, db
+
+PASSWORD = 'rahasia123'
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "test.db"}',
+        'PASSWORD_HASH_WORKERS': 0,
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+        'ADMISSION_ENABLED': False,
+        'STOCK_REBALANCE_INTERVAL': 0,
+        'JINJA_BYTECODE_CACHE_DIR': str(tmp_path / 'jinja'),
+        'OIDC_METADATA_CACHE': str(tmp_path / 'oidc.json'),
+    })
+    result = app.test_cli_runner().invoke(args=['init-db'])
+    assert result.exit_code == 0, result.output
+    with app.app_context():
+        for email, role in (('admin@example.com', RoleEnum.ADMIN), ('user@example.com', RoleEnum.USER),
+                            ('user2@example.com', RoleEnum.USER)):
+            user = User(first_name=email.split('@')[0], email=email, role=role)
+            user.set_password(PASSWORD)
+            db.session.add(user)
+        for index in range(1, 4):
+            db.session.add(Product(product_name=f'Produk {index}', product_category='Kategori',
+                                   product_price=10000 * index, product_stock=10, product_status=True))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+def login(client, email='user@example.com'):
+    response = client.post('/login', data={'email': email, 'password': PASSWORD})
+    assert response.status_code == 302
+    return client
+
+
+@pytest.fixture
+def client(app):
+    return login(app.test_client())
+
+
+@pytest.fixture
+def admin_client(app):
+    return login(app.test_client(), 'admin@example.com')
+
+
+def user_id(email):
+    return db.session.query(User.id).filter_by(email=email).scalar()
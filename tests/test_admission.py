@@ -0,0 +1,89 @@
+import time
+
+import pytest
+
+from admission import Gate, TokenBucket
+
+
+def gate(**options):
+    return Gate('checkout', dict({'max_active': 1, 'rate': 0, 'user_rate': 0.001, 'user_burst': 2}, **options))
+
+
+def test_token_bucket_refills():
+    bucket = TokenBucket(rate=10, burst=1)
+    now = time.monotonic()
+    assert bucket.take(now)
+    assert not bucket.take(now)
+    assert bucket.take(now + 0.2)
+
+
+def test_new_requests_limited_per_user():
+    g = gate(max_active=10)
+    assert g.admit(1)[0] == 'admitted'
+    assert g.admit(1)[0] == 'admitted'
+    assert g.admit(1)[0] == 'user_limit'
+    assert g.admit(2)[0] == 'admitted'
+
+
+def test_queued_ticket_admitted_in_order_and_polls_are_free():
+    g = gate(user_burst=2)
+    assert g.admit(1)[0] == 'admitted'
+    outcome, (ticket, position) = g.admit(2)
+    assert (outcome, position) == ('queued', 1)
+    # Polling tiket yang menunggu di proses ini tidak memakai token user
+    for _ in range(5):
+        assert g.admit(2, ticket)[0] == 'queued'
+    g.release()
+    assert g.admit(2, ticket)[0] == 'admitted'
+    assert g.stats()['queue_depth'] == 0
+
+
+def test_consumed_ticket_cannot_be_replayed():
+    g = gate(user_burst=2)
+    assert g.admit(1)[0] == 'admitted'
+    outcome, (ticket, _) = g.admit(1)
+    assert outcome == 'queued'
+    g.release()
+    assert g.admit(1, ticket)[0] == 'admitted'
+    g.release()
+    # Dua token user sudah terpakai: tiket yang diputar ulang dihitung sebagai request baru
+    assert g.admit(1, ticket)[0] == 'user_limit'
+    assert g.stats()['rejected']['replayed'] == 1
+
+
+def test_ticket_from_other_worker_counts_against_user_limit():
+    g = gate(max_active=10, user_burst=1)
+    assert g.admit(1, (time.time(), 'dari-worker-lain'))[0] == 'admitted'
+    assert g.admit(1, (time.time(), 'dari-worker-lain-2'))[0] == 'user_limit'
+
+
+@pytest.fixture
+def gated(app):
+    app.extensions['admission'].gates['checkout'].configure(
+        {'max_active': 1, 'rate': 0, 'user_rate': 0.001, 'user_burst': 1, 'ticket_ttl': 10.0})
+    return app.extensions['admission'].gates['checkout']
+
+
+def test_ticket_over_http_is_single_use(app, client, gated):
+    gated.active = 1
+    queued = client.post('/api/order/process', json={'payment': 'COD', 'productId': 1})
+    assert queued.status_code == 202
+    ticket = queued.json['ticket']
+    gated.active = 0
+
+    headers = {'X-Queue-Ticket': ticket}
+    assert client.post('/api/order/process', json={'payment': 'COD', 'productId': 1}, headers=headers).status_code == 201
+    replay = client.post('/api/order/process', json={'payment': 'COD', 'productId': 1}, headers=headers)
+    assert replay.status_code == 429
+
+
+def test_expired_ticket_signature_rejected(app, client, gated):
+    gated.active = 1
+    ticket = client.post('/api/order/process', json={'payment': 'COD', 'productId': 1}).json['ticket']
+    gated.active = 0
+    gated.options['ticket_ttl'] = 0
+    time.sleep(1.1)
+    # Tanda tangan kadaluarsa: diperlakukan sebagai request baru, bucket user (burst 1) sudah habis
+    response = client.post('/api/order/process', json={'payment': 'COD', 'productId': 1},
+                           headers={'X-Queue-Ticket': ticket})
+    assert response.status_code == 429
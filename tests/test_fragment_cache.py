@@ -0,0 +1,32 @@
+from fragment_cache import bump_cache_version, bump_cache_version_now, ensure_cache_version, get_cache_version
+from models import CacheVersion, db
+
+
+def test_init_db_seeds_catalog_version(app):
+    with app.app_context():
+        assert db.session.get(CacheVersion, 'catalog').version == 0
+
+
+def test_first_bump_inserts_row(app):
+    with app.app_context():
+        assert get_cache_version('baru') == 0
+        bump_cache_version_now('baru')
+        bump_cache_version_now('baru')
+        assert get_cache_version('baru') == 2
+
+
+def test_ensure_is_idempotent(app):
+    with app.app_context():
+        # Worker lain sudah membuat baris: INSERT kedua tidak melempar IntegrityError
+        ensure_cache_version('baru')
+        ensure_cache_version('baru')
+        bump_cache_version('baru')
+        db.session.commit()
+        assert get_cache_version('baru') == 1
+
+
+def test_checkout_bumps_catalog(app, client):
+    response = client.post('/api/order/process', json={'payment': 'COD', 'productId': 1, 'quantity': 1})
+    assert response.status_code == 201
+    with app.app_context():
+        assert get_cache_version('catalog') == 1
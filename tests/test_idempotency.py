@@ -0,0 +1,82 @@
+from flask import session
+from flask_login import login_user
+
+from app import checkout_cart_context
+from idempotency import _claim, _fingerprint, _same_request
+from models import Cart, Order, Product, User, db
+from tests.conftest import user_id
+
+COD = {'payment': 'COD', 'productId': 1, 'quantity': 2}
+
+
+def checkout(client, key, body=None):
+    return client.post('/api/order/process', json=body or {'payment': 'COD'}, headers={'Idempotency-Key': key})
+
+
+def cart_checkout(app, client, *product_ids):
+    for product_id in product_ids:
+        assert client.post(f'/add-to-cart/{product_id}').status_code == 200
+    with app.app_context():
+        cart_ids = [cart_id for (cart_id,) in db.session.query(Cart.id).filter(Cart.product_id.in_(product_ids))]
+    assert client.post('/api/cart/checkout', json={'cart_ids': cart_ids}).status_code == 200
+
+
+def test_retry_replays_stored_response(app, client):
+    first = checkout(client, 'k1', COD)
+    assert first.status_code == 201
+    again = checkout(client, 'k1', COD)
+    assert again.status_code == 201
+    assert again.headers['Idempotent-Replayed'] == 'true'
+    assert again.json == first.json
+    with app.app_context():
+        assert db.session.query(Order).count() == 1
+        assert db.session.get(Product, 1).product_stock == 8
+
+
+def test_same_key_different_body_rejected(client):
+    assert checkout(client, 'k1', COD).status_code == 201
+    assert checkout(client, 'k1', dict(COD, quantity=3)).status_code == 422
+
+
+def test_request_in_progress_gets_409(app, client):
+    app.config['IDEMPOTENCY_WAIT'] = 0.2
+    with app.test_request_context('/api/order/process', method='POST', json=COD):
+        # Request pertama (body sama) sudah mengklaim key dan belum selesai
+        assert _claim(user_id('user@example.com'), 'k1', _fingerprint(None)) is None
+    assert checkout(client, 'k1', COD).status_code == 409
+
+
+def test_cart_checkout_retry_replays_after_cart_consumed(app, client):
+    cart_checkout(app, client, 1, 2)
+    first = checkout(client, 'k1')
+    assert first.status_code == 201
+    # Keranjang dan session sudah dipakai request pertama: retry tetap mendapat replay
+    again = checkout(client, 'k1')
+    assert again.headers.get('Idempotent-Replayed') == 'true'
+    assert again.json['order_id'] == first.json['order_id']
+
+
+def test_cart_key_reused_for_different_cart_rejected(app, client):
+    cart_checkout(app, client, 1)
+    assert checkout(client, 'k1').status_code == 201
+    cart_checkout(app, client, 2)
+    assert checkout(client, 'k1').status_code == 422
+    with app.app_context():
+        assert db.session.query(Order).count() == 1
+
+
+def test_cart_quantity_is_part_of_fingerprint(app, client):
+    cart_checkout(app, client, 1)
+    with app.test_request_context('/api/order/process', method='POST', json={'payment': 'COD'}):
+        item = db.session.query(Cart).one()
+        login_user(db.session.get(User, item.user_id))
+        session['checkout_cart_ids'] = [item.id]
+        before = _fingerprint(checkout_cart_context)
+        item.quantity = 5
+        db.session.commit()
+        after = _fingerprint(checkout_cart_context)
+        assert after != before and after[:32] == before[:32]
+        assert not _same_request(before, after)
+        # Keranjang sudah di-checkout: context kosong, cocok lewat body saja
+        session.pop('checkout_cart_ids')
+        assert _same_request(before, _fingerprint(checkout_cart_context))
@@ -0,0 +1,43 @@
+from sqlalchemy import update
+
+from models import User, db
+from tests.conftest import user_id
+
+
+def set_user(app, email, **values):
+    # Seperti worker lain: langsung ke database, tanpa state di proses ini
+    with app.app_context():
+        db.session.execute(update(User).where(User.email == email).values(**values))
+        db.session.commit()
+
+
+def test_snapshot_used_until_auth_version_changes(app, client):
+    assert client.get('/dashboard').status_code == 200
+    set_user(app, 'user@example.com', is_active=False)
+    # auth_version sama: snapshot masih dipakai selama IDENTITY_TTL
+    assert client.get('/dashboard').status_code == 200
+
+    set_user(app, 'user@example.com', auth_version=User.auth_version + 1)
+    response = client.get('/dashboard')
+    assert response.status_code == 302
+    assert '/login' in response.headers['Location']
+
+
+def test_role_change_from_other_worker_applies_immediately(app, client):
+    assert client.get('/admin/dashboard').status_code != 200
+    set_user(app, 'user@example.com', role='ADMIN', auth_version=User.auth_version + 1)
+    assert client.get('/admin/dashboard').status_code == 200
+
+
+def test_deleted_user_logged_out(app, client):
+    with app.app_context():
+        db.session.delete(db.session.get(User, user_id('user@example.com')))
+        db.session.commit()
+    assert client.get('/dashboard').status_code == 302
+
+
+def test_admin_toggle_logs_user_out(app, client, admin_client):
+    with app.app_context():
+        target = user_id('user@example.com')
+    assert admin_client.post(f'/admin/user/{target}/toggle').json['is_active'] is False
+    assert client.get('/dashboard').status_code == 302
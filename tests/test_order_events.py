@@ -0,0 +1,38 @@
+from order_events import OrderEventBroker
+
+
+def test_broker_replays_missed_events_and_signals_gap():
+    broker = OrderEventBroker(backlog=2)
+    for index in range(3):
+        broker.dispatch('order_created', {'id': index})
+    _, missed = broker.subscribe(last_event_id=2)
+    assert [event['id'] for event in missed] == [3]
+    _, missed = broker.subscribe(last_event_id=0)
+    assert missed is None
+
+
+def test_broker_caps_subscribers():
+    broker = OrderEventBroker(max_subscribers=1)
+    first, _ = broker.subscribe()
+    assert broker.subscribe() == (None, None)
+    broker.unsubscribe(first)
+    assert broker.subscribe()[0] is not None
+    assert broker.stats()['rejected'] == 1
+
+
+def test_stream_over_cap_gets_503(app, admin_client):
+    broker, _ = app.extensions['order_events']
+    broker.max_subscribers = 1
+    stream = admin_client.get('/admin/orders/events')
+    assert stream.status_code == 200
+    assert stream.mimetype == 'text/event-stream'
+
+    refused = admin_client.get('/admin/orders/events')
+    assert refused.status_code == 503
+    assert refused.headers['Retry-After'] == '30'
+
+    stream.close()
+    assert broker.stats()['subscribers'] == 0
+    reopened = admin_client.get('/admin/orders/events')
+    assert reopened.status_code == 200
+    reopened.close()
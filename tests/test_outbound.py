@@ -0,0 +1,104 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from models import Order, Product, db
+from outbound import CircuitBreaker, Dependency, DependencyUnavailable
+
+
+class Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+def dependency():
+    return Dependency('test', connect_timeout=1, read_timeout=1, max_concurrency=2, queue_timeout=0.01,
+                      failure_threshold=2, reset_timeout=60)
+
+
+def test_breaker_opens_after_consecutive_failures():
+    dep = dependency()
+    for _ in range(2):
+        assert dep.call(lambda **kw: Response(502)).status_code == 502
+    assert dep.breaker.state == 'open'
+    with pytest.raises(DependencyUnavailable) as error:
+        dep.call(lambda **kw: Response(200))
+    assert error.value.reason == 'open'
+    assert dep.stats()['rejected']['open'] == 1
+
+
+def test_breaker_half_open_allows_single_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.allow()
+
+
+def test_rate_limit_counts_as_failure():
+    dep = dependency()
+    dep.call(lambda **kw: Response(429))
+    dep.call(lambda **kw: Response(200))
+    assert dep.breaker.failures == 0
+    assert dep.stats()['failures'] == 1
+
+
+def test_busy_slots_rejected():
+    dep = dependency()
+    dep._slots.acquire()
+    dep._slots.acquire()
+    with pytest.raises(DependencyUnavailable) as error:
+        dep.call(lambda **kw: Response(200))
+    assert error.value.reason == 'busy'
+
+
+class SnapStub(BaseHTTPRequestHandler):
+    status = 502
+    body = b'<html><body><h1>502 Bad Gateway</h1></body></html>'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(self.status)
+        self.send_header('Content-Type', 'text/html' if self.status >= 500 else 'application/json')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def snap_stub(app):
+    server = HTTPServer(('127.0.0.1', 0), SnapStub)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    app.config['MIDTRANS_SNAP_BASE_URL'] = f'http://127.0.0.1:{server.server_port}'
+    yield SnapStub
+    server.shutdown()
+    SnapStub.status, SnapStub.body = 502, b'<html><body><h1>502 Bad Gateway</h1></body></html>'
+
+
+def transfer_checkout(client):
+    return client.post('/api/order/process', json={'payment': 'TRANSFER_BANK', 'productId': 1, 'quantity': 2})
+
+
+def test_html_5xx_from_snap_defers_payment(app, client, snap_stub):
+    response = transfer_checkout(client)
+    assert response.status_code == 201
+    assert response.json['payment_deferred'] is True
+    with app.app_context():
+        assert db.session.get(Order, response.json['order_id']).status.value == 'PENDING'
+        assert db.session.get(Product, 1).product_stock == 8
+
+
+def test_snap_client_error_cancels_order(app, client, snap_stub):
+    snap_stub.status = 400
+    snap_stub.body = b'{"error_messages": ["transaction_details.gross_amount is not equal"]}'
+    response = transfer_checkout(client)
+    assert response.status_code == 502
+    with app.app_context():
+        assert db.session.query(Order).one().status.value == 'CANCEL'
+        assert db.session.get(Product, 1).product_stock == 10
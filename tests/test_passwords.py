@@ -0,0 +1,18 @@
+from app import create_app
+from passwords import hash_password, password_needs_rehash, verify_password
+
+
+def test_default_pool_is_one_process_per_worker(monkeypatch):
+    monkeypatch.delenv('PASSWORD_HASH_WORKERS', raising=False)
+    assert create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'}).config['PASSWORD_HASH_WORKERS'] == 1
+
+
+def test_hash_verify_and_rehash(app):
+    with app.app_context():
+        stored = hash_password('rahasia')
+        assert verify_password(stored, 'rahasia')
+        assert not verify_password(stored, 'salah')
+        assert not password_needs_rehash(stored)
+        # Parameter berubah: hash lama diganti saat login berikutnya
+        app.extensions['passwords'].method = 'pbkdf2:sha256:2000'
+        assert password_needs_rehash(stored)
@@ -0,0 +1,84 @@
+import pytest
+
+from models import Product, ProductStockShard, db
+from stock import configure_shards, current_stock, rebalance, release, reserve, set_stock, split
+
+
+def product(product_id=1):
+    return db.session.get(Product, product_id)
+
+
+def shard_stocks(product_id=1):
+    return [stock for (stock,) in db.session.query(ProductStockShard.stock).filter_by(
+        product_id=product_id).order_by(ProductStockShard.shard)]
+
+
+@pytest.mark.parametrize('total, shards, expected', [(10, 4, [3, 3, 2, 2]), (2, 4, [1, 1, 0, 0]), (0, 2, [0, 0])])
+def test_split(total, shards, expected):
+    assert split(total, shards) == expected
+
+
+def test_reserve_single_row_never_oversells(app):
+    with app.app_context():
+        assert reserve(product(), 7)
+        assert not reserve(product(), 4)
+        assert reserve(product(), 3)
+        db.session.commit()
+        assert product().product_stock == 0
+        release(product(), 2)
+        db.session.commit()
+        assert current_stock(product()) == 2
+
+
+def test_configure_shards_keeps_total(app):
+    with app.app_context():
+        assert configure_shards(product(), 4) == 10
+        db.session.commit()
+        assert shard_stocks() == [3, 3, 2, 2]
+        assert configure_shards(product(), 0) == 10
+        db.session.commit()
+        assert shard_stocks() == [] and product().stock_shards is None
+
+
+def test_sharded_reserve_spreads_and_stops_at_zero(app):
+    with app.app_context():
+        configure_shards(product(), 4)
+        db.session.commit()
+        # Tidak ada satu shard yang berisi 5: jalur lambat mengambil dari beberapa shard
+        assert reserve(product(), 5)
+        assert reserve(product(), 5)
+        assert not reserve(product(), 1)
+        db.session.commit()
+        assert shard_stocks() == [0, 0, 0, 0]
+
+
+def test_rebalance_evens_shards_and_updates_summary(app):
+    with app.app_context():
+        configure_shards(product(), 2)
+        db.session.commit()
+        db.session.query(ProductStockShard).filter_by(product_id=1, shard=0).update({'stock': 0})
+        db.session.commit()
+        assert rebalance(1)
+        assert shard_stocks() == [3, 2]
+        assert product().product_stock == 5
+
+
+def test_set_stock_redistributes_shards(app):
+    with app.app_context():
+        configure_shards(product(), 3)
+        set_stock(product(), 7)
+        db.session.commit()
+        assert shard_stocks() == [3, 2, 2]
+        assert current_stock(product()) == 7
+
+
+def test_checkout_of_sharded_product(app, client):
+    with app.app_context():
+        configure_shards(product(), 4)
+        db.session.commit()
+    ok = client.post('/api/order/process', json={'payment': 'COD', 'productId': 1, 'quantity': 6})
+    assert ok.status_code == 201
+    over = client.post('/api/order/process', json={'payment': 'COD', 'productId': 1, 'quantity': 5})
+    assert over.status_code == 400
+    with app.app_context():
+        assert sum(shard_stocks()) == 4
@@ -0,0 +1,44 @@
+import io
+
+import pytest
+
+from uploads import format_size, sniff_image_type
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 64
+
+
+@pytest.mark.parametrize('size, text', [
+    (5 * 1024 * 1024, '5MB'), (1536 * 1024, '1.5MB'), (512 * 1024, '512KB'), (100, '1KB'),
+])
+def test_format_size(size, text):
+    assert format_size(size) == text
+
+
+def test_sniff_uses_content_not_extension():
+    assert sniff_image_type(PNG[:16]) == 'image/png'
+    assert sniff_image_type(b'<?php echo 1; ?>') is None
+
+
+def big_upload(app, client, url, **headers):
+    app.config['UPLOAD_MAX_BYTES'] = 200 * 1024
+    data = {'product_name': 'Produk', 'product_image': (io.BytesIO(PNG + b'\x00' * 300 * 1024), 'besar.png')}
+    return client.post(url, data=data, content_type='multipart/form-data', headers=headers)
+
+
+def test_too_large_from_post_only_form_redirects_to_get_page(app, admin_client):
+    response = big_upload(app, admin_client, '/admin/update-product/1')
+    assert response.status_code == 302
+    assert response.headers['Location'] == '/admin/edit-product?product_id=1'
+    with admin_client.session_transaction() as session:
+        assert ('error', 'Ukuran file terlalu besar. Maksimal 200KB.') in session['_flashes']
+
+
+def test_too_large_prefers_referrer(app, admin_client):
+    response = big_upload(app, admin_client, '/admin/update-product/1', Referer='/admin/products')
+    assert response.headers['Location'] == '/admin/products'
+
+
+def test_too_large_fetch_gets_json_413(app, admin_client):
+    response = big_upload(app, admin_client, '/admin/update-product/1', **{'X-Requested-With': 'XMLHttpRequest'})
+    assert response.status_code == 413
+    assert response.json == {'success': False, 'message': 'Ukuran file terlalu besar. Maksimal 200KB.'}
@@ -0,0 +1,153 @@
+"""Upload gambar (produk, foto profil) yang dibatasi ukurannya dan di-stream ke file sementara.
+
+MAX_CONTENT_LENGTH membuat request dengan Content-Length terlalu besar langsung ditolak 413
+sebelum body dibaca. Form multipart di-parse per chunk oleh werkzeug ke UploadStream: file
+sementara yang tetap di memori sampai UPLOAD_SPOOL_BYTES lalu pindah ke disk, dan menolak (413)
+begitu satu file melewati UPLOAD_MAX_BYTES, tanpa menunggu upload selesai. Tipe gambar
+ditentukan sekali dari magic bytes awal file saat upload dan disimpan di file_type, sehingga
+render tidak perlu mendeteksi ulang. Isi file dibaca satu kali dari spool langsung ke kolom.
+"""
+from tempfile import SpooledTemporaryFile
+
+from flask import Request, current_app, flash, jsonify, redirect, request, url_for
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.utils import secure_filename
+
+IMAGE_TYPES = {'image/jpeg', 'image/png', 'image/gif', 'image/webp'}
+HEAD_BYTES = 16
+
+# Route upload yang hanya POST -> halaman form (GET) untuk kembali setelah 413, dan argumen URL-nya
+FORM_PAGES = {
+    'main.admin_update_product': ('main.admin_edit_product', 'product_id'),
+    'main.admin_update_user': ('main.admin_edit_user', 'user_id'),
+    'main.edit_profile_user': ('main.profile_user', None),
+}
+
+
+class UploadRejected(ValueError):
+    pass
+
+
+def sniff_image_type(head):
+    """MIME type dari file signature (magic number), None jika bukan gambar yang dikenal"""
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if head.startswith(b'GIF87a') or head.startswith(b'GIF89a'):
+        return 'image/gif'
+    if head.startswith(b'RIFF') and head[8:12] == b'WEBP':
+        return 'image/webp'
+    if head.startswith(b'BM'):
+        return 'image/bmp'
+    return None
+
+
+def detect_mime_type(image_bytes):
+    """Deteksi MIME type dari file signature, default image/jpeg"""
+    return sniff_image_type(bytes(image_bytes[:HEAD_BYTES])) or 'image/jpeg'
+
+
+def image_mime_type(file_type, file_data):
+    """file_type tersimpan; deteksi ulang hanya untuk baris lama yang file_type-nya dari client"""
+    return file_type if file_type in IMAGE_TYPES else detect_mime_type(file_data)
+
+
+class UploadStream(SpooledTemporaryFile):
+    """Tujuan tulis parser multipart: hitung ukuran dan simpan byte awal untuk sniffing"""
+
+    def __init__(self, max_bytes, spool_bytes):
+        super().__init__(max_size=spool_bytes, mode='w+b')
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.head = b''
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_bytes and self.size > self.max_bytes:
+            raise RequestEntityTooLarge()
+        if len(self.head) < HEAD_BYTES:
+            self.head += bytes(data[:HEAD_BYTES - len(self.head)])
+        return super().write(data)
+
+
+class UploadRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return UploadStream(current_app.config['UPLOAD_MAX_BYTES'], current_app.config['UPLOAD_SPOOL_BYTES'])
+
+
+def image_upload(file):
+    """Kolom file_data/file_name/file_size/file_type untuk Image/ImageUsers, None jika tidak ada file.
+
+    UploadRejected jika isinya bukan PNG, JPEG, GIF atau WebP (dilihat dari isi, bukan ekstensi).
+    """
+    if not file or not file.filename:
+        return None
+    stream = file.stream
+    if isinstance(stream, UploadStream):
+        size, head = stream.size, stream.head
+    else:
+        stream.seek(0, 2)
+        size = stream.tell()
+        stream.seek(0)
+        head = stream.read(HEAD_BYTES)
+        if size > current_app.config['UPLOAD_MAX_BYTES']:
+            raise RequestEntityTooLarge()
+    file_type = sniff_image_type(head)
+    if file_type not in IMAGE_TYPES:
+        raise UploadRejected('Format file tidak didukung. Gunakan PNG, JPG, JPEG, GIF, atau WebP.')
+    stream.seek(0)
+    return {
+        'file_data': stream.read(),
+        'file_name': secure_filename(file.filename) or 'upload',
+        'file_size': size,
+        'file_type': file_type,
+    }
+
+
+def init_uploads(app):
+    app.config.setdefault('UPLOAD_MAX_BYTES', 5 * 1024 * 1024)
+    app.config.setdefault('UPLOAD_SPOOL_BYTES', 512 * 1024)
+    app.config.setdefault('MAX_CONTENT_LENGTH', app.config['UPLOAD_MAX_BYTES'] + 1024 * 1024)
+    app.request_class = UploadRequest
+
+    @app.before_request
+    def parse_uploads():
+        # Parse multipart sebelum view, supaya 413 tidak tertangkap try/except di dalam route
+        if request.mimetype == 'multipart/form-data':
+            request.files
+
+    @app.errorhandler(RequestEntityTooLarge)
+    def upload_too_large(e):
+        message = f"Ukuran file terlalu besar. Maksimal {format_size(app.config['UPLOAD_MAX_BYTES'])}."
+        if wants_json():
+            return jsonify({'success': False, 'message': message}), 413
+        # Form HTML biasa (admin_add_product): flash lalu kembali ke form
+        flash(message, 'error')
+        return redirect(request.referrer or form_page())
+
+
+def format_size(size):
+    """Batas ukuran untuk pesan: 5MB, 1.5MB, 512KB"""
+    if size >= 1024 * 1024:
+        return f'{size / (1024 * 1024):.1f}'.removesuffix('.0') + 'MB'
+    return f'{max(1, round(size / 1024))}KB'
+
+
+def form_page():
+    """Halaman GET untuk kembali dari upload yang ditolak (route POST-only tidak bisa di-redirect)"""
+    rule = request.url_rule
+    if rule is not None and 'GET' in rule.methods:
+        return request.path
+    if request.endpoint in FORM_PAGES:
+        endpoint, arg = FORM_PAGES[request.endpoint]
+        return url_for(endpoint, **({arg: request.view_args[arg]} if arg else {}))
+    return url_for('main.dashboard')
+
+
+def wants_json():
+    """Request dari fetch/XHR (halaman mengharapkan {'success', 'message'}), bukan submit form biasa"""
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.is_json:
+        return True
+    mode = request.headers.get('Sec-Fetch-Mode')
+    return mode is not None and mode != 'navigate'